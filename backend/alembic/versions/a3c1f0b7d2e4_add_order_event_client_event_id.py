@@ -0,0 +1,28 @@
+"""add_order_event_client_event_id
+
+Revision ID: a3c1f0b7d2e4
+Revises: 8ed90c217304
+Create Date: 2026-10-18 10:12:41.520318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c1f0b7d2e4'
+down_revision: Union[str, None] = '8ed90c217304'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('order_events', sa.Column('client_event_id', sa.String(length=64), nullable=True))
+    op.create_index('ux_order_events_client_event', 'order_events', ['branch_code', 'client_event_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_order_events_client_event', table_name='order_events')
+    op.drop_column('order_events', 'client_event_id')
@@ -0,0 +1,36 @@
+"""menu_items.item_id
+
+Revision ID: a9c4e7f1b3d8
+Revises: f8b3d6e2a5c9
+Create Date: 2026-10-19 09:14:22.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e7f1b3d8'
+down_revision: Union[str, None] = 'f8b3d6e2a5c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('menu_items', sa.Column('item_id', sa.String(length=36), nullable=True))
+    op.create_index(op.f('ix_menu_items_item_id'), 'menu_items', ['item_id'], unique=False)
+    # Link legacy entries to the catalog item of the same name in the branch
+    op.execute(
+        "UPDATE menu_items SET item_id = ("
+        "SELECT items.id FROM items "
+        "WHERE items.branch_code = menu_items.branch_code AND items.name = menu_items.name "
+        "ORDER BY items.id LIMIT 1"
+        ") WHERE item_id IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_menu_items_item_id'), table_name='menu_items')
+    op.drop_column('menu_items', 'item_id')
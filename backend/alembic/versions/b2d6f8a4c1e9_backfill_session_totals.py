@@ -0,0 +1,38 @@
+"""backfill_session_totals
+
+Revision ID: b2d6f8a4c1e9
+Revises: a9c4e7f1b3d8
+Create Date: 2026-10-19 10:02:47.318540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d6f8a4c1e9'
+down_revision: Union[str, None] = 'a9c4e7f1b3d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # total_amount used to be written at checkout only: sessions open at
+    # deploy time start from the sum of their billable items, and
+    # session_totals moves them by deltas from here on
+    # (same sum as app.services.session_totals.session_amounts)
+    op.execute(
+        "UPDATE table_sessions SET total_amount = COALESCE(("
+        "SELECT SUM(CASE WHEN orders.status != 'cancelled' AND order_items.status != 'cancelled' "
+        "THEN order_items.item_price * order_items.quantity ELSE 0 END) "
+        "FROM orders JOIN order_items ON order_items.order_id = orders.id "
+        "WHERE orders.session_id = table_sessions.id"
+        "), 0) WHERE is_paid = false"
+    )
+
+
+def downgrade() -> None:
+    # Running totals are only meaningful with the session_totals hooks
+    pass
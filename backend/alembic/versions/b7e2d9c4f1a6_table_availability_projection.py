@@ -0,0 +1,36 @@
+"""table_availability_projection
+
+Revision ID: b7e2d9c4f1a6
+Revises: a3c1f0b7d2e4
+Create Date: 2026-10-18 14:05:12.384120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d9c4f1a6'
+down_revision: Union[str, None] = 'a3c1f0b7d2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Projection rows are rebuilt from bookings (python cli.py db rebuild-availability)
+    op.execute('DELETE FROM table_availability')
+    with op.batch_alter_table('table_availability') as batch_op:
+        batch_op.alter_column('date', existing_type=sa.DateTime(), type_=sa.Date(), existing_nullable=False)
+    op.create_index('ix_availability_lookup', 'table_availability',
+                    ['branch_code', 'date', 'time_slot', 'is_available'])
+    op.create_index('ux_availability_table_slot', 'table_availability',
+                    ['table_id', 'date', 'time_slot'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_availability_table_slot', table_name='table_availability')
+    op.drop_index('ix_availability_lookup', table_name='table_availability')
+    with op.batch_alter_table('table_availability') as batch_op:
+        batch_op.alter_column('date', existing_type=sa.Date(), type_=sa.DateTime(), existing_nullable=False)
@@ -0,0 +1,33 @@
+"""add_counters
+
+Revision ID: c4d8e1f2a9b3
+Revises: b7e2d9c4f1a6
+Create Date: 2026-10-18 16:20:41.502318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e1f2a9b3'
+down_revision: Union[str, None] = 'b7e2d9c4f1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Counters start from the existing MAX on first use (app.services.counters)
+    op.create_table(
+        'counters',
+        sa.Column('scope', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('scope'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('counters')
@@ -0,0 +1,32 @@
+"""order_events_branch_type_time_index
+
+Revision ID: d5e9f3a1b7c2
+Revises: c4d8e1f2a9b3
+Create Date: 2026-10-18 17:02:18.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e9f3a1b7c2'
+down_revision: Union[str, None] = 'c4d8e1f2a9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Delivery diagnostics: one branch's events of one type in a time window
+    op.create_index('ix_order_events_branch_type_time', 'order_events',
+                    ['branch_code', 'event_type', 'timestamp'])
+    # ...and the anti-join probe: one chain's events of one type
+    op.create_index('ix_order_events_correlation_type', 'order_events',
+                    ['correlation_id', 'event_type'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_events_correlation_type', table_name='order_events')
+    op.drop_index('ix_order_events_branch_type_time', table_name='order_events')
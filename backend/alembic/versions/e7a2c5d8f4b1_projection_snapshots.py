@@ -0,0 +1,37 @@
+"""projection_snapshots
+
+Revision ID: e7a2c5d8f4b1
+Revises: d5e9f3a1b7c2
+Create Date: 2026-10-18 18:11:53.271940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c5d8f4b1'
+down_revision: Union[str, None] = 'd5e9f3a1b7c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled lazily on read, or at once with: python cli.py db snapshot-projections
+    op.create_table(
+        'projection_snapshots',
+        sa.Column('projection', sa.String(length=30), nullable=False),
+        sa.Column('key', sa.String(length=36), nullable=False),
+        sa.Column('state', sa.JSON(), nullable=False),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.Column('position_ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('position_id', sa.String(length=36), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('projection', 'key'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('projection_snapshots')
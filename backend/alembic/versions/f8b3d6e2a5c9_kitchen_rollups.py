@@ -0,0 +1,48 @@
+"""kitchen_rollups
+
+Revision ID: f8b3d6e2a5c9
+Revises: e7a2c5d8f4b1
+Create Date: 2026-10-18 21:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8b3d6e2a5c9'
+down_revision: Union[str, None] = 'e7a2c5d8f4b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Backfill from existing events with: python cli.py db rebuild-kitchen-rollups
+    op.create_table(
+        'kitchen_rollups',
+        sa.Column('branch_code', sa.String(length=50), nullable=False),
+        sa.Column('station', sa.String(length=20), nullable=False),
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('served_count', sa.Integer(), nullable=False),
+        sa.Column('cancelled_count', sa.Integer(), nullable=False),
+        sa.Column('wait_seconds_sum', sa.Integer(), nullable=False),
+        sa.Column('wait_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('branch_code', 'station', 'hour'),
+    )
+    op.create_table(
+        'kitchen_wait_buckets',
+        sa.Column('branch_code', sa.String(length=50), nullable=False),
+        sa.Column('station', sa.String(length=20), nullable=False),
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('branch_code', 'station', 'hour', 'bucket'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('kitchen_wait_buckets')
+    op.drop_table('kitchen_rollups')
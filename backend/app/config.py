@@ -47,6 +47,40 @@ class Settings(BaseSettings):
     # Multi-tenant
     DEFAULT_BRANCH: str = "hirama"
 
+    # Event store — group commit for order_events
+    EVENT_GROUP_COMMIT: bool = True
+    EVENT_FLUSH_INTERVAL_MS: int = 50
+    EVENT_FLUSH_MAX_BATCH: int = 200
+    EVENT_WRITE_RETRIES: int = 3            # batch retries (backoff doubles) before row-by-row inserts
+    EVENT_WRITE_BACKOFF_MS: int = 100
+    EVENT_DEAD_LETTER_PATH: str = "./dead_letter/order_events.jsonl"  # rows no insert could write
+    PROJECTION_SNAPSHOT_EVERY: int = 50  # replayed events before an order/session snapshot is rewritten
+
+    # Event retention — months kept in order_events/kitchen_events, then monthly partitions, then files
+    EVENT_HOT_MONTHS: int = 1               # closed months kept in the live tables
+    EVENT_ARCHIVE_AFTER_MONTHS: int = 6     # partitions older than this go to EVENT_ARCHIVE_DIR
+    EVENT_ARCHIVE_DIR: str = "./archive"
+
+    # WebSocket fan-out — per-connection outbound queue
+    WS_QUEUE_SIZE: int = 100
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest | coalesce | disconnect
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+
+    # SSE notifications — keepalive interval, per-client queue, replay buffer
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+    SSE_QUEUE_SIZE: int = 100
+    SSE_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest | disconnect
+    SSE_REPLAY_BUFFER: int = 200  # recent notifications kept per branch for Last-Event-ID
+
+    # Realtime broker — relays WebSocket/SSE broadcasts between workers
+    REALTIME_BROKER: str = "memory"  # memory (single worker) | redis (uses REDIS_URL)
+
+    # Counters — order/queue numbers reserved per database round trip (1 when running several workers)
+    COUNTER_BLOCK_SIZE: int = 10
+
+    # Observability — per-route SQL/latency metrics at /metrics + Server-Timing header
+    METRICS_ENABLED: bool = False
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -24,6 +24,11 @@ if "sqlite" in database_url:
 
 engine = create_async_engine(database_url, **engine_kwargs)
 
+# Optional per-request statement counting / timing
+if settings.METRICS_ENABLED:
+    from app.metrics import instrument_engine
+    instrument_engine(engine)
+
 # Async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -47,10 +52,12 @@ async def get_db():
 async def init_db():
     """Initialize database tables"""
     # Import all models to ensure they're registered with Base
-    from app.models import booking, branch, chat, customer, menu, order, preference, staff, table
+    from app.models import booking, branch, chat, counter, customer, menu, order, preference, staff, table
     # Import domain models
     from app.domains.checkin import models as checkin_models
+    from app.domains.tableorder import projections as order_projections
     from app.domains.kitchen import events as kitchen_events
+    from app.domains.kitchen import rollups as kitchen_rollups
     from app.domains.devices import models as device_models
 
     async with engine.begin() as conn:
@@ -19,6 +19,7 @@ from app.domains.checkin.schemas import (
 from app.domains.booking.models import Booking, BookingStatus
 from app.domains.tableorder.models import TableSession
 from app.domains.shared.models import Table
+from app.services.counters import counters
 
 router = APIRouter()
 
@@ -144,20 +145,28 @@ async def scan_qr_code(
         )
 
 
+async def today_max_queue_number(db: AsyncSession, branch_code: str) -> int:
+    """Highest queue number issued today - seeds the day's counter"""
+    result = await db.execute(
+        select(func.max(WaitingList.queue_number)).where(
+            WaitingList.branch_code == branch_code,
+            func.date(WaitingList.created_at) == date.today()
+        )
+    )
+    return result.scalar() or 0
+
+
 @router.post("/walkin", response_model=WaitingResponse)
 async def register_walkin(
     data: WalkInRegister,
     db: AsyncSession = Depends(get_db)
 ):
     """Register a walk-in customer to waiting list"""
-    # Get next queue number
-    result = await db.execute(
-        select(func.max(WaitingList.queue_number)).where(
-            WaitingList.branch_code == data.branch_code,
-            func.date(WaitingList.created_at) == date.today()
-        )
+    # Next queue number of the branch today (atomic counter, no MAX scan)
+    queue_number = await counters.next(
+        f"queue:{data.branch_code}:{date.today().isoformat()}",
+        initial=lambda: today_max_queue_number(db, data.branch_code),
     )
-    max_queue = result.scalar() or 0
 
     # Calculate estimated wait
     queue_info = await get_queue_info(db, data.branch_code)
@@ -168,7 +177,7 @@ async def register_walkin(
         customer_name=data.customer_name,
         customer_phone=data.customer_phone,
         guest_count=data.guest_count,
-        queue_number=max_queue + 1,
+        queue_number=queue_number,
         estimated_wait_minutes=queue_info["estimated_wait"],
         note=data.note
     )
@@ -79,3 +79,24 @@ async def get_kitchen_history(
         offset=offset,
         since_hours=since_hours,
     )
+
+
+@router.get("/performance")
+async def get_kitchen_performance(
+    branch_code: str = Query("hirama", description="Branch code"),
+    station: Optional[str] = Query(None, description="Filter by station: meat, side, drink, all"),
+    group_by: Optional[str] = Query(None, pattern="^(station|hour)$", description="Also break down by station or hour"),
+    since_hours: int = Query(24, ge=1, le=24 * 90, description="Hours of history to aggregate"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Kitchen performance: served/cancelled counts and p50/p90/p99 wait times.
+    Read from the hourly rollups, so long windows cost no more than short ones.
+    """
+    service = KitchenEventService(db)
+    return await service.get_performance(
+        branch_code=branch_code,
+        since_hours=since_hours,
+        station=station,
+        group_by=group_by,
+    )
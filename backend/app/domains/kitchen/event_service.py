@@ -12,6 +12,7 @@ from app.domains.kitchen.events import (
     KitchenEvent, KitchenEventType, KitchenEventSource,
     KitchenEventCreate, KitchenEventResponse, KitchenHistoryResponse
 )
+from app.domains.kitchen import rollups
 
 
 class KitchenEventService:
@@ -44,6 +45,8 @@ class KitchenEventService:
         event = KitchenEvent(
             event_type=event_type.value,
             event_source=event_source.value,
+            # Stamped here so the event and its rollup hour agree
+            timestamp=datetime.utcnow(),
             branch_code=branch_code,
             table_id=table_id,
             table_number=table_number,
@@ -60,6 +63,7 @@ class KitchenEventService:
         )
 
         self.db.add(event)
+        await rollups.record(self.db, [event])
         await self.db.commit()
         await self.db.refresh(event)
         return event
@@ -157,46 +161,48 @@ class KitchenEventService:
         since_hours: int = 24,
     ) -> KitchenHistoryResponse:
         """Get kitchen event history with optional filters"""
-        since = datetime.utcnow() - timedelta(hours=since_hours)
-
-        # Base query
-        stmt = select(KitchenEvent).where(
-            and_(
-                KitchenEvent.branch_code == branch_code,
-                KitchenEvent.timestamp >= since,
-            )
-        )
+        from app.services.event_retention import kitchen_event_log
 
-        # Apply filters
-        if station and station != "all":
-            stmt = stmt.where(KitchenEvent.station == station)
-
-        if event_type:
-            stmt = stmt.where(KitchenEvent.event_type == event_type)
-        else:
-            # By default, show served and cancelled events (the main history items)
-            stmt = stmt.where(
-                KitchenEvent.event_type.in_([
-                    KitchenEventType.ITEM_SERVED.value,
-                    KitchenEventType.ITEM_CANCELLED.value,
-                ])
-            )
+        since = datetime.utcnow() - timedelta(hours=since_hours)
+        # Live table, plus a month partition if the window reaches one
+        tables = await kitchen_event_log.tables_for(self.db, since)
+
+        def filtered(table):
+            c = table.c
+            stmt = select(table).where(and_(c.branch_code == branch_code, c.timestamp >= since))
+
+            # Apply filters
+            if station and station != "all":
+                stmt = stmt.where(c.station == station)
+
+            if event_type:
+                stmt = stmt.where(c.event_type == event_type)
+            else:
+                # By default, show served and cancelled events (the main history items)
+                stmt = stmt.where(
+                    c.event_type.in_([
+                        KitchenEventType.ITEM_SERVED.value,
+                        KitchenEventType.ITEM_CANCELLED.value,
+                    ])
+                )
+            return stmt
+
+        events = kitchen_event_log.union(tables, filtered)
 
         # Count total
-        count_stmt = select(func.count()).select_from(stmt.subquery())
+        count_stmt = select(func.count()).select_from(events)
         total_result = await self.db.execute(count_stmt)
         total = total_result.scalar()
 
         # Get events (newest first)
-        stmt = stmt.order_by(desc(KitchenEvent.timestamp)).limit(limit).offset(offset)
+        stmt = select(events).order_by(desc(events.c.timestamp)).limit(limit).offset(offset)
         result = await self.db.execute(stmt)
-        events = result.scalars().all()
 
         # Build summary
         summary = await self._build_summary(branch_code, since, station)
 
         return KitchenHistoryResponse(
-            events=[KitchenEventResponse.model_validate(e) for e in events],
+            events=[KitchenEventResponse.model_validate(dict(row._mapping)) for row in result],
             total=total,
             summary=summary,
         )
@@ -207,41 +213,28 @@ class KitchenEventService:
         since: datetime,
         station: Optional[str] = None,
     ) -> dict:
-        """Build summary stats for history"""
-        base_cond = and_(
-            KitchenEvent.branch_code == branch_code,
-            KitchenEvent.timestamp >= since,
-        )
-        if station and station != "all":
-            base_cond = and_(base_cond, KitchenEvent.station == station)
-
-        # Count served
-        served_stmt = select(func.count()).where(
-            and_(base_cond, KitchenEvent.event_type == KitchenEventType.ITEM_SERVED.value)
-        )
-        served_result = await self.db.execute(served_stmt)
-        served = served_result.scalar() or 0
+        """Build summary stats for history (from the hourly rollups)"""
+        return await rollups.summary(self.db, branch_code, since, station)
 
-        # Count cancelled
-        cancelled_stmt = select(func.count()).where(
-            and_(base_cond, KitchenEvent.event_type == KitchenEventType.ITEM_CANCELLED.value)
-        )
-        cancelled_result = await self.db.execute(cancelled_stmt)
-        cancelled = cancelled_result.scalar() or 0
-
-        # Average wait time for served items
-        avg_stmt = select(func.avg(KitchenEvent.wait_time_seconds)).where(
-            and_(
-                base_cond,
-                KitchenEvent.event_type == KitchenEventType.ITEM_SERVED.value,
-                KitchenEvent.wait_time_seconds.isnot(None),
-            )
-        )
-        avg_result = await self.db.execute(avg_stmt)
-        avg_wait = avg_result.scalar()
-
-        return {
-            "served_count": served,
-            "cancelled_count": cancelled,
-            "avg_wait_seconds": round(avg_wait) if avg_wait else 0,
-        }
+    async def get_performance(
+        self,
+        branch_code: str,
+        since_hours: int = 24,
+        station: Optional[str] = None,
+        group_by: Optional[str] = None,
+    ) -> dict:
+        """Kitchen performance overall and per station or hour (from the rollups)"""
+        since = datetime.utcnow() - timedelta(hours=since_hours)
+        groups = await rollups.aggregate(self.db, branch_code, since, station, group_by)
+
+        # Group sketches merge into the overall one
+        total = rollups.KitchenStats()
+        for stats in groups.values():
+            total.merge(stats)
+        response = {"summary": total.to_dict(), "groups": []}
+        if group_by:
+            response["groups"] = [
+                {group_by: key.isoformat() if isinstance(key, datetime) else key, **stats.to_dict()}
+                for key, stats in sorted(groups.items(), key=lambda item: (item[0] is None, item[0] or ""))
+            ]
+        return response
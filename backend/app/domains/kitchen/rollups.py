@@ -0,0 +1,355 @@
+"""
+Kitchen Rollups - Hourly kitchen performance per branch and station
+Served/cancelled counts and wait times are pre-aggregated per
+branch x station x hour as kitchen events are logged, so summaries and
+dashboards read hour rows instead of raw events:
+
+- kitchen_rollups:       served / cancelled counts, wait sum and count
+- kitchen_wait_buckets:  wait-time sketch of the served items
+
+The sketch is a logarithmic histogram (DDSketch): bucket i >= 1 holds
+waits in (gamma^(i-2), gamma^(i-1)] with gamma = (1+a)/(1-a), so p50/p90/p99
+read from it are within a = 2% of the true wait. Sketches merge by adding
+bucket counts (hours, stations, workers alike) and every write is an
+atomic `count = count + n` upsert in the event's own transaction.
+
+A window that does not start on the hour reads its first, partial hour
+from kitchen_events. `python cli.py db rebuild-kitchen-rollups` recomputes
+the rollups from the events still in the database.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, and_, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.database import Base
+from app.domains.kitchen.events import KitchenEvent, KitchenEventType
+
+SERVED = KitchenEventType.ITEM_SERVED.value
+CANCELLED = KitchenEventType.ITEM_CANCELLED.value
+
+# Changing this invalidates stored buckets (rebuild the rollups)
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+INSERT_CHUNK = 1000
+
+
+class KitchenRollup(Base):
+    """Served / cancelled items of one station in one hour"""
+    __tablename__ = "kitchen_rollups"
+
+    branch_code = Column(String(50), primary_key=True)
+    station = Column(String(20), primary_key=True)  # "" for events without one
+    hour = Column(DateTime(timezone=True), primary_key=True)  # UTC, start of the hour
+    served_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    wait_seconds_sum = Column(Integer, nullable=False, default=0)
+    wait_count = Column(Integer, nullable=False, default=0)  # served items with a wait time
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class KitchenWaitBucket(Base):
+    """One bucket of the wait-time sketch of a station in one hour"""
+    __tablename__ = "kitchen_wait_buckets"
+
+    branch_code = Column(String(50), primary_key=True)
+    station = Column(String(20), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# ============ Sketch ============
+
+def bucket_of(wait_seconds: int) -> int:
+    """Sketch bucket of a wait (0 holds waits of 0 seconds)"""
+    if wait_seconds <= 0:
+        return 0
+    return math.ceil(math.log(wait_seconds) / _LOG_GAMMA) + 1
+
+
+def value_of(bucket: int) -> int:
+    """Representative wait of a bucket (within RELATIVE_ACCURACY of its members)"""
+    if bucket <= 0:
+        return 0
+    return round(2 * GAMMA ** (bucket - 1) / (GAMMA + 1))
+
+
+class WaitSketch:
+    """Mergeable wait-time quantiles: bucket -> count"""
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None):
+        self.buckets: Dict[int, int] = defaultdict(int, buckets or {})
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def add(self, wait_seconds: int, count: int = 1):
+        self.buckets[bucket_of(wait_seconds)] += count
+
+    def merge(self, other: "WaitSketch"):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+
+    def quantile(self, q: float) -> Optional[int]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return value_of(bucket)
+        return value_of(max(self.buckets))
+
+
+class KitchenStats:
+    """Counts and wait sketch of any set of hours/stations"""
+
+    def __init__(self):
+        self.served = 0
+        self.cancelled = 0
+        self.wait_sum = 0
+        self.wait_count = 0
+        self.sketch = WaitSketch()
+
+    def add_event(self, event_type: str, wait_seconds: Optional[int]):
+        if event_type == CANCELLED:
+            self.cancelled += 1
+        elif event_type == SERVED:
+            self.served += 1
+            if wait_seconds is not None:
+                self.wait_sum += wait_seconds
+                self.wait_count += 1
+                self.sketch.add(wait_seconds)
+
+    def merge(self, other: "KitchenStats"):
+        self.served += other.served
+        self.cancelled += other.cancelled
+        self.wait_sum += other.wait_sum
+        self.wait_count += other.wait_count
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self) -> dict:
+        return {
+            "served_count": self.served,
+            "cancelled_count": self.cancelled,
+            "avg_wait_seconds": round(self.wait_sum / self.wait_count) if self.wait_count else 0,
+            **{f"{name}_wait_seconds": self.sketch.quantile(q) for name, q in QUANTILES.items()},
+        }
+
+
+def hour_of(ts: datetime) -> datetime:
+    """Start of the UTC hour, naive (as the rest of the app stores UTC)"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _insert(db: AsyncSession):
+    return postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+
+# ============ Writing ============
+
+async def record(db: AsyncSession, events: Iterable[KitchenEvent]):
+    """Add logged events to their hour (in the caller's transaction, before commit)"""
+    rollups: Dict[Tuple[str, str, datetime], KitchenStats] = defaultdict(KitchenStats)
+    for event in events:
+        if event.event_type in (SERVED, CANCELLED):
+            key = (event.branch_code, event.station or "", hour_of(event.timestamp or datetime.utcnow()))
+            rollups[key].add_event(event.event_type, event.wait_time_seconds)
+    if rollups:
+        await _add(db, rollups)
+
+
+async def _add(db: AsyncSession, rollups: Dict[Tuple[str, str, datetime], KitchenStats]):
+    """count = count + n for every rollup and sketch bucket"""
+    insert = _insert(db)
+    rows, buckets = [], []
+    for (branch_code, station, hour), stats in rollups.items():
+        key = {"branch_code": branch_code, "station": station, "hour": hour}
+        rows.append({
+            **key,
+            "served_count": stats.served,
+            "cancelled_count": stats.cancelled,
+            "wait_seconds_sum": stats.wait_sum,
+            "wait_count": stats.wait_count,
+        })
+        buckets += [{**key, "bucket": bucket, "count": count} for bucket, count in stats.sketch.buckets.items()]
+
+    stmt = insert(KitchenRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["branch_code", "station", "hour"],
+        set_={
+            "served_count": KitchenRollup.served_count + stmt.excluded.served_count,
+            "cancelled_count": KitchenRollup.cancelled_count + stmt.excluded.cancelled_count,
+            "wait_seconds_sum": KitchenRollup.wait_seconds_sum + stmt.excluded.wait_seconds_sum,
+            "wait_count": KitchenRollup.wait_count + stmt.excluded.wait_count,
+            "updated_at": func.now(),
+        },
+    )
+    for start in range(0, len(rows), INSERT_CHUNK):
+        await db.execute(stmt, rows[start:start + INSERT_CHUNK])
+
+    if buckets:
+        stmt = insert(KitchenWaitBucket)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["branch_code", "station", "hour", "bucket"],
+            set_={"count": KitchenWaitBucket.count + stmt.excluded.count},
+        )
+        for start in range(0, len(buckets), INSERT_CHUNK):
+            await db.execute(stmt, buckets[start:start + INSERT_CHUNK])
+
+
+# ============ Reading ============
+
+async def aggregate(
+    db: AsyncSession,
+    branch_code: str,
+    since: datetime,
+    station: Optional[str] = None,
+    group_by: Optional[str] = None,
+) -> Dict[object, KitchenStats]:
+    """
+    Stats since `since`, in one group (key None) or per "station" / "hour".
+    Reads rollup rows and sketch buckets for the whole hours, kitchen_events
+    for the partial hour at the start of the window.
+    """
+    from app.services.event_retention import kitchen_event_log
+
+    since = since.replace(tzinfo=None)
+    first_hour = hour_of(since)
+    whole_from = first_hour if since == first_hour else first_hour + timedelta(hours=1)
+    one_station = station if station and station != "all" else None
+    groups: Dict[object, KitchenStats] = defaultdict(KitchenStats)
+
+    def group_columns(model) -> list:
+        return {"station": [model.station], "hour": [model.hour]}.get(group_by, [])
+
+    def group_key(row, offset: int = 0):
+        if group_by is None:
+            return None
+        value = row[offset]
+        return (value or None) if group_by == "station" else hour_of(value)
+
+    def in_window(model):
+        condition = and_(model.branch_code == branch_code, model.hour >= whole_from)
+        if one_station is not None:
+            condition = and_(condition, model.station == one_station)
+        return condition
+
+    columns = group_columns(KitchenRollup)
+    result = await db.execute(
+        select(
+            *columns,
+            func.sum(KitchenRollup.served_count),
+            func.sum(KitchenRollup.cancelled_count),
+            func.sum(KitchenRollup.wait_seconds_sum),
+            func.sum(KitchenRollup.wait_count),
+        ).where(in_window(KitchenRollup)).group_by(*columns)
+    )
+    for row in result:
+        stats = groups[group_key(row)]
+        served, cancelled, wait_sum, wait_count = row[len(columns):]
+        stats.served += served or 0
+        stats.cancelled += cancelled or 0
+        stats.wait_sum += wait_sum or 0
+        stats.wait_count += wait_count or 0
+
+    columns = group_columns(KitchenWaitBucket)
+    result = await db.execute(
+        select(*columns, KitchenWaitBucket.bucket, func.sum(KitchenWaitBucket.count))
+        .where(in_window(KitchenWaitBucket))
+        .group_by(*columns, KitchenWaitBucket.bucket)
+    )
+    for row in result:
+        groups[group_key(row)].sketch.buckets[row[-2]] += row[-1]
+
+    # Partial first hour: raw events
+    if whole_from > since:
+        def head(table):
+            c = table.c
+            stmt = select(c.station, c.event_type, c.wait_time_seconds).where(and_(
+                c.branch_code == branch_code,
+                c.timestamp >= since,
+                c.timestamp < whole_from,
+                c.event_type.in_([SERVED, CANCELLED]),
+            ))
+            if one_station is not None:
+                stmt = stmt.where(c.station == one_station)
+            return stmt
+
+        tables = await kitchen_event_log.tables_for(db, since, whole_from)
+        events = kitchen_event_log.union(tables, head)
+        for event_station, event_type, wait_seconds in await db.execute(select(events)):
+            key = None if group_by is None else (event_station or None) if group_by == "station" else first_hour
+            groups[key].add_event(event_type, wait_seconds)
+
+    return groups
+
+
+async def summary(db: AsyncSession, branch_code: str, since: datetime, station: Optional[str] = None) -> dict:
+    """Counts, average and p50/p90/p99 wait of served items since `since`"""
+    groups = await aggregate(db, branch_code, since, station)
+    return groups.get(None, KitchenStats()).to_dict()
+
+
+# ============ Rebuild ============
+
+async def rebuild(db: AsyncSession, branch_code: Optional[str] = None, since: Optional[datetime] = None) -> dict:
+    """
+    Recompute the rollups from kitchen_events (live table and partitions).
+    Hours before the oldest stored event are kept: their events may only
+    be left in archive files.
+    """
+    from app.services.event_retention import kitchen_event_log
+
+    tables = await kitchen_event_log.tables_for(db, since)
+    if since is None:
+        oldest = [(await db.execute(select(func.min(table.c.timestamp)))).scalar() for table in tables]
+        oldest = [ts for ts in oldest if ts is not None]
+        if not oldest:
+            return {"events": 0, "hours": 0, "buckets": 0}
+        since = min(hour_of(ts) for ts in oldest)
+    since = hour_of(since)
+
+    for model in (KitchenRollup, KitchenWaitBucket):
+        stmt = delete(model).where(model.hour >= since)
+        if branch_code:
+            stmt = stmt.where(model.branch_code == branch_code)
+        await db.execute(stmt)
+
+    rollups: Dict[Tuple[str, str, datetime], KitchenStats] = defaultdict(KitchenStats)
+    events = 0
+    for table in tables:
+        c = table.c
+        stmt = select(c.branch_code, c.station, c.timestamp, c.event_type, c.wait_time_seconds).where(and_(
+            c.timestamp >= since,
+            c.event_type.in_([SERVED, CANCELLED]),
+        ))
+        if branch_code:
+            stmt = stmt.where(c.branch_code == branch_code)
+        result = await db.stream(stmt.execution_options(yield_per=5000))
+        async for partition in result.partitions(5000):
+            for event_branch, event_station, ts, event_type, wait_seconds in partition:
+                rollups[(event_branch, event_station or "", hour_of(ts))].add_event(event_type, wait_seconds)
+            events += len(partition)
+
+    await _add(db, rollups)
+    await db.commit()
+    return {
+        "events": events,
+        "hours": len(rollups),
+        "buckets": sum(len(stats.sketch.buckets) for stats in rollups.values()),
+    }
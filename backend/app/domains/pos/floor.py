@@ -0,0 +1,190 @@
+"""
+POS Floor - Table overview for POS terminals
+Read path: tables, their open session, order count and running total
+(TableSession.total_amount, see app.services.session_totals) in one query.
+
+Push mode: commits that touch a TableSession, Order or OrderItem mark the
+table; shortly after, the marked rows are re-read (one query per branch)
+and sent on the "pos" WebSocket channel as
+
+    {"type": "pos.table", "data": <TableOverview>, "channel": "pos"}
+
+Each delta is the full row, so applying it twice is harmless and a slow
+terminal's queue keeps only the latest one per table. Terminals load
+the full floor on connect (/ws/pos sends it) and recount the summary
+from their rows.
+"""
+import asyncio
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal
+from app.domains.pos.schemas import POSDashboard, TableOverview, TableStatusEnum
+from app.domains.shared.models import Table
+from app.domains.tableorder.models import Order, OrderItem, TableSession
+from app.services.change_feed import change_feed
+
+CHANNEL = "pos"
+
+
+async def load_floor(
+    db: AsyncSession,
+    branch_code: str,
+    table_ids: Optional[Iterable[str]] = None,
+) -> POSDashboard:
+    """Overview of every table of the branch (or only table_ids) - one query"""
+    order_count = (
+        select(func.count(Order.id))
+        .where(Order.session_id == TableSession.id)
+        .correlate(TableSession)
+        .scalar_subquery()
+    )
+    query = (
+        select(Table, TableSession, order_count)
+        .outerjoin(
+            TableSession,
+            and_(TableSession.table_id == Table.id, TableSession.ended_at.is_(None))
+        )
+        .where(Table.branch_code == branch_code)
+        .order_by(Table.table_number, TableSession.started_at.desc())
+    )
+    if table_ids is not None:
+        query = query.where(Table.id.in_(list(table_ids)))
+    result = await db.execute(query)
+
+    table_overviews = []
+    summary = {"available": 0, "occupied": 0, "pending_payment": 0, "cleaning": 0}
+    seen = set()
+
+    for table, session, orders in result.all():
+        # Latest open session only
+        if table.id in seen:
+            continue
+        seen.add(table.id)
+
+        if session:
+            # Running bill, maintained by app.services.session_totals
+            total = Decimal(session.total_amount or 0)
+
+            # Determine status
+            if session.is_paid:
+                status = TableStatusEnum.cleaning
+            elif total > 0:
+                status = TableStatusEnum.pending_payment
+            else:
+                status = TableStatusEnum.occupied
+            summary[status.value] += 1
+
+            table_overviews.append(TableOverview(
+                id=table.id,
+                table_number=table.table_number,
+                capacity=table.max_capacity,
+                zone=table.zone,
+                status=status,
+                session_id=session.id,
+                guest_count=session.guest_count,
+                current_total=total,
+                started_at=session.started_at,
+                order_count=orders
+            ))
+        else:
+            summary["available"] += 1
+            table_overviews.append(TableOverview(
+                id=table.id,
+                table_number=table.table_number,
+                capacity=table.max_capacity,
+                zone=table.zone,
+                status=TableStatusEnum.available
+            ))
+
+    return POSDashboard(tables=table_overviews, summary=summary)
+
+
+class FloorPublisher:
+    """Collects changed tables per branch and pushes their rows in batches"""
+
+    def __init__(self, session_factory=AsyncSessionLocal, delay_ms: int = 50):
+        self._session_factory = session_factory
+        self.delay = delay_ms / 1000
+        self._pending: Dict[str, Set[str]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        # Counters
+        self.pushes = 0
+        self.rows = 0
+
+    def mark(self, changes: Iterable[Tuple[str, str]]):
+        """(branch_code, table_id) changed - push them after `delay`"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no running loop (sync scripts): no terminals to push to
+        for branch_code, table_id in changes:
+            self._pending.setdefault(branch_code, set()).add(table_id)
+            task = self._tasks.get(branch_code)
+            if task is None or task.done() or task.get_loop() is not loop:
+                self._tasks[branch_code] = loop.create_task(self._push(branch_code))
+
+    async def _push(self, branch_code: str):
+        try:
+            await asyncio.sleep(self.delay)
+            table_ids = self._pending.pop(branch_code, set())
+            if not table_ids:
+                return
+            from app.routers.websocket import manager
+
+            async with self._session_factory() as db:
+                floor = await load_floor(db, branch_code, table_ids)
+            for row in floor.tables:
+                await manager.broadcast_to_branch(branch_code, {
+                    "type": "pos.table",
+                    "data": row.model_dump(mode="json"),
+                    "channel": CHANNEL,
+                }, channel=CHANNEL)
+            self.pushes += 1
+            self.rows += len(floor.tables)
+        except Exception as e:
+            print(f"⚠️ POS floor push failed (non-blocking): {e}")
+        finally:
+            self._tasks.pop(branch_code, None)
+            # Changes that arrived while pushing
+            if self._pending.get(branch_code):
+                self._tasks[branch_code] = asyncio.get_running_loop().create_task(self._push(branch_code))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"pending": sum(len(t) for t in self._pending.values()), "pushes": self.pushes, "rows": self.rows}
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+def _collect_floor_changes(session: Session) -> Set[Tuple[str, str]]:
+    changes: Set[Tuple[str, str]] = set()
+    order_ids: Set[str] = set()
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            if isinstance(obj, (TableSession, Order)):
+                changes.add((obj.branch_code, obj.table_id))
+            elif isinstance(obj, OrderItem) and obj.order_id:
+                order_ids.add(obj.order_id)
+    if order_ids:
+        changes.update(session.connection().execute(
+            select(Order.branch_code, Order.table_id).where(Order.id.in_(order_ids)).distinct()
+        ).all())
+    return changes
+
+
+def _push_floor_changes(changes: Set[Tuple[str, str]]):
+    floor_publisher.mark(changes)
+
+
+change_feed("pos_floor_changes", _collect_floor_changes, _push_floor_changes)
+
+
+# Global publisher
+floor_publisher = FloorPublisher()
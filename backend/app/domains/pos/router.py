@@ -2,108 +2,68 @@
 POS Router - Point of Sale APIs
 Team: pos
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 import secrets
 
 from app.database import get_db
 from app.domains.tableorder.models import Order, OrderItem, OrderStatus, TableSession
-from app.domains.shared.models import Table
+from app.domains.shared.models import MenuItem, Table
+from app.domains.pos.floor import load_floor
 from app.domains.pos.schemas import (
-    CheckoutRequest, CheckoutResponse, TableOverview,
-    POSDashboard, TableStatusEnum, PaymentMethod
+    CheckoutRequest, CheckoutResponse,
+    POSDashboard, PaymentMethod
 )
+from app.services.catalog import catalog_cache
+from app.services.promotion_engine import BillEvaluation, BillLine, promotion_rules
+from app.services.session_totals import CANCELLED, reconcile
 
 router = APIRouter()
 
 TAX_RATE = Decimal("0.10")  # 10% tax
 
 
+async def _evaluate_bill(
+    db: AsyncSession,
+    session: TableSession,
+    orders: list,
+    codes: List[str],
+) -> BillEvaluation:
+    """Apply the branch's combos and promotions to the session's order lines"""
+    billed = [item for order in orders for item in order.items if item.status != CANCELLED]
+
+    # Order lines hold legacy menu_items ids; rules key on catalog items.id
+    menu_ids = {item.menu_item_id for item in billed}
+    links = dict((await db.execute(
+        select(MenuItem.id, MenuItem.item_id).where(MenuItem.id.in_(menu_ids), MenuItem.item_id.isnot(None))
+    )).all()) if menu_ids else {}
+    lines = [
+        BillLine(links.get(item.menu_item_id, item.menu_item_id), item.item_price, item.quantity, item.item_name)
+        for item in billed
+    ]
+    catalog = await catalog_cache.get(db, session.branch_code)
+    rules = await promotion_rules.get(db, session.branch_code)
+    return rules.evaluate(lines, catalog, datetime.now(), codes)
+
+
 @router.get("/tables", response_model=POSDashboard)
 async def get_pos_tables(
     branch_code: str = "hirama",
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all tables with current status for POS overview"""
-    # Get all tables
-    result = await db.execute(
-        select(Table).where(Table.branch_code == branch_code).order_by(Table.table_number)
-    )
-    tables = result.scalars().all()
-
-    table_overviews = []
-    summary = {"available": 0, "occupied": 0, "pending_payment": 0, "cleaning": 0}
-
-    for table in tables:
-        # Check for active session
-        session_result = await db.execute(
-            select(TableSession).where(
-                TableSession.table_id == table.id,
-                TableSession.ended_at.is_(None)
-            )
-        )
-        session = session_result.scalar_one_or_none()
-
-        if session:
-            # Get orders for this session
-            orders_result = await db.execute(
-                select(Order)
-                .options(selectinload(Order.items))
-                .where(Order.session_id == session.id)
-            )
-            orders = orders_result.scalars().all()
-
-            # Calculate total
-            total = Decimal("0")
-            for order in orders:
-                if order.status != OrderStatus.CANCELLED.value:
-                    for item in order.items:
-                        total += item.item_price * item.quantity
-
-            # Determine status
-            if session.is_paid:
-                status = TableStatusEnum.cleaning
-                summary["cleaning"] += 1
-            elif total > 0:
-                status = TableStatusEnum.pending_payment
-                summary["pending_payment"] += 1
-            else:
-                status = TableStatusEnum.occupied
-                summary["occupied"] += 1
-
-            table_overviews.append(TableOverview(
-                id=table.id,
-                table_number=table.table_number,
-                capacity=table.capacity,
-                zone=table.zone,
-                status=status,
-                session_id=session.id,
-                guest_count=session.guest_count,
-                current_total=total,
-                started_at=session.started_at,
-                order_count=len(orders)
-            ))
-        else:
-            summary["available"] += 1
-            table_overviews.append(TableOverview(
-                id=table.id,
-                table_number=table.table_number,
-                capacity=table.capacity,
-                zone=table.zone,
-                status=TableStatusEnum.available
-            ))
-
-    return POSDashboard(tables=table_overviews, summary=summary)
+    """Get all tables with current status for POS overview (one query)"""
+    return await load_floor(db, branch_code)
 
 
 @router.get("/sessions/{session_id}/bill")
 async def get_session_bill(
     session_id: str,
+    promotion_code: List[str] = Query(default=[]),
     db: AsyncSession = Depends(get_db)
 ):
     """Get detailed bill for a session"""
@@ -140,6 +100,8 @@ async def get_session_bill(
 
     for order in orders:
         for item in order.items:
+            if item.status == CANCELLED:
+                continue  # voided
             item_total = item.item_price * item.quantity
             subtotal += item_total
             items.append({
@@ -151,8 +113,10 @@ async def get_session_bill(
                 "order_number": order.order_number
             })
 
-    tax = subtotal * TAX_RATE
-    total = subtotal + tax
+    evaluation = await _evaluate_bill(db, session, orders, promotion_code)
+    discount = evaluation.discount
+    tax = (subtotal - discount) * TAX_RATE
+    total = subtotal - discount + tax
 
     return {
         "session_id": session_id,
@@ -161,6 +125,8 @@ async def get_session_bill(
         "started_at": session.started_at.isoformat(),
         "items": items,
         "subtotal": float(subtotal),
+        "discount": float(discount),
+        "adjustments": [a.to_dict() for a in evaluation.adjustments],
         "tax": float(tax),
         "tax_rate": float(TAX_RATE),
         "total": float(total),
@@ -206,11 +172,15 @@ async def checkout(
     subtotal = Decimal("0")
     for order in orders:
         for item in order.items:
-            subtotal += item.item_price * item.quantity
+            if item.status != CANCELLED:
+                subtotal += item.item_price * item.quantity
 
-    tax = subtotal * TAX_RATE
-    discount = checkout_data.discount_amount
-    total = subtotal + tax - discount
+    # Combos / promotions come off before tax, a manual discount after it
+    evaluation = await _evaluate_bill(db, session, orders, checkout_data.promotion_codes)
+    promotion_discount = evaluation.discount
+    tax = (subtotal - promotion_discount) * TAX_RATE
+    discount = promotion_discount + checkout_data.discount_amount
+    total = subtotal - promotion_discount + tax - checkout_data.discount_amount
 
     # Calculate change for cash
     change = None
@@ -236,6 +206,8 @@ async def checkout(
         subtotal=subtotal,
         tax=tax,
         discount=discount,
+        promotion_discount=promotion_discount,
+        adjustments=[a.to_dict() for a in evaluation.adjustments],
         total=total,
         payment_method=checkout_data.payment_method.value,
         change=change,
@@ -269,3 +241,53 @@ async def close_table(
     await db.commit()
 
     return {"message": "Table closed", "table_id": table_id}
+
+
+@router.post("/items/{item_id}/void")
+async def void_item(
+    item_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Void an order item (taken off the bill, session total adjusted)"""
+    result = await db.execute(
+        select(OrderItem).where(OrderItem.id == item_id)
+    )
+    item = result.scalar_one_or_none()
+
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    order = await db.get(Order, item.order_id)
+    session = await db.get(TableSession, order.session_id) if order else None
+    if session and session.is_paid:
+        raise HTTPException(status_code=400, detail="Session already paid")
+
+    item.status = CANCELLED
+    await db.commit()
+
+    if session:
+        await db.refresh(session)
+    return {
+        "message": "Item voided",
+        "item_id": item_id,
+        "session_total": float(session.total_amount or 0) if session else None,
+    }
+
+
+@router.post("/sessions/reconcile")
+async def reconcile_sessions(
+    branch_code: Optional[str] = None,
+    fix: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Check running totals of unpaid sessions against their items"""
+    drifted = await db.run_sync(lambda s: reconcile(s.connection(), branch_code, fix))
+    if fix and drifted:
+        await db.commit()
+    return {
+        "drifted": [
+            {**d, "stored": float(d["stored"]), "expected": float(d["expected"])}
+            for d in drifted
+        ],
+        "fixed": fix,
+    }
@@ -2,7 +2,7 @@
 POS Schemas
 """
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
@@ -27,6 +27,7 @@ class CheckoutRequest(BaseModel):
     payment_method: PaymentMethod
     discount_amount: Decimal = Decimal("0")
     discount_reason: Optional[str] = None
+    promotion_codes: List[str] = []  # Staff-applied promotions (birthday, first visit)
     received_amount: Optional[Decimal] = None  # For cash payment
 
 
@@ -36,6 +37,8 @@ class CheckoutResponse(BaseModel):
     subtotal: Decimal
     tax: Decimal
     discount: Decimal
+    promotion_discount: Decimal = Decimal("0")
+    adjustments: List[dict] = []  # Combos / promotions applied
     total: Decimal
     payment_method: str
     change: Optional[Decimal] = None
@@ -0,0 +1,163 @@
+"""
+Delivery Tracker - Outstanding kitchen deliveries, in memory
+Keeps, per branch, the ORDER_CREATED events of the last hour whose
+correlation chain has no GATEWAY_RECEIVED yet, so /diagnostics/undelivered
+and /health answer without reading the event store.
+
+EventService reports every event it writes (observe); other workers'
+events arrive through the realtime broker ("deliveries" topic). A branch
+is loaded once from the store (EventService.get_undelivered_orders, an
+anti-join) the first time it is asked for; after that it is memory only.
+"""
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Set
+
+from app.domains.tableorder.events import EventType, OrderEvent
+from app.services.broker import realtime_broker
+
+CREATED = EventType.ORDER_CREATED.value
+RECEIVED = EventType.GATEWAY_RECEIVED.value
+
+
+def _naive(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=None) if ts else datetime.utcnow()
+
+
+class DeliveryTracker:
+    """Outstanding correlation IDs per branch"""
+
+    def __init__(self, horizon_minutes: int = 60, max_per_branch: int = 10000):
+        self.horizon = timedelta(minutes=horizon_minutes)
+        self.max_per_branch = max_per_branch
+        # branch_code -> correlation_id -> undelivered order (oldest first)
+        self._outstanding: Dict[str, "OrderedDict[str, dict]"] = {}
+        # Acks seen recently - an ack may overtake its order (other worker, warm-up)
+        self._acked: "OrderedDict[str, None]" = OrderedDict()
+        self._warm: Set[str] = set()
+
+        # Counters
+        self.loads = 0
+
+    # ============ Events ============
+
+    def observe(self, events: Iterable[OrderEvent], relay: bool = True):
+        """Apply written events; relay=True also sends them to the other workers"""
+        relayed = []
+        for event in events:
+            if event.event_type == CREATED and event.correlation_id:
+                self._add(event.branch_code, {
+                    "order_id": event.order_id,
+                    "correlation_id": event.correlation_id,
+                    "created_at": _naive(event.timestamp),
+                    "table_id": event.table_id,
+                    "session_id": event.session_id,
+                    "data": event.data,
+                })
+            elif event.event_type == RECEIVED and event.correlation_id:
+                self._ack(event.branch_code, event.correlation_id)
+            else:
+                continue
+            relayed.append(event)
+
+        if relay and relayed:
+            realtime_broker.publish_soon("deliveries", json.dumps([self._encode(e) for e in relayed]))
+
+    def _add(self, branch_code: str, order: dict):
+        if order["correlation_id"] in self._acked:
+            return
+        outstanding = self._outstanding.setdefault(branch_code, OrderedDict())
+        outstanding[order["correlation_id"]] = order
+        self._prune(outstanding)
+
+    def _ack(self, branch_code: str, correlation_id: str):
+        self._outstanding.get(branch_code, {}).pop(correlation_id, None)
+        self._acked[correlation_id] = None
+        while len(self._acked) > self.max_per_branch:
+            self._acked.popitem(last=False)
+
+    def _prune(self, outstanding: "OrderedDict[str, dict]"):
+        """Drop orders past the horizon (and the oldest beyond the cap)"""
+        cutoff = datetime.utcnow() - self.horizon
+        while outstanding:
+            oldest = next(iter(outstanding.values()))
+            if oldest["created_at"] >= cutoff and len(outstanding) <= self.max_per_branch:
+                break
+            outstanding.popitem(last=False)
+
+    # ============ Reading ============
+
+    def is_warm(self, branch_code: str) -> bool:
+        return branch_code in self._warm
+
+    async def warm(self, branch_code: str, load: Callable[[int], Awaitable[List[dict]]]):
+        """Seed a branch from the store: load(minutes) returns its undelivered orders"""
+        orders = await load(int(self.horizon.total_seconds() // 60))
+        outstanding = self._outstanding.setdefault(branch_code, OrderedDict())
+        # Orders observed while loading are newer - keep them last
+        merged = OrderedDict()
+        for order in orders:
+            if order["correlation_id"] not in self._acked:
+                created_at = datetime.fromisoformat(order["created_at"])
+                merged[order["correlation_id"]] = {
+                    **{k: v for k, v in order.items() if k != "minutes_ago"},
+                    "created_at": _naive(created_at),
+                }
+        merged.update(outstanding)
+        self._outstanding[branch_code] = merged
+        self._prune(merged)
+        self._warm.add(branch_code)
+        self.loads += 1
+
+    def undelivered(self, branch_code: str, since_minutes: int) -> List[dict]:
+        """Same rows as EventService.get_undelivered_orders, from memory"""
+        now = datetime.utcnow()
+        since = now - timedelta(minutes=since_minutes)
+        outstanding = self._outstanding.get(branch_code)
+        if not outstanding:
+            return []
+        self._prune(outstanding)
+        return [
+            {
+                **order,
+                "created_at": order["created_at"].isoformat(),
+                "minutes_ago": int((now - order["created_at"]).total_seconds() // 60),
+            }
+            for order in outstanding.values()
+            if order["created_at"] >= since
+        ]
+
+    # ============ Other workers ============
+
+    @staticmethod
+    def _encode(event: OrderEvent) -> dict:
+        return {
+            "event_type": event.event_type,
+            "branch_code": event.branch_code,
+            "correlation_id": event.correlation_id,
+            "order_id": event.order_id,
+            "table_id": event.table_id,
+            "session_id": event.session_id,
+            "timestamp": _naive(event.timestamp).isoformat(),
+            "data": event.data,
+        }
+
+    async def _on_remote_events(self, payload: str):
+        events = []
+        for row in json.loads(payload):
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            events.append(OrderEvent(**row))
+        self.observe(events, relay=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "branches": len(self._warm),
+            "outstanding": sum(len(o) for o in self._outstanding.values()),
+            "loads": self.loads,
+        }
+
+
+# Global tracker
+delivery_tracker = DeliveryTracker()
+realtime_broker.subscribe("deliveries", delivery_tracker._on_remote_events)
@@ -89,6 +89,42 @@ async def get_session_timeline(
     return events
 
 
+@router.get("/order/{order_id}/state")
+async def get_order_state(
+    order_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Current state of an order rebuilt from its events.
+    Items, status with the time of each change, kitchen delivery.
+    """
+    service = EventService(db)
+    state = await service.get_order_state(order_id)
+
+    if state is None:
+        raise HTTPException(status_code=404, detail="No events found for this order")
+
+    return state
+
+
+@router.get("/session/{session_id}/state")
+async def get_session_state(
+    session_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Current state of a table session rebuilt from its events.
+    Orders and their status, amount of non-cancelled orders, staff calls.
+    """
+    service = EventService(db)
+    state = await service.get_session_state(session_id)
+
+    if state is None:
+        raise HTTPException(status_code=404, detail="No events found for this session")
+
+    return state
+
+
 @router.get("/correlation/{correlation_id}", response_model=list[EventResponse])
 async def get_correlation_chain(
     correlation_id: str,
@@ -115,6 +151,7 @@ async def get_correlation_chain(
 async def get_undelivered_orders(
     branch_code: str = Query(...),
     since_minutes: int = Query(5, ge=1, le=60),
+    source: str = Query("memory", pattern="^(memory|store)$"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -125,9 +162,14 @@ async def get_undelivered_orders(
     - Kitchen never received it
 
     Returns orders that have been waiting for acknowledgment.
+    source=memory answers from the delivery tracker, source=store
+    queries the event store.
     """
     service = EventService(db)
-    undelivered = await service.get_undelivered_orders(branch_code, since_minutes)
+    if source == "store":
+        undelivered = await service.get_undelivered_orders(branch_code, since_minutes)
+    else:
+        undelivered = await service.get_outstanding_orders(branch_code, since_minutes)
 
     return {
         "branch_code": branch_code,
@@ -160,6 +202,7 @@ async def get_failed_deliveries(
         "branch_code": branch_code,
         "hours": hours,
         "count": len(failures),
+        "unrecovered": sum(1 for f in failures if not f["recovered"]),
         "failures": failures
     }
 
@@ -216,7 +259,7 @@ async def event_system_health(
     ))
 
     # Get undelivered
-    undelivered = await service.get_undelivered_orders(branch_code, 5)
+    undelivered = await service.get_outstanding_orders(branch_code, 5)
 
     # Get error count
     errors = await service.get_error_summary(branch_code, 1)
@@ -3,8 +3,8 @@ Event Service - Event Sourcing Operations
 Handles event logging, querying, and replay
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, and_, or_, insert
+from sqlalchemy.orm import aliased
 from typing import Optional, List
 from datetime import datetime, timedelta
 import uuid
@@ -13,6 +13,9 @@ from app.domains.tableorder.events import (
     OrderEvent, EventType, EventSource,
     EventCreate, EventResponse, EventListResponse, EventQuery
 )
+from app.domains.tableorder.event_writer import event_writer
+from app.domains.tableorder.delivery_tracker import delivery_tracker
+from app.domains.tableorder.projections import order_projector, session_projector
 
 
 class EventService:
@@ -39,9 +42,68 @@ class EventService:
         sequence_number: Optional[int] = None,
         error_code: Optional[str] = None,
         error_message: Optional[str] = None,
+        durable: bool = False,
     ) -> OrderEvent:
-        """Log a new event to the event store"""
-        event = OrderEvent(
+        """
+        Log a new event to the event store.
+
+        When the group-commit writer is running the event is buffered and
+        written with the next batch; pass durable=True to wait for the commit.
+        Otherwise it is committed immediately on this session.
+        """
+        event = self.build_event(
+            event_type=event_type,
+            branch_code=branch_code,
+            event_source=event_source,
+            table_id=table_id,
+            session_id=session_id,
+            order_id=order_id,
+            order_item_id=order_item_id,
+            actor_type=actor_type,
+            actor_id=actor_id,
+            data=data,
+            correlation_id=correlation_id,
+            sequence_number=sequence_number,
+            error_code=error_code,
+            error_message=error_message,
+        )
+
+        if event_writer.is_running:
+            # Buffered path: id/timestamp are assigned here instead of by the DB
+            event.id = str(uuid.uuid4())
+            event.timestamp = datetime.utcnow()
+            event_writer.observe_sequence(event.correlation_id, event.sequence_number)
+            await event_writer.submit(event, durable=durable)
+            delivery_tracker.observe([event])
+            return event
+
+        self.db.add(event)
+        await self.db.commit()
+        await self.db.refresh(event)
+        delivery_tracker.observe([event])
+
+        return event
+
+    def build_event(
+        self,
+        event_type: EventType,
+        branch_code: str,
+        event_source: EventSource = EventSource.TABLE_ORDER,
+        table_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        order_id: Optional[str] = None,
+        order_item_id: Optional[str] = None,
+        actor_type: Optional[str] = None,
+        actor_id: Optional[str] = None,
+        data: dict = None,
+        correlation_id: Optional[str] = None,
+        sequence_number: Optional[int] = None,
+        error_code: Optional[str] = None,
+        error_message: Optional[str] = None,
+        client_event_id: Optional[str] = None,
+    ) -> OrderEvent:
+        """Build an (unsaved) event with the store's defaults applied"""
+        return OrderEvent(
             event_type=event_type.value,
             event_source=event_source.value,
             branch_code=branch_code,
@@ -56,13 +118,51 @@ class EventService:
             sequence_number=sequence_number or 1,
             error_code=error_code,
             error_message=error_message,
+            client_event_id=client_event_id,
         )
 
-        self.db.add(event)
+    async def log_events_bulk(self, events: List[OrderEvent]) -> int:
+        """
+        Write a batch of events in one transaction with a single executemany.
+
+        Events are deduplicated by (branch_code, client_event_id), both inside
+        the batch and against rows already stored, so clients can safely
+        retry a sync. Returns the number of rows actually inserted.
+        """
+        # Dedupe inside the batch (first occurrence wins)
+        unique: dict = {}
+        for event in events:
+            key = (event.branch_code, event.client_event_id) if event.client_event_id else id(event)
+            unique.setdefault(key, event)
+        events = list(unique.values())
+
+        # Drop events already stored by an earlier (retried) sync
+        client_ids = {e.client_event_id for e in events if e.client_event_id}
+        if client_ids:
+            result = await self.db.execute(
+                select(OrderEvent.branch_code, OrderEvent.client_event_id)
+                .where(OrderEvent.client_event_id.in_(client_ids))
+            )
+            stored = {(row.branch_code, row.client_event_id) for row in result.all()}
+            events = [e for e in events if (e.branch_code, e.client_event_id) not in stored]
+
+        if not events:
+            return 0
+
+        now = datetime.utcnow()
+        rows = []
+        for event in events:
+            event.id = event.id or str(uuid.uuid4())
+            event.timestamp = event.timestamp or now
+            rows.append(event.to_row())
+
+        # RETURNING: rows skipped by a concurrent retry are not counted
+        result = await self.db.execute(self._insert_ignoring_duplicates().returning(OrderEvent.id), rows)
+        inserted = set(result.scalars().all())
         await self.db.commit()
-        await self.db.refresh(event)
+        delivery_tracker.observe([e for e in events if e.id in inserted])
 
-        return event
+        return len(inserted)
 
     async def log_order_created(
         self,
@@ -191,49 +291,53 @@ class EventService:
 
     async def get_events(self, query: EventQuery) -> EventListResponse:
         """Query events with filters and pagination"""
-        stmt = select(OrderEvent)
-
-        # Apply filters
-        conditions = []
-        if query.branch_code:
-            conditions.append(OrderEvent.branch_code == query.branch_code)
-        if query.table_id:
-            conditions.append(OrderEvent.table_id == query.table_id)
-        if query.session_id:
-            conditions.append(OrderEvent.session_id == query.session_id)
-        if query.order_id:
-            conditions.append(OrderEvent.order_id == query.order_id)
-        if query.event_type:
-            conditions.append(OrderEvent.event_type == query.event_type)
-        if query.event_source:
-            conditions.append(OrderEvent.event_source == query.event_source)
-        if query.correlation_id:
-            conditions.append(OrderEvent.correlation_id == query.correlation_id)
-        if query.start_time:
-            conditions.append(OrderEvent.timestamp >= query.start_time)
-        if query.end_time:
-            conditions.append(OrderEvent.timestamp <= query.end_time)
-        if query.has_error is True:
-            conditions.append(OrderEvent.error_code.isnot(None))
-        elif query.has_error is False:
-            conditions.append(OrderEvent.error_code.is_(None))
-
-        if conditions:
-            stmt = stmt.where(and_(*conditions))
+        from app.services.event_retention import order_event_log
+
+        await self._flush_pending()
+
+        def filtered(table):
+            c = table.c
+            conditions = []
+            if query.branch_code:
+                conditions.append(c.branch_code == query.branch_code)
+            if query.table_id:
+                conditions.append(c.table_id == query.table_id)
+            if query.session_id:
+                conditions.append(c.session_id == query.session_id)
+            if query.order_id:
+                conditions.append(c.order_id == query.order_id)
+            if query.event_type:
+                conditions.append(c.event_type == query.event_type)
+            if query.event_source:
+                conditions.append(c.event_source == query.event_source)
+            if query.correlation_id:
+                conditions.append(c.correlation_id == query.correlation_id)
+            if query.start_time:
+                conditions.append(c.timestamp >= query.start_time)
+            if query.end_time:
+                conditions.append(c.timestamp <= query.end_time)
+            if query.has_error is True:
+                conditions.append(c.error_code.isnot(None))
+            elif query.has_error is False:
+                conditions.append(c.error_code.is_(None))
+            return select(table).where(*conditions)
+
+        # Live table, plus the month partitions the time range reaches
+        tables = await order_event_log.tables_for(self.db, query.start_time, query.end_time)
+        events = order_event_log.union(tables, filtered)
 
         # Get total count
-        count_stmt = select(func.count()).select_from(stmt.subquery())
+        count_stmt = select(func.count()).select_from(events)
         total = (await self.db.execute(count_stmt)).scalar() or 0
 
         # Apply pagination and ordering
-        stmt = stmt.order_by(OrderEvent.timestamp.desc())
+        stmt = select(events).order_by(events.c.timestamp.desc())
         stmt = stmt.offset((query.page - 1) * query.page_size).limit(query.page_size)
 
         result = await self.db.execute(stmt)
-        events = result.scalars().all()
 
         return EventListResponse(
-            events=[EventResponse.model_validate(e) for e in events],
+            events=[EventResponse.model_validate(dict(row._mapping)) for row in result],
             total=total,
             page=query.page,
             page_size=query.page_size
@@ -241,42 +345,39 @@ class EventService:
 
     async def get_order_timeline(self, order_id: str) -> List[EventResponse]:
         """Get complete timeline of events for an order"""
-        stmt = (
-            select(OrderEvent)
-            .where(OrderEvent.order_id == order_id)
-            .order_by(OrderEvent.timestamp.asc())
-        )
-
-        result = await self.db.execute(stmt)
-        events = result.scalars().all()
-
-        return [EventResponse.model_validate(e) for e in events]
+        return await self._timeline(lambda c: c.order_id == order_id)
 
     async def get_session_timeline(self, session_id: str) -> List[EventResponse]:
         """Get complete timeline of events for a session"""
-        stmt = (
-            select(OrderEvent)
-            .where(OrderEvent.session_id == session_id)
-            .order_by(OrderEvent.timestamp.asc())
-        )
-
-        result = await self.db.execute(stmt)
-        events = result.scalars().all()
-
-        return [EventResponse.model_validate(e) for e in events]
+        return await self._timeline(lambda c: c.session_id == session_id)
 
     async def get_correlation_chain(self, correlation_id: str) -> List[EventResponse]:
         """Get all events in a correlation chain (for tracking delivery)"""
-        stmt = (
-            select(OrderEvent)
-            .where(OrderEvent.correlation_id == correlation_id)
-            .order_by(OrderEvent.sequence_number.asc())
-        )
+        return await self._timeline(lambda c: c.correlation_id == correlation_id, by_sequence=True)
 
-        result = await self.db.execute(stmt)
-        events = result.scalars().all()
+    async def _timeline(self, condition, by_sequence: bool = False) -> List[EventResponse]:
+        """Events matching condition(columns) in every partition, oldest first"""
+        from app.services.event_retention import order_event_log
+
+        await self._flush_pending()
 
-        return [EventResponse.model_validate(e) for e in events]
+        tables = await order_event_log.tables_for(self.db)
+        events = order_event_log.union(tables, lambda t: select(t).where(condition(t.c)))
+        order = events.c.sequence_number if by_sequence else events.c.timestamp
+
+        result = await self.db.execute(select(events).order_by(order.asc()))
+
+        return [EventResponse.model_validate(dict(row._mapping)) for row in result]
+
+    async def get_order_state(self, order_id: str) -> Optional[dict]:
+        """Order state rebuilt from its events (snapshot + replay)"""
+        await self._flush_pending()
+        return await order_projector.load(self.db, order_id)
+
+    async def get_session_state(self, session_id: str) -> Optional[dict]:
+        """Session state rebuilt from its events (snapshot + replay)"""
+        await self._flush_pending()
+        return await session_projector.load(self.db, session_id)
 
     # ============ Analytics & Diagnostics ============
 
@@ -288,61 +389,75 @@ class EventService:
         """
         Find orders that were created but not acknowledged by kitchen.
         Use this to detect gateway issues.
+
+        One anti-join: ORDER_CREATED events of the window (via
+        ix_order_events_branch_type_time) with no GATEWAY_RECEIVED in
+        their correlation chain (one ix_order_events_correlation_type lookup
+        per created order).
+        delivery_tracker answers the same question from memory.
         """
-        since = datetime.utcnow() - timedelta(minutes=since_minutes)
+        await self._flush_pending()
+
+        now = datetime.utcnow()
+        since = now - timedelta(minutes=since_minutes)
 
-        # Get all ORDER_CREATED events
-        created_stmt = (
+        stmt = (
             select(OrderEvent)
             .where(
                 and_(
                     OrderEvent.branch_code == branch_code,
                     OrderEvent.event_type == EventType.ORDER_CREATED.value,
-                    OrderEvent.timestamp >= since
+                    OrderEvent.timestamp >= since,
+                    ~self._has_event(EventType.GATEWAY_RECEIVED),
                 )
             )
+            .order_by(OrderEvent.timestamp.asc())
         )
-        result = await self.db.execute(created_stmt)
-        created_events = result.scalars().all()
-
-        undelivered = []
-        for event in created_events:
-            # Check if there's a corresponding GATEWAY_RECEIVED
-            ack_stmt = (
-                select(func.count())
-                .select_from(OrderEvent)
-                .where(
-                    and_(
-                        OrderEvent.correlation_id == event.correlation_id,
-                        OrderEvent.event_type == EventType.GATEWAY_RECEIVED.value
-                    )
-                )
-            )
-            ack_count = (await self.db.execute(ack_stmt)).scalar() or 0
-
-            if ack_count == 0:
-                undelivered.append({
-                    "order_id": event.order_id,
-                    "correlation_id": event.correlation_id,
-                    "created_at": event.timestamp.isoformat(),
-                    "table_id": event.table_id,
-                    "session_id": event.session_id,
-                    "data": event.data,
-                    "minutes_ago": (datetime.utcnow() - event.timestamp.replace(tzinfo=None)).seconds // 60
-                })
+        result = await self.db.execute(stmt)
 
-        return undelivered
+        return [
+            {
+                "order_id": event.order_id,
+                "correlation_id": event.correlation_id,
+                "created_at": event.timestamp.isoformat(),
+                "table_id": event.table_id,
+                "session_id": event.session_id,
+                "data": event.data,
+                "minutes_ago": int((now - event.timestamp.replace(tzinfo=None)).total_seconds() // 60)
+            }
+            for event in result.scalars().all()
+        ]
+
+    async def get_outstanding_orders(
+        self,
+        branch_code: str,
+        since_minutes: int = 5
+    ) -> List[dict]:
+        """
+        get_undelivered_orders answered by delivery_tracker.
+        Reads the event store only the first time a branch is asked for.
+        """
+        if not delivery_tracker.is_warm(branch_code):
+            await delivery_tracker.warm(
+                branch_code, lambda minutes: self.get_undelivered_orders(branch_code, minutes)
+            )
+        return delivery_tracker.undelivered(branch_code, since_minutes)
 
     async def get_failed_deliveries(
         self,
         branch_code: str,
         hours: int = 24
-    ) -> List[EventResponse]:
-        """Get all failed gateway deliveries in the last N hours"""
+    ) -> List[dict]:
+        """
+        Get all failed gateway deliveries in the last N hours.
+        `recovered` tells whether the chain was acknowledged afterwards.
+        """
+        await self._flush_pending()
+
         since = datetime.utcnow() - timedelta(hours=hours)
 
         stmt = (
-            select(OrderEvent)
+            select(OrderEvent, self._has_event(EventType.GATEWAY_RECEIVED).label("recovered"))
             .where(
                 and_(
                     OrderEvent.branch_code == branch_code,
@@ -354,9 +469,11 @@ class EventService:
         )
 
         result = await self.db.execute(stmt)
-        events = result.scalars().all()
 
-        return [EventResponse.model_validate(e) for e in events]
+        return [
+            {**EventResponse.model_validate(event).model_dump(), "recovered": bool(recovered)}
+            for event, recovered in result.all()
+        ]
 
     async def get_error_summary(
         self,
@@ -364,6 +481,8 @@ class EventService:
         hours: int = 24
     ) -> dict:
         """Get summary of errors in the last N hours"""
+        await self._flush_pending()
+
         since = datetime.utcnow() - timedelta(hours=hours)
 
         # Count by error type
@@ -407,15 +526,60 @@ class EventService:
 
     # ============ Helpers ============
 
+    @staticmethod
+    def _has_event(event_type: EventType):
+        """EXISTS: the outer event's correlation chain contains an event of this type"""
+        other = aliased(OrderEvent)
+        return (
+            select(other.id)
+            .where(
+                and_(
+                    other.correlation_id == OrderEvent.correlation_id,
+                    other.event_type == event_type.value
+                )
+            )
+            .exists()
+        )
+
     async def _get_next_sequence(self, correlation_id: str) -> int:
         """Get next sequence number for a correlation chain"""
+        if event_writer.is_running:
+            # Assigned in-process; DB is only read for unknown chains
+            return await event_writer.next_sequence(
+                correlation_id, lambda: self._get_max_sequence(correlation_id)
+            )
+        return await self._get_max_sequence(correlation_id) + 1
+
+    async def _get_max_sequence(self, correlation_id: str) -> int:
+        """Highest stored sequence number for a correlation chain"""
         stmt = (
             select(func.max(OrderEvent.sequence_number))
             .where(OrderEvent.correlation_id == correlation_id)
         )
         result = await self.db.execute(stmt)
-        max_seq = result.scalar() or 0
-        return max_seq + 1
+        return result.scalar() or 0
+
+    def _insert_ignoring_duplicates(self):
+        """
+        INSERT that skips rows whose client_event_id is already stored.
+        Covers a concurrent retry racing past the pre-check above.
+        """
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return insert(OrderEvent)
+
+        return dialect_insert(OrderEvent).on_conflict_do_nothing(
+            index_elements=["branch_code", "client_event_id"]
+        )
+
+    async def _flush_pending(self):
+        """Make buffered events visible before reading the event store"""
+        if event_writer.is_running:
+            await event_writer.flush()
 
 
 # ============ Convenience Functions ============
@@ -0,0 +1,259 @@
+"""
+Event Writer - Group commit for the order event store
+Buffers OrderEvent rows in memory and writes them with one multi-row
+INSERT every N ms or every M events, whichever comes first.
+
+- Fire-and-forget by default: log_event returns as soon as the row is buffered
+- Durable mode: submit(..., durable=True) / flush() wait until the batch commits
+- Correlation sequence numbers are assigned in-process (LRU cache),
+  falling back to the database only for chains this process has not seen
+- A failed batch is retried with exponential backoff, then written row by
+  row; rows that still fail are appended to EVENT_DEAD_LETTER_PATH (JSON
+  lines) and counted in failed_events
+"""
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.domains.tableorder.events import OrderEvent
+
+
+class EventWriter:
+    """Asynchronous group-commit writer for OrderEvent"""
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        flush_interval_ms: int = 50,
+        max_batch: int = 200,
+        sequence_cache_size: int = 10_000,
+        retries: int = 3,
+        backoff_ms: int = 100,
+        dead_letter_path: Optional[str] = None,
+    ):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.sequence_cache_size = sequence_cache_size
+        self.retries = retries
+        self.backoff = backoff_ms / 1000
+        self.dead_letter_path = dead_letter_path
+
+        self._buffer: List[dict] = []
+        # (event id, future) resolved when the row currently in _buffer commits
+        self._waiters: List[Tuple[str, asyncio.Future]] = []
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # correlation_id -> last assigned sequence number (LRU)
+        self._sequences: "OrderedDict[str, int]" = OrderedDict()
+
+        # Counters
+        self.events_written = 0
+        self.batches_written = 0
+        self.failed_batches = 0
+        self.failed_events = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._buffer)
+
+    # ============ Lifecycle ============
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self.is_running:
+            return
+        self._task = asyncio.create_task(self._run())
+        print(f"📝 Event writer started (every {int(self.flush_interval * 1000)}ms / {self.max_batch} events)")
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        print(f"📝 Event writer stopped ({self.events_written} events in {self.batches_written} batches)")
+
+    # ============ Writing ============
+
+    async def submit(self, event: OrderEvent, durable: bool = False) -> None:
+        """
+        Buffer an event for the next batch.
+        The event must already carry its id and timestamp.
+        With durable=True, wait until the batch containing it is committed.
+        """
+        self._buffer.append(event.to_row())
+        self._pending.set()
+        if len(self._buffer) >= self.max_batch:
+            self._full.set()
+
+        if durable:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append((event.id, waiter))
+            await waiter
+
+    async def flush(self) -> None:
+        """
+        Write everything buffered so far and wait for it to commit.
+        Also waits for a batch that is already being written.
+        """
+        await self._write_batch()
+
+    async def _run(self):
+        while True:
+            await self._pending.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            # stop() cancelling the loop must not abandon a batch mid-retry
+            await asyncio.shield(self._write_batch())
+
+    async def _write_batch(self):
+        async with self._flush_lock:
+            rows, waiters = self._buffer, self._waiters
+            self._buffer, self._waiters = [], []
+            self._pending.clear()
+            self._full.clear()
+
+            if not rows:
+                return
+
+            failed = await self._insert(rows)
+            self.events_written += len(rows) - len(failed)
+            if len(failed) < len(rows):
+                self.batches_written += 1
+            for event_id, waiter in waiters:
+                if waiter.done():
+                    continue
+                if event_id in failed:
+                    waiter.set_exception(failed[event_id])
+                else:
+                    waiter.set_result(None)
+
+    async def _insert(self, rows: List[dict]) -> Dict[str, Exception]:
+        """
+        Write rows: the whole batch (retried with backoff), then row by row.
+        Returns event id -> error for the rows that could not be written.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(insert(OrderEvent), rows)
+                    await db.commit()
+                return {}
+            except IntegrityError as e:
+                error = e
+                break  # a bad row fails every retry the same way
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        self.failed_batches += 1
+        print(f"⚠️ Event batch write failed ({len(rows)} events), writing row by row: {error}")
+
+        # One bad row (or a lasting outage) must not take the rest with it
+        failed = {}
+        for row in rows:
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(insert(OrderEvent), [row])
+                    await db.commit()
+            except Exception as e:
+                failed[row["id"]] = e
+                self._dead_letter(row, e)
+        if failed:
+            self.failed_events += len(failed)
+            print(f"❌ {len(failed)} events could not be written"
+                  + (f", appended to {self.dead_letter_path}" if self.dead_letter_path else ""))
+        return failed
+
+    def _dead_letter(self, row: dict, error: Exception):
+        """Append an unwritable row to the dead-letter file (JSON lines)"""
+        if not self.dead_letter_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as out:
+                out.write(json.dumps({"row": row, "error": str(error)}, default=_encode, ensure_ascii=False))
+                out.write("\n")
+        except OSError as e:
+            print(f"❌ Dead-letter write failed for event {row['id']}: {e}")
+
+    # ============ Sequence Numbers ============
+
+    def observe_sequence(self, correlation_id: str, sequence_number: int):
+        """Record a sequence number assigned outside next_sequence (e.g. seq 1)"""
+        current = self._sequences.get(correlation_id, 0)
+        self._remember(correlation_id, max(current, sequence_number))
+
+    async def next_sequence(
+        self,
+        correlation_id: str,
+        load_max: Callable[[], Awaitable[int]],
+    ) -> int:
+        """
+        Next sequence number for a correlation chain.
+        load_max is only awaited for chains not in the cache.
+        """
+        if correlation_id not in self._sequences:
+            stored_max = await load_max()
+            # Another caller may have filled the cache while we awaited
+            current = max(self._sequences.get(correlation_id, 0), stored_max)
+        else:
+            current = self._sequences[correlation_id]
+
+        seq = current + 1
+        self._remember(correlation_id, seq)
+        return seq
+
+    def _remember(self, correlation_id: str, seq: int):
+        self._sequences[correlation_id] = seq
+        self._sequences.move_to_end(correlation_id)
+        while len(self._sequences) > self.sequence_cache_size:
+            self._sequences.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending_count,
+            "events_written": self.events_written,
+            "batches_written": self.batches_written,
+            "failed_batches": self.failed_batches,
+            "failed_events": self.failed_events,
+        }
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+# Global writer (started in app lifespan when EVENT_GROUP_COMMIT is on)
+event_writer = EventWriter(
+    flush_interval_ms=settings.EVENT_FLUSH_INTERVAL_MS,
+    max_batch=settings.EVENT_FLUSH_MAX_BATCH,
+    retries=settings.EVENT_WRITE_RETRIES,
+    backoff_ms=settings.EVENT_WRITE_BACKOFF_MS,
+    dead_letter_path=settings.EVENT_DEAD_LETTER_PATH,
+)
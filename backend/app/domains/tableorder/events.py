@@ -116,12 +116,18 @@ class OrderEvent(Base):
     error_code = Column(String(50))
     error_message = Column(Text)
 
+    # Id assigned by the client EventStore (dedup key for /events/sync retries)
+    client_event_id = Column(String(64))
+
     # Composite indexes for common queries
     __table_args__ = (
         Index('ix_order_events_session_time', 'session_id', 'timestamp'),
         Index('ix_order_events_order_time', 'order_id', 'timestamp'),
         Index('ix_order_events_correlation', 'correlation_id', 'sequence_number'),
         Index('ix_order_events_type_time', 'event_type', 'timestamp'),
+        Index('ix_order_events_branch_type_time', 'branch_code', 'event_type', 'timestamp'),
+        Index('ix_order_events_correlation_type', 'correlation_id', 'event_type'),
+        Index('ux_order_events_client_event', 'branch_code', 'client_event_id', unique=True),
     )
 
     def __repr__(self):
@@ -143,6 +149,10 @@ class OrderEvent(Base):
             "error_message": self.error_message,
         }
 
+    def to_row(self) -> dict:
+        """Column values for bulk INSERT (executemany)"""
+        return {c.key: getattr(self, c.key) for c in self.__table__.columns}
+
 
 # ============ Pydantic Schemas ============
 
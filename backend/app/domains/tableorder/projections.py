@@ -0,0 +1,413 @@
+"""
+Projections - Order and session state folded from the order event log
+
+A projection folds events, oldest first, into one JSON state per key:
+
+- OrderProjection:   per order_id   (items, status, status times, delivery)
+- SessionProjection: per session_id (orders, running amount, calls, cart)
+
+Reading a state loads its snapshot (projection_snapshots) and replays
+only the events after the snapshot position (timestamp, id). Snapshots
+are written when a replay folded more than PROJECTION_SNAPSHOT_EVERY
+events, and for every key by `python cli.py db snapshot-projections`.
+
+A snapshot only covers events older than SETTLE_SECONDS: buffered events
+are stamped before the group-commit writer stores them, so the last
+moments of the log may still gain rows with an earlier timestamp.
+"""
+import copy
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, JSON, String, and_, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.config import settings
+from app.database import Base, engine
+from app.domains.tableorder.events import EventType, OrderEvent
+
+SETTLE_SECONDS = 10
+
+# Columns the projections read (rows, not ORM objects - replay is hot)
+EVENT_COLUMNS = (
+    OrderEvent.id,
+    OrderEvent.event_type,
+    OrderEvent.timestamp,
+    OrderEvent.branch_code,
+    OrderEvent.table_id,
+    OrderEvent.session_id,
+    OrderEvent.order_id,
+    OrderEvent.order_item_id,
+    OrderEvent.data,
+)
+
+ORDER_STATUS_EVENTS = {
+    EventType.ORDER_CONFIRMED.value: "confirmed",
+    EventType.ORDER_PREPARING.value: "preparing",
+    EventType.ORDER_READY.value: "ready",
+    EventType.ORDER_SERVED.value: "served",
+    EventType.ORDER_CANCELLED.value: "cancelled",
+}
+CALL_EVENTS = {
+    EventType.CALL_STAFF.value: "staff",
+    EventType.CALL_WATER.value: "water",
+    EventType.CALL_BILL.value: "bill",
+}
+
+
+class ProjectionSnapshot(Base):
+    """Folded state of one key, up to and including the event at position"""
+    __tablename__ = "projection_snapshots"
+
+    projection = Column(String(30), primary_key=True)
+    key = Column(String(36), primary_key=True)
+    state = Column(JSON, nullable=False)
+    event_count = Column(Integer, nullable=False, default=0)
+    position_ts = Column(DateTime(timezone=True), nullable=False)
+    position_id = Column(String(36), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return ts.replace(tzinfo=None).isoformat() if ts else None
+
+
+def _order_amount(items: Iterable[dict]) -> float:
+    return round(sum(float(i.get("price") or 0) * int(i.get("quantity") or 1) for i in items), 2)
+
+
+# ============ Projections ============
+
+class Projection:
+    """Folds events into a JSON-serializable state per key"""
+
+    name: str = ""
+    key_field: str = ""  # OrderEvent column the state is kept per
+
+    @property
+    def key_column(self):
+        return getattr(OrderEvent, self.key_field)
+
+    def key_of(self, event) -> Optional[str]:
+        return getattr(event, self.key_field)
+
+    def initial(self, key: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def apply(self, state: Dict[str, Any], event) -> None:
+        """Apply one event to state in place"""
+        raise NotImplementedError
+
+
+class OrderProjection(Projection):
+    name = "order"
+    key_field = "order_id"
+
+    def initial(self, key: str) -> Dict[str, Any]:
+        return {
+            "order_id": key,
+            "branch_code": None,
+            "table_id": None,
+            "session_id": None,
+            "status": None,
+            "items": [],
+            "item_status": {},
+            "amount": 0.0,
+            "created_at": None,
+            "status_times": {},
+            "delivery": {"sent": 0, "failed": 0, "received_at": None},
+            "event_count": 0,
+            "last_event_at": None,
+        }
+
+    def apply(self, state: Dict[str, Any], event) -> None:
+        kind, at, data = event.event_type, _iso(event.timestamp), event.data or {}
+        state["event_count"] += 1
+        state["last_event_at"] = at
+        for field in ("branch_code", "table_id", "session_id"):
+            state[field] = state[field] or getattr(event, field)
+
+        if kind == EventType.ORDER_CREATED.value:
+            state["items"] = list(data.get("items", []))
+            state["amount"] = _order_amount(state["items"])
+            state["status"] = state["status"] or "pending"
+            state["created_at"] = at
+        elif kind in ORDER_STATUS_EVENTS:
+            status = ORDER_STATUS_EVENTS[kind]
+            state["status"] = status
+            state["status_times"][status] = at
+        elif kind == EventType.ITEM_STATUS_CHANGED.value and event.order_item_id:
+            state["item_status"][event.order_item_id] = data.get("new_status") or data.get("status")
+        elif kind == EventType.GATEWAY_SENT.value:
+            state["delivery"]["sent"] += 1
+        elif kind == EventType.GATEWAY_FAILED.value:
+            state["delivery"]["failed"] += 1
+        elif kind == EventType.GATEWAY_RECEIVED.value:
+            state["delivery"]["received_at"] = state["delivery"]["received_at"] or at
+        else:
+            state["event_count"] -= 1  # not part of this projection
+
+
+class SessionProjection(Projection):
+    name = "session"
+    key_field = "session_id"
+
+    def initial(self, key: str) -> Dict[str, Any]:
+        return {
+            "session_id": key,
+            "branch_code": None,
+            "table_id": None,
+            "started_at": None,
+            "ended_at": None,
+            "paid_at": None,
+            "orders": {},
+            "order_count": 0,
+            "amount": 0.0,
+            "calls": {},
+            "calls_acknowledged": 0,
+            "cart": {"added": 0, "removed": 0},
+            "event_count": 0,
+            "last_event_at": None,
+        }
+
+    def apply(self, state: Dict[str, Any], event) -> None:
+        kind, at, data = event.event_type, _iso(event.timestamp), event.data or {}
+        state["event_count"] += 1
+        state["last_event_at"] = at
+        state["branch_code"] = state["branch_code"] or event.branch_code
+        state["table_id"] = state["table_id"] or event.table_id
+        orders = state["orders"]
+
+        if kind == EventType.SESSION_STARTED.value:
+            state["started_at"] = state["started_at"] or at
+        elif kind == EventType.SESSION_ENDED.value:
+            state["ended_at"] = at
+        elif kind == EventType.SESSION_PAID.value:
+            state["paid_at"] = at
+        elif kind == EventType.ORDER_CREATED.value and event.order_id:
+            amount = _order_amount(data.get("items", []))
+            if event.order_id not in orders:
+                state["order_count"] += 1
+            previous = orders.get(event.order_id)
+            if previous and previous["status"] != "cancelled":
+                state["amount"] -= previous["amount"]
+            orders[event.order_id] = {"status": "pending", "amount": amount}
+            state["amount"] = round(state["amount"] + amount, 2)
+        elif kind in ORDER_STATUS_EVENTS and event.order_id in orders:
+            order = orders[event.order_id]
+            status = ORDER_STATUS_EVENTS[kind]
+            if status == "cancelled" and order["status"] != "cancelled":
+                state["amount"] = round(state["amount"] - order["amount"], 2)
+            elif status != "cancelled" and order["status"] == "cancelled":
+                state["amount"] = round(state["amount"] + order["amount"], 2)
+            order["status"] = status
+        elif kind in CALL_EVENTS:
+            call = CALL_EVENTS[kind]
+            state["calls"][call] = state["calls"].get(call, 0) + 1
+        elif kind == EventType.CALL_ACKNOWLEDGED.value:
+            state["calls_acknowledged"] += 1
+        elif kind == EventType.ITEM_ADDED.value:
+            state["cart"]["added"] += 1
+        elif kind == EventType.ITEM_REMOVED.value:
+            state["cart"]["removed"] += 1
+        else:
+            state["event_count"] -= 1  # not part of this projection
+
+
+# ============ Snapshot + Replay ============
+
+class Projector:
+    """Loads projected states from snapshots plus the events after them"""
+
+    def __init__(self, projection: Projection, snapshot_every: int = settings.PROJECTION_SNAPSHOT_EVERY,
+                 settle_seconds: int = SETTLE_SECONDS):
+        self.projection = projection
+        self.snapshot_every = snapshot_every
+        self.settle = timedelta(seconds=settle_seconds)
+
+        # Counters
+        self.loads = 0
+        self.events_replayed = 0
+        self.snapshots_written = 0
+
+    def settled_before(self) -> datetime:
+        return datetime.utcnow() - self.settle
+
+    async def load(self, db: AsyncSession, key: str) -> Optional[Dict[str, Any]]:
+        """Current state of key, or None if it has no events"""
+        snapshot = await db.get(ProjectionSnapshot, (self.projection.name, key))
+        if snapshot is not None:
+            state = copy.deepcopy(snapshot.state)
+            position = (snapshot.position_ts.replace(tzinfo=None), snapshot.position_id)
+        else:
+            state, position = None, None
+
+        events = (await db.execute(self._events(key, position))).all()
+        self.loads += 1
+        self.events_replayed += len(events)
+        if state is None and not events:
+            return None
+        state = state if state is not None else self.projection.initial(key)
+
+        # Settled part first - it may become the next snapshot
+        cutoff = self.settled_before()
+        settled = 0
+        while settled < len(events) and events[settled].timestamp.replace(tzinfo=None) < cutoff:
+            self.projection.apply(state, events[settled])
+            settled += 1
+        if settled >= self.snapshot_every:
+            last = events[settled - 1]
+            await self.save([(key, state, last.timestamp, last.id)])
+        for event in events[settled:]:
+            self.projection.apply(state, event)
+        return state
+
+    def _events(self, key: str, position: Optional[Tuple[datetime, str]]):
+        query = select(*EVENT_COLUMNS).where(self.projection.key_column == key)
+        if position is not None:
+            ts, event_id = position
+            query = query.where(or_(
+                OrderEvent.timestamp > ts,
+                and_(OrderEvent.timestamp == ts, OrderEvent.id > event_id),
+            ))
+        return query.order_by(OrderEvent.timestamp, OrderEvent.id)
+
+    async def save(self, snapshots: List[Tuple[str, Dict[str, Any], datetime, str]]):
+        """Upsert (key, state, position_ts, position_id) snapshots in one transaction"""
+        if not snapshots:
+            return
+        rows = [
+            {
+                "projection": self.projection.name,
+                "key": key,
+                "state": state,
+                "event_count": state["event_count"],
+                "position_ts": ts,
+                "position_id": event_id,
+            }
+            for key, state, ts, event_id in snapshots
+        ]
+        async with engine.begin() as conn:
+            insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+            stmt = insert(ProjectionSnapshot)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["projection", "key"],
+                set_={
+                    "state": stmt.excluded.state,
+                    "event_count": stmt.excluded.event_count,
+                    "position_ts": stmt.excluded.position_ts,
+                    "position_id": stmt.excluded.position_id,
+                    "updated_at": func.now(),
+                },
+            )
+            await conn.execute(stmt, rows)
+        self.snapshots_written += len(rows)
+
+    async def snapshot_range(self, db: AsyncSession, start: datetime, end: datetime,
+                             chunk_size: int = 500) -> int:
+        """
+        Snapshot every key with events in [start, end), as of `end`.
+        Used before those events leave the live table (event_retention).
+        """
+        key_column = self.projection.key_column
+        keys = (await db.execute(
+            select(key_column).where(and_(
+                key_column.isnot(None), OrderEvent.timestamp >= start, OrderEvent.timestamp < end,
+            )).distinct()
+        )).scalars().all()
+
+        written = 0
+        for index in range(0, len(keys), chunk_size):
+            chunk = keys[index:index + chunk_size]
+            snapshots = {
+                s.key: s for s in (await db.execute(
+                    select(ProjectionSnapshot).where(and_(
+                        ProjectionSnapshot.projection == self.projection.name,
+                        ProjectionSnapshot.key.in_(chunk),
+                    ))
+                )).scalars()
+            }
+            events = await db.execute(
+                select(*EVENT_COLUMNS)
+                .where(and_(key_column.in_(chunk), OrderEvent.timestamp < end))
+                .order_by(OrderEvent.timestamp, OrderEvent.id)
+            )
+
+            states: Dict[str, Dict[str, Any]] = {}
+            positions: Dict[str, Optional[Tuple[datetime, str]]] = {}
+            changed = set()
+            for event in events:
+                key = self.projection.key_of(event)
+                if key not in states:
+                    snapshot = snapshots.get(key)
+                    states[key] = copy.deepcopy(snapshot.state) if snapshot else self.projection.initial(key)
+                    positions[key] = (
+                        (snapshot.position_ts.replace(tzinfo=None), snapshot.position_id) if snapshot else None
+                    )
+                position = (event.timestamp.replace(tzinfo=None), event.id)
+                if positions[key] is not None and position <= positions[key]:
+                    continue  # already in the snapshot
+                self.projection.apply(states[key], event)
+                positions[key] = position
+                changed.add(key)
+
+            await self.save([(key, states[key], *positions[key]) for key in changed])
+            written += len(changed)
+        return written
+
+    async def rebuild(self, db: AsyncSession, branch_code: Optional[str] = None,
+                      batch_size: int = 2000) -> Dict[str, Any]:
+        """Replay the whole (settled) log from scratch and snapshot every key"""
+        cutoff = self.settled_before()
+        query = (
+            select(*EVENT_COLUMNS)
+            .where(and_(self.projection.key_column.isnot(None), OrderEvent.timestamp < cutoff))
+            .order_by(OrderEvent.timestamp, OrderEvent.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if branch_code:
+            query = query.where(OrderEvent.branch_code == branch_code)
+
+        states: Dict[str, Dict[str, Any]] = {}
+        positions: Dict[str, Tuple[datetime, str]] = {}
+        count = 0
+        started = datetime.utcnow()
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            for event in partition:
+                key = self.projection.key_of(event)
+                state = states.get(key)
+                if state is None:
+                    state = states[key] = self.projection.initial(key)
+                self.projection.apply(state, event)
+                positions[key] = (event.timestamp, event.id)
+                count += 1
+        replay_seconds = (datetime.utcnow() - started).total_seconds()
+
+        snapshots = [(key, states[key], *positions[key]) for key in states]
+        for start in range(0, len(snapshots), batch_size):
+            await self.save(snapshots[start:start + batch_size])
+
+        self.events_replayed += count
+        return {
+            "projection": self.projection.name,
+            "events": count,
+            "keys": len(states),
+            "seconds": replay_seconds,
+            "events_per_second": count / replay_seconds if replay_seconds else 0.0,
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "loads": self.loads,
+            "events_replayed": self.events_replayed,
+            "snapshots_written": self.snapshots_written,
+        }
+
+
+# Global projectors
+order_projector = Projector(OrderProjection())
+session_projector = Projector(SessionProjection())
+PROJECTORS = {p.projection.name: p for p in (order_projector, session_projector)}
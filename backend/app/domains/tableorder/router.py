@@ -4,7 +4,7 @@ Team: table-order
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 from typing import Optional, Any
@@ -20,6 +20,7 @@ from app.domains.shared.models import MenuItem, Table
 from app.domains.tableorder.events import EventType, EventSource
 from app.routers.websocket import broadcast_order_event
 from app.domains.tableorder.event_service import EventService
+from app.services.counters import next_order_number
 
 router = APIRouter()
 
@@ -91,19 +92,15 @@ async def create_order(
     """Create a new order from table"""
     event_service = EventService(db)
 
-    # Get next order number for this session
-    result = await db.execute(
-        select(func.max(Order.order_number))
-        .where(Order.session_id == order_data.session_id)
-    )
-    max_num = result.scalar() or 0
+    # Next order number of this session (atomic counter, no MAX scan)
+    order_number = await next_order_number(db, order_data.session_id)
 
     # Create order
     order = Order(
         branch_code=order_data.branch_code,
         table_id=order_data.table_id,
         session_id=order_data.session_id,
-        order_number=max_num + 1,
+        order_number=order_number,
         status=OrderStatus.PENDING.value
     )
 
@@ -343,7 +340,7 @@ async def call_staff(
 
 class ClientEvent(BaseModel):
     """Single event from frontend EventStore"""
-    id: str
+    id: str = Field(min_length=1, max_length=64)
     type: str
     source: str = "customer"
     ts: float                     # Unix epoch ms from Date.now()
@@ -361,6 +358,7 @@ class EventSyncRequest(BaseModel):
 class EventSyncResponse(BaseModel):
     received: int
     synced_ids: list[str]
+    duplicates: int = 0
 
 
 # Map frontend event type strings → backend EventType enum
@@ -390,19 +388,22 @@ async def sync_events(
     Batch-ingest behaviour events from the frontend EventStore.
     Accepts up to 200 events per request.
     Unknown event types are stored as SESSION_LOG.
+
+    The whole batch is written in one transaction. Events already stored
+    (tablet retried after a dropped response) are skipped but still
+    reported as synced so the client can clear them.
     """
     event_service = EventService(db)
-    synced: list[str] = []
-
-    for ce in payload.events[:200]:
-        backend_type = _CLIENT_EVENT_MAP.get(ce.type, EventType.SESSION_LOG)
+    batch = payload.events[:200]
 
-        await event_service.log_event(
-            event_type=backend_type,
+    events = [
+        event_service.build_event(
+            event_type=_CLIENT_EVENT_MAP.get(ce.type, EventType.SESSION_LOG),
             event_source=EventSource.TABLE_ORDER,
             branch_code=branch_code,
             table_id=ce.table_id or payload.table_id,
             session_id=ce.session_id,
+            client_event_id=ce.id,
             data={
                 "client_event_type": ce.type,
                 "client_event_id": ce.id,
@@ -410,9 +411,16 @@ async def sync_events(
                 **ce.data,
             },
         )
-        synced.append(ce.id)
-
-    return EventSyncResponse(received=len(synced), synced_ids=synced)
+        for ce in batch
+    ]
+    written = await event_service.log_events_bulk(events)
+
+    synced = list(dict.fromkeys(ce.id for ce in batch))
+    return EventSyncResponse(
+        received=len(synced),
+        synced_ids=synced,
+        duplicates=len(batch) - written,
+    )
 
 
 # Session endpoints
@@ -7,10 +7,15 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
 from app.database import init_db
 from app.services.notification_service import notification_manager
+from app.domains.tableorder.event_writer import event_writer
+from app.services.broker import realtime_broker
+from app.services.counters import counters
+from app.routers.websocket import manager as ws_manager
 
 
 def setup_signal_handlers():
@@ -46,10 +51,23 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize database
     await init_db()
     print("🍖 Database initialized")
+    await ws_manager.load_branches()
+    if settings.EVENT_GROUP_COMMIT:
+        await event_writer.start()
+    # Cross-worker relay for WebSocket/SSE broadcasts
+    await realtime_broker.start()
     yield
-    # Shutdown: Close SSE connections first
+    # Shutdown: Close SSE connections and WebSocket writers first
     print("👋 Shutting down...")
     await notification_manager.shutdown()
+    await ws_manager.shutdown()
+    # Invalidations committed just before shutdown still reach the other workers
+    await realtime_broker.drain()
+    await realtime_broker.stop()
+    # Write any buffered order events
+    await event_writer.stop()
+    # Hand back reserved but unused order/queue numbers
+    await counters.release()
     print("✅ Graceful shutdown complete")
 
 
@@ -93,6 +111,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics - opt-in (METRICS_ENABLED=true)
+if settings.METRICS_ENABLED:
+    from app.metrics import MetricsMiddleware, instrument_serialization, metrics_registry
+
+    instrument_serialization()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(
+            metrics_registry.render_prometheus(),
+            media_type="text/plain; version=0.0.4",
+        )
+
 
 @app.get("/")
 async def root():
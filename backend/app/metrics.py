@@ -0,0 +1,248 @@
+"""
+Metrics - Per-route SQL and latency instrumentation
+Opt-in via settings.METRICS_ENABLED
+
+Collects for every HTTP request:
+- number of SQL statements and time spent in the database
+- time spent serializing the response model
+- total latency
+
+Exposed as Prometheus text (/metrics) and as a Server-Timing header.
+"""
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label for requests that did not match an API route (static mounts, 404s)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass
+class RequestStats:
+    """Counters for the request currently being handled"""
+    statements: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+
+
+@dataclass
+class RouteMetrics:
+    """Aggregated counters for one (method, route) pair"""
+    requests: int = 0
+    statements: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    latency_buckets: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    status_codes: Dict[int, int] = field(default_factory=dict)
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats for the request running in this context (None outside a request)"""
+    return _current_stats.get()
+
+
+class MetricsRegistry:
+    """In-process store of per-route metrics"""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        # Extra sources of Prometheus lines (e.g. WebSocket fan-out)
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        """Add a callable returning extra exposition lines"""
+        self._collectors.append(collector)
+
+    def record(self, method: str, route: str, status_code: int, stats: RequestStats, latency: float):
+        metrics = self._routes.setdefault((method, route), RouteMetrics())
+        metrics.requests += 1
+        metrics.statements += stats.statements
+        metrics.db_seconds += stats.db_seconds
+        metrics.serialization_seconds += stats.serialization_seconds
+        metrics.latency_seconds += latency
+        metrics.status_codes[status_code] = metrics.status_codes.get(status_code, 0) + 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                metrics.latency_buckets[i] += 1
+
+    def reset(self):
+        self._routes.clear()
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        routes = sorted(self._routes.items())
+
+        header("yakiniku_http_requests_total", "counter", "HTTP requests by route and status")
+        for (method, route), m in routes:
+            for status_code, count in sorted(m.status_codes.items()):
+                labels = format_labels(method=method, route=route, status=str(status_code))
+                lines.append(f"yakiniku_http_requests_total{{{labels}}} {count}")
+
+        header("yakiniku_http_request_duration_seconds", "histogram", "Total request latency")
+        for (method, route), m in routes:
+            for bound, count in zip(LATENCY_BUCKETS, m.latency_buckets):
+                labels = format_labels(method=method, route=route, le=_format_float(bound))
+                lines.append(f"yakiniku_http_request_duration_seconds_bucket{{{labels}}} {count}")
+            labels = format_labels(method=method, route=route, le="+Inf")
+            lines.append(f"yakiniku_http_request_duration_seconds_bucket{{{labels}}} {m.requests}")
+            labels = format_labels(method=method, route=route)
+            lines.append(f"yakiniku_http_request_duration_seconds_sum{{{labels}}} {_format_float(m.latency_seconds)}")
+            lines.append(f"yakiniku_http_request_duration_seconds_count{{{labels}}} {m.requests}")
+
+        header("yakiniku_db_statements_total", "counter", "SQL statements executed while handling requests")
+        for (method, route), m in routes:
+            lines.append(f"yakiniku_db_statements_total{{{format_labels(method=method, route=route)}}} {m.statements}")
+
+        header("yakiniku_db_duration_seconds_total", "counter", "Time spent executing SQL statements")
+        for (method, route), m in routes:
+            lines.append(
+                f"yakiniku_db_duration_seconds_total{{{format_labels(method=method, route=route)}}} "
+                f"{_format_float(m.db_seconds)}"
+            )
+
+        header("yakiniku_serialization_duration_seconds_total", "counter", "Time spent serializing responses")
+        for (method, route), m in routes:
+            lines.append(
+                f"yakiniku_serialization_duration_seconds_total{{{format_labels(method=method, route=route)}}} "
+                f"{_format_float(m.serialization_seconds)}"
+            )
+
+        for collector in self._collectors:
+            lines.extend(collector())
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(**labels: str) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+# Global registry
+metrics_registry = MetricsRegistry()
+
+
+# ============================================
+# SQLALCHEMY HOOKS
+# ============================================
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement executed on an (async) engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += time.perf_counter() - started
+
+
+# ============================================
+# FASTAPI HOOKS
+# ============================================
+
+def instrument_serialization() -> None:
+    """
+    Time FastAPI's response-model serialization.
+    fastapi.routing looks serialize_response up at call time, so wrapping
+    the module attribute covers every route.
+    """
+    from fastapi import routing
+
+    original = routing.serialize_response
+    if getattr(original, "_instrumented", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.serialization_seconds += time.perf_counter() - started
+
+    serialize_response._instrumented = True
+    routing.serialize_response = serialize_response
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records per-route metrics and adds a
+    Server-Timing header (db, ser, total) to every HTTP response.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, elapsed).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            route = scope.get("route")
+            self.registry.record(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                stats,
+                time.perf_counter() - started,
+            )
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries", '
+        f"ser;dur={stats.serialization_seconds * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
@@ -11,6 +11,7 @@ from app.models.menu import MenuItem, MenuCategory
 from app.models.order import Order, OrderItem, TableSession, OrderStatus
 from app.models.staff import Staff, StaffRole
 from app.models.user import User, UserRole
+from app.models.counter import Counter
 
 # New enhanced menu models
 from app.models.category import ItemCategory
@@ -66,4 +67,7 @@ __all__ = [
     # Users (app operators)
     "User",
     "UserRole",
+
+    # Sequences
+    "Counter",
 ]
@@ -0,0 +1,16 @@
+"""
+Counter Model - Atomic number sequences (order numbers, queue numbers)
+"""
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class Counter(Base):
+    """Last number handed out for a scope, e.g. "order:<session_id>" or "queue:hirama:2026-10-18" """
+    __tablename__ = "counters"
+
+    scope = Column(String(100), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -31,6 +31,9 @@ class MenuItem(Base):
     name_en = Column(String(100))                       # Premium Harami
     description = Column(Text)                          # 説明
 
+    # Catalog item this entry bills as (combos / promotions key on items.id)
+    item_id = Column(String(36), index=True)            # item-003; no FK for demo mode
+
     # Category & Display
     category = Column(String(30), nullable=False, index=True)  # meat, drinks, etc.
     subcategory = Column(String(50))                    # beef, pork, chicken
@@ -1,7 +1,7 @@
 """
 Table Model - Restaurant table management
 """
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, Boolean, Date, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -96,7 +96,7 @@ class TableAvailability(Base):
     table_id = Column(String(36), ForeignKey("tables.id"), nullable=False)
 
     # Time slot
-    date = Column(DateTime, nullable=False, index=True)
+    date = Column(Date, nullable=False, index=True)
     time_slot = Column(String(5), nullable=False)  # "18:00"
 
     # Status
@@ -106,6 +106,7 @@ class TableAvailability(Base):
     # Composite index for fast lookup
     __table_args__ = (
         # Index for finding availability
-        # CREATE INDEX ix_availability_lookup ON table_availability(branch_code, date, time_slot, is_available)
+        Index('ix_availability_lookup', 'branch_code', 'date', 'time_slot', 'is_available'),
+        Index('ux_availability_table_slot', 'table_id', 'date', 'time_slot', unique=True),
     )
 
@@ -8,6 +8,7 @@ from typing import List
 
 from app.database import get_db
 from app.models.branch import Branch
+from app.routers.websocket import manager as ws_manager
 from app.schemas.branch import BranchCreate, BranchResponse
 
 router = APIRouter()
@@ -100,6 +101,7 @@ async def create_branch(
     db.add(db_branch)
     await db.commit()
     await db.refresh(db_branch)
+    ws_manager.known_branches.add(db_branch.code)
 
     return BranchResponse(
         id=db_branch.id,
@@ -1,18 +1,23 @@
 """
 Menu Router - Menu items API for table ordering
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
 from typing import List
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.database import get_db
 from app.models.menu import MenuItem, MenuCategory
 from app.schemas.menu import MenuItemResponse, MenuCategoryResponse, MenuResponse
+from app.services.menu_snapshot import menu_snapshots, serialize
+from app.services.catalog import catalog_cache
 
 router = APIRouter()
 
+menu_items_adapter = TypeAdapter(List[MenuItemResponse])
+
 # Category labels and icons for UI
 CATEGORY_INFO = {
     "meat": {"label": "肉類", "icon": "🥩"},
@@ -27,68 +32,91 @@ CATEGORY_INFO = {
 
 @router.get("", response_model=List[MenuItemResponse])
 async def get_menu_items(
+    request: Request,
     branch_code: str = "hirama",
     category: str = None,
     available_only: bool = True,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all menu items for a branch"""
-    query = select(MenuItem).where(MenuItem.branch_code == branch_code)
+    """Get all menu items for a branch (cached snapshot, ETag / 304)"""
 
-    if category:
-        query = query.where(MenuItem.category == category)
+    async def build() -> bytes:
+        query = select(MenuItem).where(MenuItem.branch_code == branch_code)
 
-    if available_only:
-        query = query.where(MenuItem.is_available == True)
+        if category:
+            query = query.where(MenuItem.category == category)
 
-    query = query.order_by(MenuItem.category, MenuItem.display_order, MenuItem.name)
+        if available_only:
+            query = query.where(MenuItem.is_available == True)
 
-    result = await db.execute(query)
-    items = result.scalars().all()
+        query = query.order_by(MenuItem.category, MenuItem.display_order, MenuItem.name)
 
-    return items
+        result = await db.execute(query)
+        items = result.scalars().all()
+
+        return serialize(menu_items_adapter.dump_python(
+            menu_items_adapter.validate_python(items, from_attributes=True), mode="json"
+        ))
+
+    view = f"items:{category or '*'}:{int(available_only)}"
+    snapshot = await menu_snapshots.get(branch_code, view, build)
+    return snapshot.to_response(request)
 
 
 @router.get("/categories", response_model=MenuResponse)
 async def get_menu_by_category(
+    request: Request,
     branch_code: str = "hirama",
     db: AsyncSession = Depends(get_db)
 ):
-    """Get menu items grouped by category"""
-    query = select(MenuItem).where(
-        MenuItem.branch_code == branch_code,
-        MenuItem.is_available == True
-    ).order_by(MenuItem.category, MenuItem.display_order)
-
-    result = await db.execute(query)
-    items = result.scalars().all()
-
-    # Group by category
-    categories_dict = {}
-    for item in items:
-        cat = item.category
-        if cat not in categories_dict:
-            info = CATEGORY_INFO.get(cat, {"label": cat, "icon": "📦"})
-            categories_dict[cat] = {
-                "category": cat,
-                "category_label": info["label"],
-                "icon": info["icon"],
-                "items": []
-            }
-        categories_dict[cat]["items"].append(item)
-
-    # Maintain order
-    category_order = ["meat", "drinks", "salad", "rice", "side", "dessert", "set"]
-    categories = []
-    for cat in category_order:
-        if cat in categories_dict:
-            categories.append(MenuCategoryResponse(**categories_dict[cat]))
-
-    return MenuResponse(
-        branch_code=branch_code,
-        categories=categories,
-        updated_at=datetime.now()
-    )
+    """Get menu items grouped by category (cached snapshot, ETag / 304)"""
+
+    async def build() -> bytes:
+        query = select(MenuItem).where(
+            MenuItem.branch_code == branch_code,
+            MenuItem.is_available == True
+        ).order_by(MenuItem.category, MenuItem.display_order)
+
+        result = await db.execute(query)
+        items = result.scalars().all()
+
+        # Group by category
+        categories_dict = {}
+        for item in items:
+            cat = item.category
+            if cat not in categories_dict:
+                info = CATEGORY_INFO.get(cat, {"label": cat, "icon": "📦"})
+                categories_dict[cat] = {
+                    "category": cat,
+                    "category_label": info["label"],
+                    "icon": info["icon"],
+                    "items": []
+                }
+            categories_dict[cat]["items"].append(MenuItemResponse.model_validate(item))
+
+        # Maintain order
+        category_order = ["meat", "drinks", "salad", "rice", "side", "dessert", "set"]
+        categories = []
+        for cat in category_order:
+            if cat in categories_dict:
+                categories.append(MenuCategoryResponse(**categories_dict[cat]))
+
+        # Last menu change, not build time: the body (and ETag) must be the
+        # same on every worker and every rebuild of unchanged data
+        updated_at = (await db.execute(
+            select(func.max(func.coalesce(MenuItem.updated_at, MenuItem.created_at)))
+            .where(MenuItem.branch_code == branch_code)
+        )).scalar()
+
+        menu = MenuResponse(
+            branch_code=branch_code,
+            categories=categories,
+            updated_at=updated_at or datetime.fromtimestamp(0, timezone.utc)
+        )
+        return serialize(menu.model_dump(mode="json"))
+
+    snapshot = await menu_snapshots.get(branch_code, "categories", build)
+    return snapshot.to_response(request)
 
 
 @router.get("/popular", response_model=List[MenuItemResponse])
@@ -110,6 +138,40 @@ async def get_popular_items(
     return items
 
 
+@router.get("/catalog")
+async def get_catalog(
+    branch_code: str = "hirama",
+    available_only: bool = True,
+    db: AsyncSession = Depends(get_db)
+):
+    """Enhanced items with their option groups and combos (in-memory read model)"""
+    catalog = await catalog_cache.get(db, branch_code)
+    return {
+        "branch_code": branch_code,
+        "items": catalog.all_items(available_only),
+    }
+
+
+@router.get("/catalog/{item_id}")
+async def get_catalog_item(
+    item_id: str,
+    branch_code: str = "hirama",
+    at: datetime = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """One enhanced item with options, combos, and the combos valid now (or at `at`)"""
+    catalog = await catalog_cache.get(db, branch_code)
+    item = catalog.item(item_id)
+
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    return {
+        **item,
+        "eligible_combo_ids": [c["id"] for c in catalog.eligible_combos(item_id, at)],
+    }
+
+
 @router.get("/{item_id}", response_model=MenuItemResponse)
 async def get_menu_item(
     item_id: str,
@@ -1,59 +1,109 @@
 """
 Notification Router - SSE endpoint for real-time notifications
 """
-from fastapi import APIRouter, Request, Query
+from fastapi import APIRouter, Request, Query, Header
+from typing import Optional
 from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+import anyio
 import asyncio
 
-from app.services.notification_service import notification_manager
+from app.config import settings
+from app.services.notification_service import notification_manager, STREAM_OVERFLOW
 
 router = APIRouter()
 
+CONNECTED_EVENT = "event: connected\ndata: {\"status\": \"connected\"}\n\n"
+SHUTDOWN_EVENT = "event: shutdown\ndata: {\"status\": \"server_shutdown\"}\n\n"
+KEEPALIVE_COMMENT = ": keepalive\n\n"
+# Missed notifications are no longer buffered - the client should reload its data
+RESET_EVENT = "event: reset\ndata: {\"status\": \"replay_unavailable\"}\n\n"
 
-async def event_generator(request: Request, branch_code: str):
-    """Generate SSE events for connected clients"""
-    queue = await notification_manager.connect(branch_code)
+
+class SSEStreamResponse(StreamingResponse):
+    """
+    StreamingResponse that always watches for client disconnect.
+    Starlette skips the disconnect listener on ASGI spec >= 2.4 and only
+    notices a gone client when a write fails; for an idle SSE stream that
+    would be the next keepalive. Racing the stream against receive() here
+    cancels the generator as soon as the client goes away.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async with anyio.create_task_group() as task_group:
+
+            async def wrap(func):
+                await func()
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(wrap, lambda: self.stream_response(send))
+            await wrap(lambda: self.listen_for_disconnect(receive))
+
+        if self.background is not None:
+            await self.background()
+
+
+async def event_generator(branch_code: str, keepalive: float = None, last_event_id: int = None):
+    """
+    Generate SSE events for a connected client.
+
+    Sleeps until a notification arrives, the server shuts down, or the
+    keepalive interval passes - no periodic polling. Client disconnects
+    cancel the generator (see SSEStreamResponse).
+
+    With last_event_id (a reconnecting EventSource), the notifications
+    missed since then are replayed first.
+    """
+    keepalive = keepalive or settings.SSE_KEEPALIVE_SECONDS
+    queue, missed = await notification_manager.resume(branch_code, last_event_id)
+    shutdown = asyncio.ensure_future(notification_manager.shutdown_event.wait())
+    next_item = None
 
     try:
         # Send initial connection message
-        yield "event: connected\ndata: {\"status\": \"connected\"}\n\n"
+        yield CONNECTED_EVENT
 
-        while True:
-            # Check if server is shutting down (checked frequently)
-            if notification_manager.shutdown_event.is_set():
-                yield "event: shutdown\ndata: {\"status\": \"server_shutdown\"}\n\n"
-                break
-
-            # Check if client disconnected
-            try:
-                if await request.is_disconnected():
-                    break
-            except asyncio.CancelledError:
-                # Server shutting down - exit gracefully
-                break
+        if missed is None:
+            yield RESET_EVENT
+        else:
+            for notification in missed:
+                yield notification.to_sse()
 
-            try:
-                # Wait for notification with SHORT timeout for responsive shutdown
-                notification = await asyncio.wait_for(
-                    queue.get(),
-                    timeout=1.0  # Check shutdown every 1 second
+        while not shutdown.done():
+            # Drain bursts without creating tasks
+            if next_item is None and not queue.empty():
+                notification = queue.get_nowait()
+            else:
+                if next_item is None:
+                    next_item = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    (next_item, shutdown),
+                    timeout=keepalive,
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-                # None means shutdown signal
-                if notification is None:
-                    yield "event: shutdown\ndata: {\"status\": \"server_shutdown\"}\n\n"
-                    break
-                yield notification.to_sse()
-            except asyncio.TimeoutError:
-                # Every 30 timeouts (~30 seconds), send keepalive
-                pass
-            except asyncio.CancelledError:
-                # Server shutting down - exit gracefully
+                if next_item not in done:
+                    if not done:
+                        yield KEEPALIVE_COMMENT
+                    continue
+                notification, next_item = next_item.result(), None
+
+            # None means shutdown signal
+            if notification is None:
                 break
+            # Queue overflowed: end the stream, the browser reconnects with Last-Event-ID
+            if notification is STREAM_OVERFLOW:
+                return
+            yield notification.to_sse()
+
+        yield SHUTDOWN_EVENT
 
     except asyncio.CancelledError:
-        # Outer catch for any remaining CancelledError
+        # Client disconnected or server shutting down - exit gracefully
         pass
     finally:
+        for task in (next_item, shutdown):
+            if task is not None:
+                task.cancel()
         try:
             await notification_manager.disconnect(branch_code, queue)
         except asyncio.CancelledError:
@@ -65,10 +115,17 @@ async def event_generator(request: Request, branch_code: str):
 async def notification_stream(
     request: Request,
     branch_code: str = Query(default="hirama"),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    last_event_id_param: Optional[str] = Query(default=None, alias="last_event_id"),
 ):
     """
     SSE endpoint for real-time notifications.
 
+    Every notification carries an `id:`. A reconnecting EventSource sends
+    it back as the Last-Event-ID header (or ?last_event_id=) and receives
+    the notifications it missed; if they are no longer buffered it gets a
+    `reset` event and should reload.
+
     Connect to this endpoint to receive notifications:
     - new_booking: New booking created
     - booking_cancelled: Booking cancelled
@@ -84,8 +141,12 @@ async def notification_stream(
     };
     ```
     """
-    return StreamingResponse(
-        event_generator(request, branch_code),
+    resume_from = last_event_id or last_event_id_param
+    return SSEStreamResponse(
+        event_generator(
+            branch_code,
+            last_event_id=int(resume_from) if resume_from and resume_from.isdigit() else None,
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -103,4 +164,5 @@ async def get_connected_clients(
     return {
         "branch_code": branch_code,
         "connected_clients": notification_manager.get_client_count(branch_code),
+        "stats": notification_manager.get_stats(),
     }
@@ -3,9 +3,10 @@ Orders Router - Table ordering API
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from typing import List
 from datetime import datetime
+from decimal import Decimal
 import uuid
 
 from app.database import get_db
@@ -19,6 +20,8 @@ from app.schemas.order import (
     StaffCallRequest
 )
 from app.services.notification_service import notification_manager, Notification, NotificationType
+from app.services.order_loader import OrderLoader
+from app.services.counters import next_order_number
 
 router = APIRouter()
 
@@ -92,37 +95,29 @@ async def get_session_summary(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    loader = OrderLoader(db)
+
     # Get table
-    result = await db.execute(select(Table).where(Table.id == session.table_id))
-    table = result.scalar_one_or_none()
+    table = await loader.get_table(session.table_id)
 
-    # Get all orders for this session
-    result = await db.execute(
+    # Get all orders for this session (items bulk-loaded)
+    orders = await loader.load_orders(
         select(Order).where(Order.session_id == session_id).order_by(Order.order_number)
     )
-    orders = result.scalars().all()
 
-    # Load items for each order
-    orders_with_items = []
-    subtotal = 0
+    subtotal = Decimal("0")
     for order in orders:
-        result = await db.execute(
-            select(OrderItem).where(OrderItem.order_id == order.id)
-        )
-        order.items = result.scalars().all()
-        orders_with_items.append(order)
-
         for item in order.items:
             subtotal += item.item_price * item.quantity
 
-    tax = subtotal * 0.1  # 10% tax
+    tax = subtotal * Decimal("0.1")  # 10% tax
 
     return TableSessionSummary(
         session_id=session_id,
         table_number=table.table_number if table else "?",
         guest_count=session.guest_count,
         started_at=session.started_at,
-        orders=orders_with_items,
+        orders=orders,
         subtotal=subtotal,
         tax=tax,
         total=subtotal + tax
@@ -144,6 +139,9 @@ async def create_order(
     )
     session = result.scalar_one_or_none()
 
+    # Next order number for this session - before any flush below
+    order_number = await next_order_number(db, order_data.session_id)
+
     if not session:
         # Auto-create a session for this table
         # First check if there's an active session for this table
@@ -166,19 +164,13 @@ async def create_order(
             db.add(session)
             await db.flush()
 
-    # Get next order number for this session
-    result = await db.execute(
-        select(func.count(Order.id)).where(Order.session_id == order_data.session_id)
-    )
-    order_count = result.scalar() or 0
-
     # Create order
     order = Order(
         id=str(uuid.uuid4()),
         branch_code=branch_code,
         table_id=order_data.table_id,
         session_id=order_data.session_id,
-        order_number=order_count + 1,
+        order_number=order_number,
         status=OrderStatus.PENDING.value
     )
     db.add(order)
@@ -258,15 +250,8 @@ async def get_orders(
 
     query = query.order_by(Order.created_at.desc())
 
-    result = await db.execute(query)
-    orders = result.scalars().all()
-
-    # Load items for each order
-    for order in orders:
-        result = await db.execute(select(OrderItem).where(OrderItem.order_id == order.id))
-        order.items = result.scalars().all()
-
-    return orders
+    # Items for all orders in one query
+    return await OrderLoader(db).load_orders(query)
 
 
 @router.get("/kitchen", response_model=List[OrderKitchen])
@@ -281,18 +266,16 @@ async def get_kitchen_orders(
         Order.status.in_(status)
     ).order_by(Order.created_at)
 
-    result = await db.execute(query)
-    orders = result.scalars().all()
+    loader = OrderLoader(db)
+    orders = await loader.load_orders(query)
+
+    # Tables for all orders in one query
+    tables = await loader.load_tables(o.table_id for o in orders)
 
     kitchen_orders = []
     for order in orders:
-        # Load items
-        result = await db.execute(select(OrderItem).where(OrderItem.order_id == order.id))
-        items = result.scalars().all()
-
-        # Get table number
-        result = await db.execute(select(Table).where(Table.id == order.table_id))
-        table = result.scalar_one_or_none()
+        items = order.items
+        table = tables.get(order.table_id)
 
         # Calculate elapsed time
         elapsed = (datetime.now() - order.created_at.replace(tzinfo=None)).total_seconds() / 60
@@ -11,7 +11,8 @@ from pydantic import BaseModel
 from app.database import get_db
 from app.models.table import Table, TableAssignment, TableStatus, TableType
 from app.models.booking import Booking
-from app.services.table_optimization import TableOptimizationService
+from app.services.table_optimization import TableOptimizationService, OptimizationStrategy
+from app.services.availability_projection import AvailabilityProjection
 
 
 router = APIRouter()
@@ -324,9 +325,9 @@ async def check_table_availability(
     guests: int = Query(...),
     db: AsyncSession = Depends(get_db),
 ):
-    """Check if tables are available and get suggestions"""
+    """Check if tables are available and get suggestions (reads the availability projection)"""
     optimizer = TableOptimizationService(db, branch_code)
-    result = await optimizer.check_availability(guests, booking_date, time_slot)
+    result = await optimizer.check_projected_availability(guests, booking_date, time_slot)
 
     return {
         "available": result["available"],
@@ -351,6 +352,42 @@ async def check_table_availability(
     }
 
 
+@router.get("/availability")
+async def get_table_availability(
+    branch_code: str = Query(default="hirama"),
+    booking_date: date = Query(...),
+    time_slot: Optional[str] = Query(default=None),
+    guests: int = Query(default=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """Free tables from the availability projection, for one slot or the whole day"""
+    projection = AvailabilityProjection(db, branch_code)
+
+    if time_slot:
+        slots = {time_slot: await projection.free_tables(booking_date, time_slot, guests)}
+    else:
+        slots = await projection.open_slots(booking_date, guests)
+
+    return {
+        "date": booking_date.isoformat(),
+        "slots": [
+            {
+                "time_slot": slot,
+                "tables": [
+                    {
+                        "id": t.id,
+                        "table_number": t.table_number,
+                        "capacity": t.max_capacity,
+                        "zone": t.zone,
+                    }
+                    for t in tables
+                ],
+            }
+            for slot, tables in slots.items()
+        ],
+    }
+
+
 @router.post("/optimization/assign/{booking_id}")
 async def assign_table_to_booking(
     booking_id: str,
@@ -402,6 +439,25 @@ async def assign_table_to_booking(
     }
 
 
+@router.post("/optimization/batch")
+async def optimize_evening_assignments(
+    branch_code: str = Query(default="hirama"),
+    target_date: date = Query(default=None),
+    strategy: OptimizationStrategy = Query(default=OptimizationStrategy.MINIMIZE_WASTE),
+    apply: bool = Query(default=False),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Re-plan table assignments for every pending/confirmed booking of a day.
+    Returns the proposed reassignments; apply=true writes them.
+    """
+    if target_date is None:
+        target_date = date.today()
+
+    optimizer = TableOptimizationService(db, branch_code)
+    return await optimizer.optimize_evening(target_date, strategy, apply=apply)
+
+
 # ============================================
 # SEED DATA FOR TESTING
 # ============================================
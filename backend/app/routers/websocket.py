@@ -2,22 +2,198 @@
 WebSocket Router for Real-time Dashboard Communication
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
-from typing import Dict, Set
+from typing import Dict, Set, Optional, Any, Deque, Tuple, List
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
 import json
 import asyncio
+import time
 from datetime import datetime
 
+from app.config import settings
+from app.metrics import format_labels, metrics_registry
+from app.services.broker import Broker, realtime_broker
+from app.services.encoding import EncodedMessage, dumps, encode
+
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
 
+class SlowConsumerPolicy(str, Enum):
+    """What to do when a connection's outbound queue is full"""
+    DROP_OLDEST = "drop_oldest"   # Discard the oldest queued message
+    COALESCE = "coalesce"         # Replace a queued message with the same key, else drop oldest
+    DISCONNECT = "disconnect"     # Close the slow connection
+
+
+@dataclass
+class BranchFanoutStats:
+    """Delivery counters for one branch"""
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    send_errors: int = 0
+    slow_disconnects: int = 0
+    latency_total: float = 0.0   # seconds, enqueue -> send complete
+    latency_max: float = 0.0
+
+    def record_send(self, latency: float):
+        self.sent += 1
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+
+def coalesce_key(message: dict) -> Optional[str]:
+    """
+    Identify messages that supersede each other (e.g. two status updates
+    for the same table). Messages without an entity id never coalesce.
+    """
+    data = message.get("data")
+    if not isinstance(data, dict):
+        return None
+    for field in ("order_id", "table_id", "booking_id", "id"):
+        if data.get(field):
+            return f"{message.get('type')}:{data[field]}"
+    return None
+
+
+class ClientConnection:
+    """
+    One WebSocket with a bounded outbound queue and its own writer task,
+    so a slow client never blocks delivery to the others.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        branch_code: str,
+        manager: "ConnectionManager",
+        max_queue: int,
+        policy: SlowConsumerPolicy,
+        send_timeout: float,
+    ):
+        self.websocket = websocket
+        self.branch_code = branch_code
+        self.manager = manager
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+
+        # (pre-encoded message, coalesce key, enqueued at)
+        self.queue: Deque[Tuple[EncodedMessage, Optional[str], float]] = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+    @property
+    def stats(self) -> BranchFanoutStats:
+        return self.manager.branch_stats(self.branch_code)
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+
+    def stop(self) -> Optional[asyncio.Task]:
+        """Cancel the writer; returns the task to await (None from inside it)"""
+        self.closed = True
+        self.queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            return self._task
+        return None
+
+    def enqueue(self, message: EncodedMessage, key: Optional[str] = None) -> bool:
+        """Queue a message without blocking. Returns False if the connection was dropped."""
+        if self.closed:
+            return False
+
+        now = time.perf_counter()
+
+        if len(self.queue) >= self.max_queue:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                self.stats.slow_disconnects += 1
+                print(f"🐢 Slow WebSocket consumer disconnected: branch={self.branch_code}")
+                self.manager.disconnect(self.websocket, self.branch_code)
+                self.manager.track(asyncio.create_task(self._close(code=1013)))
+                return False
+
+            if self.policy == SlowConsumerPolicy.COALESCE and key is not None:
+                for i, (_, queued_key, enqueued_at) in enumerate(self.queue):
+                    if queued_key == key:
+                        # Keep the original position/age, replace the payload
+                        self.queue[i] = (message, key, enqueued_at)
+                        self.stats.coalesced += 1
+                        return True
+
+            self.queue.popleft()
+            self.stats.dropped += 1
+
+        self.queue.append((message, key, now))
+        self._ready.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self.queue:
+                    message, _, enqueued_at = self.queue.popleft()
+                    try:
+                        await asyncio.wait_for(self.websocket.send_text(message.text), timeout=self.send_timeout)
+                    except Exception as e:
+                        self.stats.send_errors += 1
+                        print(f"❌ WebSocket send failed: branch={self.branch_code} ({type(e).__name__})")
+                        self.manager.disconnect(self.websocket, self.branch_code)
+                        await self._close(code=1011)
+                        return
+                    self.stats.record_send(time.perf_counter() - enqueued_at)
+                self._ready.clear()
+        except asyncio.CancelledError:
+            pass
+
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
 class ConnectionManager:
     """Manages WebSocket connections per branch"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_queue: int = 100,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+        send_timeout: float = 5.0,
+        broker: Optional[Broker] = None,
+    ):
         # branch_code -> set of websockets
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # websocket -> subscribed channels
         self.subscriptions: Dict[WebSocket, Set[str]] = {}
+        # Inverted indexes: branch_code -> channel -> websockets
+        # Exact channels ("orders", "table:12")
+        self.channel_index: Dict[str, Dict[str, Set[WebSocket]]] = {}
+        # Wildcard channels ("table:*" is stored under prefix "table:")
+        self.prefix_index: Dict[str, Dict[str, Set[WebSocket]]] = {}
+        # websocket -> outbound queue + writer
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        # branch_code -> delivery counters
+        self.stats: Dict[str, BranchFanoutStats] = {}
+        # Branch codes that get their own metrics label (the rest are "other")
+        self.known_branches: Set[str] = {settings.DEFAULT_BRANCH}
+        # Stopped writers and socket closes still finishing (kept until done)
+        self._finishing: Set[asyncio.Task] = set()
+
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+
+        # Relays broadcasts to/from other workers (None = single process)
+        self.broker = broker
+        if broker is not None:
+            broker.subscribe("ws", self._on_remote_broadcast)
 
     async def connect(self, websocket: WebSocket, branch_code: str):
         """Accept and register a new connection"""
@@ -26,12 +202,7 @@ class ConnectionManager:
         if branch_code not in self.active_connections:
             self.active_connections[branch_code] = set()
 
-        self.active_connections[branch_code].add(websocket)
-        self.subscriptions[websocket] = set()
-
-        print(f"📡 WebSocket connected: branch={branch_code}, total={len(self.active_connections[branch_code])}")
-
-        # Send connection confirmation
+        # Send connection confirmation before the writer owns the socket
         await websocket.send_json({
             "type": "connected",
             "data": {
@@ -40,60 +211,158 @@ class ConnectionManager:
             }
         })
 
+        client = ClientConnection(
+            websocket, branch_code, self,
+            max_queue=self.max_queue,
+            policy=self.policy,
+            send_timeout=self.send_timeout,
+        )
+        self.active_connections[branch_code].add(websocket)
+        self.subscriptions[websocket] = set()
+        self.clients[websocket] = client
+        client.start()
+
+        print(f"📡 WebSocket connected: branch={branch_code}, total={len(self.active_connections[branch_code])}")
+
     def disconnect(self, websocket: WebSocket, branch_code: str):
         """Remove a connection"""
         if branch_code in self.active_connections:
             self.active_connections[branch_code].discard(websocket)
 
-        if websocket in self.subscriptions:
-            del self.subscriptions[websocket]
-
-        print(f"📡 WebSocket disconnected: branch={branch_code}")
+        for channel in self.subscriptions.pop(websocket, set()):
+            self._unindex(branch_code, websocket, channel)
+
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            task = client.stop()
+            if task is not None:
+                self.track(task)
+            print(f"📡 WebSocket disconnected: branch={branch_code}")
+
+    def track(self, task: asyncio.Task):
+        """Keep a reference to a background task until it is done"""
+        self._finishing.add(task)
+        task.add_done_callback(self._finishing.discard)
+
+    async def shutdown(self):
+        """Stop every writer and wait for them and pending closes"""
+        for branch_code, connections in list(self.active_connections.items()):
+            for websocket in list(connections):
+                self.disconnect(websocket, branch_code)
+        if self._finishing:
+            await asyncio.gather(*self._finishing, return_exceptions=True)
 
     def subscribe(self, websocket: WebSocket, channel: str):
-        """Subscribe to a channel"""
-        if websocket in self.subscriptions:
+        """
+        Subscribe to a channel.
+        A trailing "*" subscribes to every channel with that prefix (e.g. "table:*").
+        """
+        client = self.clients.get(websocket)
+        if websocket in self.subscriptions and client is not None:
             self.subscriptions[websocket].add(channel)
+            index, key = self._index_for(channel)
+            index.setdefault(client.branch_code, {}).setdefault(key, set()).add(websocket)
             print(f"📡 Subscribed to channel: {channel}")
 
     def unsubscribe(self, websocket: WebSocket, channel: str):
         """Unsubscribe from a channel"""
-        if websocket in self.subscriptions:
+        client = self.clients.get(websocket)
+        if websocket in self.subscriptions and client is not None:
             self.subscriptions[websocket].discard(channel)
+            self._unindex(client.branch_code, websocket, channel)
+
+    def _index_for(self, channel: str) -> Tuple[Dict[str, Dict[str, Set[WebSocket]]], str]:
+        """Which index a subscription lives in, and under which key"""
+        if channel.endswith("*"):
+            return self.prefix_index, channel[:-1]
+        return self.channel_index, channel
+
+    def _unindex(self, branch_code: str, websocket: WebSocket, channel: str):
+        index, key = self._index_for(channel)
+        branch_index = index.get(branch_code)
+        if not branch_index or key not in branch_index:
+            return
+        branch_index[key].discard(websocket)
+        if not branch_index[key]:
+            del branch_index[key]
+        if not branch_index:
+            del index[branch_code]
+
+    def get_subscribers(self, branch_code: str, channel: str) -> Set[WebSocket]:
+        """
+        Sockets subscribed to a channel, directly or via a wildcard.
+        Cost is O(subscribers + wildcard patterns), not O(all sockets).
+        """
+        exact = self.channel_index.get(branch_code, {}).get(channel)
+        matches = [
+            sockets
+            for prefix, sockets in self.prefix_index.get(branch_code, {}).items()
+            if channel.startswith(prefix)
+        ]
+        if not matches:
+            return set(exact) if exact else set()
+        return set(exact or ()).union(*matches)
 
     async def send_personal(self, websocket: WebSocket, message: dict):
         """Send message to a specific connection"""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            print(f"❌ Failed to send personal message: {e}")
+        client = self.clients.get(websocket)
+        if client is None:
+            print("❌ Failed to send personal message: connection not registered")
+            return
+        client.enqueue(encode(message))
+
+    async def broadcast_to_branch(self, branch_code: str, message, channel: str = None):
+        """
+        Broadcast message to all connections in a branch.
+        The message is JSON-encoded once and the same text is queued for
+        every recipient; each connection's writer task does the actual send.
+        Other workers receive it through the broker and deliver to theirs.
+        """
+        message = encode(message)
+        self._deliver(branch_code, message, channel)
+        await self._publish(branch_code, message, channel)
+
+    async def broadcast_all(self, message, channel: str = None):
+        """Broadcast to all branches"""
+        message = encode(message)
+        for branch_code in list(self.active_connections.keys()):
+            self._deliver(branch_code, message, channel)
+        await self._publish(None, message, channel)
 
-    async def broadcast_to_branch(self, branch_code: str, message: dict, channel: str = None):
-        """Broadcast message to all connections in a branch"""
+    def _deliver(self, branch_code: str, message: EncodedMessage, channel: Optional[str]):
+        """Queue a message for this worker's connections only"""
         if branch_code not in self.active_connections:
             return
 
-        disconnected = set()
-
-        for websocket in self.active_connections[branch_code]:
-            # If channel specified, only send to subscribed connections
-            if channel and websocket in self.subscriptions:
-                if channel not in self.subscriptions[websocket]:
-                    continue
+        key = coalesce_key(message.payload)
 
-            try:
-                await websocket.send_json(message)
-            except Exception:
-                disconnected.add(websocket)
+        # If channel specified, only touch subscribed connections
+        if channel:
+            recipients = self.get_subscribers(branch_code, channel)
+        else:
+            recipients = list(self.active_connections[branch_code])
 
-        # Clean up disconnected
-        for ws in disconnected:
-            self.disconnect(ws, branch_code)
+        for websocket in recipients:
+            client = self.clients.get(websocket)
+            if client is not None:
+                client.enqueue(message, key)
 
-    async def broadcast_all(self, message: dict, channel: str = None):
-        """Broadcast to all branches"""
-        for branch_code in list(self.active_connections.keys()):
-            await self.broadcast_to_branch(branch_code, message, channel)
+    async def _publish(self, branch_code: Optional[str], message: EncodedMessage, channel: Optional[str]):
+        """Forward to other workers: routing header line + the already-encoded text"""
+        if self.broker is None:
+            return
+        header = dumps({"b": branch_code, "c": channel})
+        await self.broker.publish("ws", f"{header}\n{message.text}")
+
+    async def _on_remote_broadcast(self, payload: str):
+        header, _, text = payload.partition("\n")
+        route = json.loads(header)
+        message = EncodedMessage.from_text(text)
+        if route["b"] is None:
+            for branch_code in list(self.active_connections.keys()):
+                self._deliver(branch_code, message, route["c"])
+        else:
+            self._deliver(route["b"], message, route["c"])
 
     def get_connection_count(self, branch_code: str = None) -> int:
         """Get number of active connections"""
@@ -101,9 +370,97 @@ class ConnectionManager:
             return len(self.active_connections.get(branch_code, set()))
         return sum(len(conns) for conns in self.active_connections.values())
 
+    # ============ Metrics ============
+
+    def branch_stats(self, branch_code: str) -> BranchFanoutStats:
+        if branch_code not in self.stats:
+            self.stats[branch_code] = BranchFanoutStats()
+        return self.stats[branch_code]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-branch queue depth and delivery stats"""
+        result = {}
+        for branch_code in sorted(set(self.stats) | set(self.active_connections)):
+            stats = self.branch_stats(branch_code)
+            depths = [
+                len(self.clients[ws].queue)
+                for ws in self.active_connections.get(branch_code, set())
+                if ws in self.clients
+            ]
+            result[branch_code] = {
+                "connections": len(depths),
+                "queue_depth_total": sum(depths),
+                "queue_depth_max": max(depths, default=0),
+                "sent": stats.sent,
+                "dropped": stats.dropped,
+                "coalesced": stats.coalesced,
+                "send_errors": stats.send_errors,
+                "slow_disconnects": stats.slow_disconnects,
+                "send_latency_avg_ms": round(stats.latency_total / stats.sent * 1000, 2) if stats.sent else 0.0,
+                "send_latency_max_ms": round(stats.latency_max * 1000, 2),
+            }
+        return result
+
+    async def load_branches(self):
+        """Read the branch codes from the database (metrics labels)"""
+        from sqlalchemy import select
+        from app.database import AsyncSessionLocal
+        from app.models.branch import Branch
+
+        async with AsyncSessionLocal() as db:
+            codes = (await db.execute(select(Branch.code))).scalars().all()
+        self.known_branches |= set(codes)
+
+    def render_prometheus(self) -> List[str]:
+        """Prometheus lines for /metrics"""
+        # branch_code comes from the client: unknown codes share one label
+        fields = ("queue_depth_total", "sent", "dropped", "coalesced", "slow_disconnects")
+        totals: Dict[str, Dict[str, float]] = {}
+        for branch_code, s in self.get_stats().items():
+            label = branch_code if branch_code in self.known_branches else "other"
+            total = totals.setdefault(label, {"latency": 0.0, **dict.fromkeys(fields, 0)})
+            for field in fields:
+                total[field] += s[field]
+            total["latency"] += self.branch_stats(branch_code).latency_total
+        labels = {label: format_labels(branch=label) for label in sorted(totals)}
+
+        lines = [
+            "# HELP yakiniku_ws_queue_depth Messages waiting in WebSocket outbound queues",
+            "# TYPE yakiniku_ws_queue_depth gauge",
+        ]
+        for label, text in labels.items():
+            lines.append(f"yakiniku_ws_queue_depth{{{text}}} {totals[label]['queue_depth_total']}")
+        for name, field, help_text in (
+            ("yakiniku_ws_messages_sent_total", "sent", "WebSocket messages delivered"),
+            ("yakiniku_ws_messages_dropped_total", "dropped", "Messages dropped for slow consumers"),
+            ("yakiniku_ws_messages_coalesced_total", "coalesced", "Queued messages replaced by newer ones"),
+            ("yakiniku_ws_slow_disconnects_total", "slow_disconnects", "Connections closed for being too slow"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for label, text in labels.items():
+                lines.append(f"{name}{{{text}}} {totals[label][field]}")
+        lines.append("# HELP yakiniku_ws_send_latency_seconds_total Enqueue-to-send time of delivered messages")
+        lines.append("# TYPE yakiniku_ws_send_latency_seconds_total counter")
+        for label, text in labels.items():
+            lines.append(f"yakiniku_ws_send_latency_seconds_total{{{text}}} {totals[label]['latency']!r}")
+        return lines
+
 
 # Global connection manager
-manager = ConnectionManager()
+manager = ConnectionManager(
+    max_queue=settings.WS_QUEUE_SIZE,
+    policy=SlowConsumerPolicy(settings.WS_SLOW_CONSUMER_POLICY),
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    broker=realtime_broker,
+)
+metrics_registry.register_collector(manager.render_prometheus)
+
+
+@router.get("/stats")
+async def websocket_stats():
+    """Per-branch WebSocket queue depth and send latency"""
+    return {"policy": manager.policy.value, "branches": manager.get_stats()}
 
 
 @router.websocket("")
@@ -245,6 +602,57 @@ async def kitchen_websocket(
         manager.disconnect(websocket, branch)
 
 
+@router.websocket("/pos")
+async def pos_websocket(
+    websocket: WebSocket,
+    branch: str = Query(default="hirama")
+):
+    """WebSocket endpoint for POS terminals: floor snapshot, then table deltas"""
+    from app.database import AsyncSessionLocal
+    from app.domains.pos.floor import CHANNEL, load_floor
+
+    await manager.connect(websocket, branch)
+    manager.subscribe(websocket, CHANNEL)
+
+    try:
+        # Subscribed first, so no delta falls between snapshot and stream
+        async with AsyncSessionLocal() as db:
+            floor = await load_floor(db, branch)
+        await manager.send_personal(websocket, {
+            "type": "pos.floor",
+            "data": floor.model_dump(mode="json"),
+            "channel": CHANNEL,
+        })
+
+        while True:
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+                msg_type = message.get("type")
+
+                if msg_type == "ping":
+                    await manager.send_personal(websocket, {"type": "pong"})
+                elif msg_type == "resync":
+                    async with AsyncSessionLocal() as db:
+                        floor = await load_floor(db, branch)
+                    await manager.send_personal(websocket, {
+                        "type": "pos.floor",
+                        "data": floor.model_dump(mode="json"),
+                        "channel": CHANNEL,
+                    })
+                else:
+                    print(f"📨 POS WS received: {msg_type}")
+
+            except json.JSONDecodeError:
+                pass
+
+    except WebSocketDisconnect:
+        manager.disconnect(websocket, branch)
+    except Exception as e:
+        print(f"❌ POS WebSocket error: {e}")
+        manager.disconnect(websocket, branch)
+
+
 # Helper functions to broadcast events from other parts of the app
 
 async def broadcast_order_event(branch_code: str, event_type: str, data: dict):
@@ -0,0 +1,466 @@
+"""
+Availability Engine - In-memory table occupancy per branch-day
+Loads a branch-day once (2 queries) into bitsets over 30-minute slots and
+answers "which tables fit N guests at slot S" with bit operations.
+
+- A booking occupies its table(s) for AVERAGE_DINING_TIME + TURNOVER_BUFFER
+- Only pending/confirmed bookings block a table (same rule as the SQL checks)
+- Kept in sync incrementally: committed Booking / TableAssignment / Table
+  changes are applied to the cached days through session events, and other
+  workers are told to drop the affected day through the realtime broker
+
+Other per-day caches can follow the same change feed with on_day_changed().
+"""
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.models.booking import Booking, BookingStatus
+from app.models.table import Table, TableAssignment
+from app.services.broker import realtime_broker
+from app.services.change_feed import change_feed
+from app.services.encoding import dumps
+
+# Booking statuses that hold a table
+ACTIVE_STATUSES = {BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value}
+
+# (branch_code, date) of a changed day; (branch_code, None) = every day of
+# the branch, (None, None) = every day
+DayKey = Tuple[Optional[str], Optional[date]]
+
+
+def slot_minutes(time_slot: str) -> int:
+    """"18:30" (or "18:30:00") -> minutes since midnight"""
+    hour, minute = time_slot.split(":")[:2]
+    return int(hour) * 60 + int(minute)
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """Positions of the set bits, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclass(frozen=True)
+class TableInfo:
+    """Detached copy of the Table columns used for scoring"""
+    id: str
+    table_number: str
+    name: str
+    max_capacity: int
+    table_type: str
+    zone: str
+    has_window: bool
+    priority: int
+
+    @classmethod
+    def from_table(cls, table: Table) -> "TableInfo":
+        return cls(
+            id=table.id,
+            table_number=table.table_number,
+            name=table.name or "",
+            max_capacity=table.max_capacity,
+            table_type=table.table_type,
+            zone=table.zone or "",
+            has_window=bool(table.has_window),
+            priority=table.priority or 0,
+        )
+
+
+@dataclass
+class BookingSlot:
+    start: int           # first slot index (minutes // slot_minutes)
+    active: bool
+    table_ids: Set[str]
+
+
+class DayAvailability:
+    """
+    Occupancy of one branch-day.
+
+    table_masks[t]   : slots occupied on table t (bit = slot index)
+    slot_tables[s]   : tables occupied at slot s (bit = table position)
+    capacity_masks[n]: tables seating at least n guests
+    """
+
+    def __init__(self, tables: List[TableInfo], slot_minutes: int, span: int):
+        self.tables = tables
+        self.slot_minutes = slot_minutes
+        self.span = span
+        self.position = {t.id: i for i, t in enumerate(tables)}
+
+        self.bookings: Dict[str, BookingSlot] = {}
+        self.table_masks: List[int] = [0] * len(tables)
+        self.slot_tables: Dict[int, int] = {}
+
+        max_capacity = max((t.max_capacity for t in tables), default=0)
+        self.capacity_masks = [0] * (max_capacity + 1)
+        for i, t in enumerate(tables):
+            for n in range(t.max_capacity + 1):
+                self.capacity_masks[n] |= 1 << i
+
+    # ============ Queries ============
+
+    def slot_index(self, time_slot: str) -> int:
+        return slot_minutes(time_slot) // self.slot_minutes
+
+    def busy_tables(self, start: int) -> int:
+        """Tables occupied anywhere in [start, start + span)"""
+        busy = 0
+        for s in range(start, start + self.span):
+            busy |= self.slot_tables.get(s, 0)
+        return busy
+
+    def free_tables(self, time_slot: str, guests: int = 0) -> List[TableInfo]:
+        """Tables that can take a new booking of `guests` at time_slot"""
+        if guests >= len(self.capacity_masks):
+            return []
+        fits = self.capacity_masks[max(guests, 0)] & ~self.busy_tables(self.slot_index(time_slot))
+        return [self.tables[i] for i in iter_bits(fits)]
+
+    def nearest_alternatives(
+        self,
+        guests: int,
+        requested_slot: str,
+        candidate_slots: List[str],
+        range_minutes: int,
+    ) -> List[Tuple[str, int, List[TableInfo]]]:
+        """(slot, diff_minutes, free tables) for other slots, closest first"""
+        requested = slot_minutes(requested_slot)
+        found = []
+        for slot in candidate_slots:
+            diff = slot_minutes(slot) - requested
+            if slot == requested_slot or abs(diff) > range_minutes:
+                continue
+            tables = self.free_tables(slot, guests)
+            if tables:
+                found.append((slot, diff, tables))
+        found.sort(key=lambda x: abs(x[1]))
+        return found
+
+    # ============ Updates ============
+
+    def upsert_booking(self, booking_id: str, time_slot: str, active: bool, table_ids: Iterable[str] = ()):
+        booking = self.bookings.get(booking_id)
+        start = self.slot_index(time_slot)
+        if booking is None:
+            booking = self.bookings[booking_id] = BookingSlot(start, active, set())
+        touched = set(booking.table_ids)
+        booking.start, booking.active = start, active
+        booking.table_ids.update(table_ids)
+        self._refresh(touched | booking.table_ids)
+
+    def remove_booking(self, booking_id: str) -> Optional[BookingSlot]:
+        booking = self.bookings.pop(booking_id, None)
+        if booking is not None:
+            self._refresh(booking.table_ids)
+        return booking
+
+    def assign(self, booking_id: str, table_id: str):
+        booking = self.bookings.get(booking_id)
+        if booking is not None:
+            booking.table_ids.add(table_id)
+            self._refresh({table_id})
+
+    def unassign(self, booking_id: str, table_id: str):
+        booking = self.bookings.get(booking_id)
+        if booking is not None:
+            booking.table_ids.discard(table_id)
+            self._refresh({table_id})
+
+    def rebuild(self):
+        """Recompute all bitsets in one pass over the bookings"""
+        span_mask = (1 << self.span) - 1
+        self.table_masks = [0] * len(self.tables)
+        for booking in self.bookings.values():
+            if not booking.active:
+                continue
+            for table_id in booking.table_ids:
+                i = self.position.get(table_id)
+                if i is not None:
+                    self.table_masks[i] |= span_mask << booking.start
+        self.slot_tables = {}
+        for i, mask in enumerate(self.table_masks):
+            for s in iter_bits(mask):
+                self.slot_tables[s] = self.slot_tables.get(s, 0) | (1 << i)
+
+    def _refresh(self, table_ids: Iterable[str]):
+        """Recompute occupancy of the given tables and patch the slot bitsets"""
+        span_mask = (1 << self.span) - 1
+        for table_id in table_ids:
+            i = self.position.get(table_id)
+            if i is None:
+                continue  # inactive or unknown table
+            mask = 0
+            for booking in self.bookings.values():
+                if booking.active and table_id in booking.table_ids:
+                    mask |= span_mask << booking.start
+            bit = 1 << i
+            for s in iter_bits(mask ^ self.table_masks[i]):
+                self.slot_tables[s] = self.slot_tables.get(s, 0) ^ bit
+            self.table_masks[i] = mask
+
+
+class AvailabilityEngine:
+    """LRU cache of DayAvailability keyed by (branch_code, date)"""
+
+    def __init__(
+        self,
+        slot_minutes: int = 30,
+        dining_minutes: int = 90,
+        buffer_minutes: int = 30,
+        max_days: int = 256,
+    ):
+        self.max_days = max_days
+        self._days: "OrderedDict[Tuple[str, date], DayAvailability]" = OrderedDict()
+        # booking_id -> cached day it lives in
+        self._located: Dict[str, Tuple[str, date]] = {}
+        self.configure(slot_minutes, dining_minutes, buffer_minutes)
+
+        # Counters
+        self.loads = 0
+        self.hits = 0
+
+    def configure(self, slot_minutes: int, dining_minutes: int, buffer_minutes: int):
+        """Set slot size and how long a booking holds its table (drops cached days)"""
+        self.slot_minutes = slot_minutes
+        # Slots a booking blocks, rounded up
+        self.span = -(-(dining_minutes + buffer_minutes) // slot_minutes)
+        self.clear()
+
+    async def get_day(self, db: AsyncSession, branch_code: str, day: date) -> DayAvailability:
+        key = (branch_code, day)
+        cached = self._days.get(key)
+        if cached is not None:
+            self._days.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        tables_result = await db.execute(
+            select(Table).where(and_(Table.branch_code == branch_code, Table.is_active == True))
+        )
+        tables = [TableInfo.from_table(t) for t in tables_result.scalars().all()]
+
+        bookings_result = await db.execute(
+            select(Booking.id, Booking.time, Booking.status, TableAssignment.table_id)
+            .outerjoin(TableAssignment, TableAssignment.booking_id == Booking.id)
+            .where(and_(Booking.branch_code == branch_code, Booking.date == day))
+        )
+
+        availability = DayAvailability(tables, self.slot_minutes, self.span)
+        rows = bookings_result.fetchall()
+        for booking_id, time_slot, status, table_id in rows:
+            booking = availability.bookings.get(booking_id)
+            if booking is None:
+                booking = availability.bookings[booking_id] = BookingSlot(
+                    availability.slot_index(time_slot), status in ACTIVE_STATUSES, set(),
+                )
+            if table_id:
+                booking.table_ids.add(table_id)
+        availability.rebuild()
+
+        # The day may have been loaded concurrently; keep the first one
+        if key in self._days:
+            return self._days[key]
+        self._store(key, availability)
+        self.loads += 1
+        return availability
+
+    def _store(self, key: Tuple[str, date], availability: DayAvailability):
+        self._days[key] = availability
+        for booking_id in availability.bookings:
+            self._located[booking_id] = key
+        while len(self._days) > self.max_days:
+            self._drop(next(iter(self._days)))
+
+    def _drop(self, key: Tuple[str, date]):
+        availability = self._days.pop(key, None)
+        if availability is not None:
+            for booking_id in availability.bookings:
+                if self._located.get(booking_id) == key:
+                    del self._located[booking_id]
+
+    def invalidate(self, branch_code: Optional[str], day: Optional[date] = None):
+        """Drop one cached day, every day of a branch, or everything (branch None)"""
+        if branch_code is None:
+            self.clear()
+            return
+        keys = [(branch_code, day)] if day is not None else [k for k in self._days if k[0] == branch_code]
+        for key in keys:
+            self._drop(key)
+
+    def clear(self):
+        self._days.clear()
+        self._located.clear()
+
+    # ============ Change tracking ============
+
+    def apply(self, changes: List[tuple]) -> Set[DayKey]:
+        """
+        Apply committed changes to the cached days.
+        Returns the day keys touched, for other caches and other workers.
+        """
+        touched: Set[DayKey] = set()
+        for change in changes:
+            kind = change[0]
+
+            if kind == "table":
+                branch_code = change[1]
+                self.invalidate(branch_code)
+                touched.add((branch_code, None))
+
+            elif kind == "booking":
+                _, booking_id, branch_code, day, time_slot, status, deleted, is_new, old_key = change
+                key = (branch_code, day)
+                touched.add(key)
+                if old_key is not None:
+                    touched.add(old_key)
+                previous_key = self._located.get(booking_id)
+                table_ids: Set[str] = set()
+                if previous_key is not None and (previous_key != key or deleted):
+                    removed = self._days[previous_key].remove_booking(booking_id)
+                    del self._located[booking_id]
+                    touched.add(previous_key)
+                    table_ids = removed.table_ids if removed else set()
+                if deleted or key not in self._days:
+                    continue
+                if previous_key is None and not is_new:
+                    # Moved in from a day we never loaded - its tables are unknown
+                    self._drop(key)
+                    continue
+                self._days[key].upsert_booking(booking_id, time_slot, status in ACTIVE_STATUSES, table_ids)
+                self._located[booking_id] = key
+
+            elif kind == "assignment":
+                _, booking_id, added, removed, key = change
+                key = self._located.get(booking_id) or key
+                if key is None:
+                    # Booking not in memory anywhere - day unknown
+                    touched.add((None, None))
+                    continue
+                touched.add(key)
+                if key not in self._days:
+                    continue
+                for table_id in removed:
+                    self._days[key].unassign(booking_id, table_id)
+                for table_id in added:
+                    self._days[key].assign(booking_id, table_id)
+
+        return touched
+
+    async def _on_remote_invalidation(self, payload: str):
+        keys = {
+            (branch_code, date.fromisoformat(day) if day else None)
+            for branch_code, day in json.loads(payload)
+        }
+        for branch_code, day in keys:
+            self.invalidate(branch_code, day)
+        _notify_day_listeners(keys)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "days_cached": len(self._days),
+            "bookings_tracked": len(self._located),
+            "loads": self.loads,
+            "hits": self.hits,
+        }
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+_day_listeners: List[Callable[[Set[DayKey]], None]] = []
+
+
+def on_day_changed(listener: Callable[[Set[DayKey]], None]):
+    """Call listener with the day keys touched by every commit (any worker)"""
+    _day_listeners.append(listener)
+
+
+def _notify_day_listeners(keys: Set[DayKey]):
+    for listener in _day_listeners:
+        try:
+            listener(keys)
+        except Exception as e:
+            print(f"❌ Day change listener failed: {e}")
+
+
+def _history(obj, attr: str) -> Tuple[list, list]:
+    history = inspect(obj).attrs[attr].history
+    return list(history.added or ()), list(history.deleted or ())
+
+
+def _previous_day(booking: Booking) -> Optional[Tuple[str, date]]:
+    """(branch_code, date) before this flush, if either changed"""
+    _, old_branch = _history(booking, "branch_code")
+    _, old_date = _history(booking, "date")
+    if not old_branch and not old_date:
+        return None
+    return (old_branch[0] if old_branch else booking.branch_code, old_date[0] if old_date else booking.date)
+
+
+def _booking_day(session: Session, booking_id: str) -> Optional[Tuple[str, date]]:
+    """Day of a booking already in the session - never emits SQL"""
+    booking = session.identity_map.get(identity_key(Booking, booking_id))
+    return (booking.branch_code, booking.date) if booking is not None else None
+
+
+# Within a flush, apply bookings before their assignments
+_CHANGE_ORDER = {"table": 0, "booking": 1, "assignment": 2}
+
+
+def _collect_changes(session: Session) -> list:
+    """Booking / TableAssignment / Table changes of one flush"""
+    changes = []
+    for state, objects in (("new", session.new), ("dirty", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            if isinstance(obj, Booking):
+                change = ("booking", obj.id, obj.branch_code, obj.date, obj.time, obj.status,
+                          state == "deleted", state == "new",
+                          _previous_day(obj) if state == "dirty" else None)
+            elif isinstance(obj, TableAssignment):
+                day = _booking_day(session, obj.booking_id)
+                if state == "new":
+                    change = ("assignment", obj.booking_id, [obj.table_id], [], day)
+                elif state == "deleted":
+                    change = ("assignment", obj.booking_id, [], [obj.table_id], day)
+                else:
+                    added, removed = _history(obj, "table_id")
+                    if not added and not removed:
+                        continue
+                    change = ("assignment", obj.booking_id, added, removed, day)
+            elif isinstance(obj, Table):
+                change = ("table", obj.branch_code)
+            else:
+                continue
+            changes.append(change)
+
+    changes.sort(key=lambda c: _CHANGE_ORDER[c[0]])
+    return changes
+
+
+def _apply_changes(changes: list):
+    touched = availability_engine.apply(changes)
+    if not touched:
+        return
+    _notify_day_listeners(touched)
+    payload = dumps([[branch_code, day.isoformat() if day else None] for branch_code, day in touched])
+    realtime_broker.publish_soon("availability", payload)
+
+
+change_feed("availability_changes", _collect_changes, _apply_changes)
+
+
+# Global engine (durations set from TableOptimizationService)
+availability_engine = AvailabilityEngine()
+realtime_broker.subscribe("availability", availability_engine._on_remote_invalidation)
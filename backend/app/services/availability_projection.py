@@ -0,0 +1,377 @@
+"""
+Availability Projection - Materialized TableAvailability rows
+One row per (table, date, time slot) of the booking grid:
+
+- is_available: a new booking can start on the table at that slot (no
+  pending/confirmed booking on it within dining time + buffer)
+- booking_id: the booking blocking the slot, if any
+
+Rows are rewritten per (table, day) inside the flush that changes a
+Booking / TableAssignment / Table, so the projection commits or rolls back
+together with the change. A day gets rows for every active table the first
+time it is touched; reads of an untouched day compute it in memory.
+Rows are upserted, serialized per (branch, day) on PostgreSQL.
+`python cli.py db rebuild-availability` rebuilds everything from bookings.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, event, inspect, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.table import Table, TableAssignment, TableAvailability
+from app.services.availability import ACTIVE_STATUSES, TableInfo, availability_engine, slot_minutes
+from app.services.change_feed import change_feed
+
+# Booking grid: 17:00 - 22:00 (last order 22:00)
+BOOKING_SLOTS = [
+    f"{h:02d}:{m:02d}"
+    for h in range(17, 23)
+    for m in [0, 30]
+    if not (h == 22 and m == 30)
+]
+
+
+def grid_slot(time_slot: str) -> str:
+    """Round a "HH:MM" time down to its slot on the grid"""
+    step = availability_engine.slot_minutes
+    minutes = slot_minutes(time_slot) // step * step
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# ============================================
+# WRITE SIDE (sync, runs on the flush connection)
+# ============================================
+
+def _is_materialized(conn: Connection, branch_code: str, day: date) -> bool:
+    return conn.execute(
+        select(TableAvailability.id).where(
+            and_(TableAvailability.branch_code == branch_code, TableAvailability.date == day)
+        ).limit(1)
+    ).first() is not None
+
+
+def _lock_day(conn: Connection, branch_code: str, day: date):
+    """
+    PostgreSQL: one projection of a (branch, day) at a time, until commit.
+    The second writer then reads the first one's bookings instead of
+    overwriting its rows with an older view.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"availability:{branch_code}:{day.isoformat()}"},
+        )
+
+
+def day_rows(conn: Connection, branch_code: str, day: date,
+             table_ids: Optional[Set[str]] = None) -> Tuple[List[str], List[dict]]:
+    """(active table ids, projection rows) of one day, computed from bookings"""
+    tables_query = select(Table.id).where(and_(Table.branch_code == branch_code, Table.is_active == True))
+    if table_ids is not None:
+        tables_query = tables_query.where(Table.id.in_(table_ids))
+    active_tables = [row[0] for row in conn.execute(tables_query)]
+    if not active_tables:
+        return [], []
+
+    # Booking starts per table (slot index), earliest first
+    starts: Dict[str, List[Tuple[int, str]]] = {table_id: [] for table_id in active_tables}
+    bookings = conn.execute(
+        select(TableAssignment.table_id, Booking.id, Booking.time)
+        .join(Booking, Booking.id == TableAssignment.booking_id)
+        .where(
+            and_(
+                Booking.branch_code == branch_code,
+                Booking.date == day,
+                Booking.status.in_(list(ACTIVE_STATUSES)),
+                TableAssignment.table_id.in_(active_tables),
+            )
+        )
+        .order_by(Booking.time)
+    )
+    step = availability_engine.slot_minutes
+    for table_id, booking_id, time_slot in bookings:
+        starts[table_id].append((slot_minutes(time_slot) // step, booking_id))
+
+    span = availability_engine.span
+    rows = []
+    for table_id in active_tables:
+        for time_slot in BOOKING_SLOTS:
+            slot = slot_minutes(time_slot) // step
+            blocking = next((b for start, b in starts[table_id] if abs(start - slot) < span), None)
+            rows.append({
+                "branch_code": branch_code,
+                "table_id": table_id,
+                "date": day,
+                "time_slot": time_slot,
+                "is_available": blocking is None,
+                "booking_id": blocking,
+            })
+    return active_tables, rows
+
+
+def project(conn: Connection, branch_code: str, day: date, table_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Rewrite the rows of the given tables for one day (all tables when None,
+    or when the day has no rows yet). Returns the number of rows written.
+    Rows are upserted on (table_id, date, time_slot), so concurrent writers
+    of the same day never collide on the unique index.
+    """
+    _lock_day(conn, branch_code, day)
+    if table_ids is not None and not _is_materialized(conn, branch_code, day):
+        table_ids = None
+    if table_ids is not None:
+        table_ids = set(table_ids)
+        if not table_ids:
+            return 0
+
+    active_tables, rows = day_rows(conn, branch_code, day, table_ids)
+
+    # Rows of tables that are gone or inactive
+    stale = delete(TableAvailability).where(
+        and_(
+            TableAvailability.branch_code == branch_code,
+            TableAvailability.date == day,
+            TableAvailability.table_id.notin_(active_tables),
+        )
+    )
+    if table_ids is not None:
+        stale = stale.where(TableAvailability.table_id.in_(table_ids))
+    conn.execute(stale)
+    if not rows:
+        return 0
+
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(TableAvailability)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["table_id", "date", "time_slot"],
+        set_={
+            "branch_code": stmt.excluded.branch_code,
+            "is_available": stmt.excluded.is_available,
+            "booking_id": stmt.excluded.booking_id,
+        },
+    )
+    conn.execute(stmt, rows)
+    return len(rows)
+
+
+def project_table(conn: Connection, branch_code: str, table_id: str):
+    """Re-project one table on every materialized day of its branch"""
+    days = conn.execute(
+        select(TableAvailability.date).where(TableAvailability.branch_code == branch_code).distinct()
+    ).scalars().all()
+    for day in days:
+        project(conn, branch_code, day, {table_id})
+
+
+def rebuild_all(conn: Connection, branch_code: Optional[str] = None, since: Optional[date] = None) -> Dict[str, int]:
+    """Drop and re-project every day that has bookings (or had rows)"""
+    days_query = select(Booking.branch_code, Booking.date).distinct()
+    rows_query = select(TableAvailability.branch_code, TableAvailability.date).distinct()
+    clear_query = delete(TableAvailability)
+    if branch_code:
+        days_query = days_query.where(Booking.branch_code == branch_code)
+        rows_query = rows_query.where(TableAvailability.branch_code == branch_code)
+        clear_query = clear_query.where(TableAvailability.branch_code == branch_code)
+    if since:
+        days_query = days_query.where(Booking.date >= since)
+        rows_query = rows_query.where(TableAvailability.date >= since)
+        clear_query = clear_query.where(TableAvailability.date >= since)
+
+    days = set(conn.execute(days_query).all()) | set(conn.execute(rows_query).all())
+    conn.execute(clear_query)
+
+    written = 0
+    for day_branch, day in sorted(days):
+        written += project(conn, day_branch, day)
+    return {"days": len(days), "rows": written}
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+# (table, day) pairs touched before the flush (deletes), read back by after_flush
+_pending = change_feed("availability_projection")
+
+# (branch_code, date) -> table ids to re-project
+Touched = Dict[Tuple[str, date], Set[str]]
+
+
+def _touch(touched: Touched, branch_code: str, day: date, table_ids: Iterable[str]):
+    touched.setdefault((branch_code, day), set()).update(table_ids)
+
+
+def _blocked_tables(conn: Connection, booking_id: str) -> Set[str]:
+    """Tables the projection currently shows as blocked by the booking"""
+    return set(conn.execute(
+        select(TableAvailability.table_id).where(TableAvailability.booking_id == booking_id).distinct()
+    ).scalars())
+
+
+@event.listens_for(Session, "before_flush")
+def _release_deleted(session: Session, flush_context, instances):
+    """Detach rows from bookings / tables about to be deleted (foreign keys)"""
+    pending = _pending.state(session, dict)
+    doomed = [obj for obj in session.deleted if isinstance(obj, (Booking, Table))]
+    if not doomed:
+        return
+    conn = session.connection()
+    for obj in doomed:
+        if isinstance(obj, Booking):
+            _touch(pending, obj.branch_code, obj.date, _blocked_tables(conn, obj.id))
+            conn.execute(
+                update(TableAvailability)
+                .where(TableAvailability.booking_id == obj.id)
+                .values(booking_id=None)
+            )
+        else:
+            conn.execute(delete(TableAvailability).where(TableAvailability.table_id == obj.id))
+
+
+@event.listens_for(Session, "after_flush")
+def _project_changes(session: Session, flush_context):
+    """Re-project the (table, day) pairs touched by this flush"""
+    touched: Touched = _pending.pop(session) or {}
+    changed_tables = []
+    conn = None
+
+    for state, objects in (("new", session.new), ("dirty", session.dirty)):
+        for obj in objects:
+            if isinstance(obj, Booking):
+                conn = conn or session.connection()
+                table_ids = set(conn.execute(
+                    select(TableAssignment.table_id).where(TableAssignment.booking_id == obj.id)
+                ).scalars())
+                if state == "dirty":
+                    table_ids |= _blocked_tables(conn, obj.id)
+                    # Moved to another day / branch: clear the old one too
+                    history = inspect(obj).attrs
+                    old_branch = history.branch_code.history.deleted
+                    old_date = history.date.history.deleted
+                    if old_branch or old_date:
+                        _touch(touched, old_branch[0] if old_branch else obj.branch_code,
+                               old_date[0] if old_date else obj.date, table_ids)
+                _touch(touched, obj.branch_code, obj.date, table_ids)
+
+            elif isinstance(obj, TableAssignment):
+                conn = conn or session.connection()
+                day = conn.execute(
+                    select(Booking.branch_code, Booking.date).where(Booking.id == obj.booking_id)
+                ).first()
+                if day is not None:
+                    table_ids = {obj.table_id} | set(inspect(obj).attrs.table_id.history.deleted or ())
+                    _touch(touched, day.branch_code, day.date, table_ids)
+
+            elif isinstance(obj, Table):
+                changed_tables.append((obj.branch_code, obj.id))
+
+    for obj in session.deleted:
+        if isinstance(obj, TableAssignment):
+            conn = conn or session.connection()
+            day = conn.execute(
+                select(Booking.branch_code, Booking.date).where(Booking.id == obj.booking_id)
+            ).first()
+            if day is not None:
+                _touch(touched, day.branch_code, day.date, {obj.table_id})
+
+    if not touched and not changed_tables:
+        return
+    conn = conn or session.connection()
+    for (branch_code, day), table_ids in touched.items():
+        project(conn, branch_code, day, table_ids)
+    for branch_code, table_id in changed_tables:
+        project_table(conn, branch_code, table_id)
+
+
+# ============================================
+# READ SIDE
+# ============================================
+
+class AvailabilityProjection:
+    """Reads TableAvailability for one branch"""
+
+    def __init__(self, db: AsyncSession, branch_code: str):
+        self.db = db
+        self.branch_code = branch_code
+
+    async def free_tables(self, day: date, time_slot: str, guests: int = 0) -> List[TableInfo]:
+        """Tables that can take `guests` starting at time_slot - one indexed query"""
+        tables = await self._query(day, guests, grid_slot(time_slot))
+        if tables or await self._is_materialized(day):
+            return tables
+        return (await self._compute(day, guests)).get(grid_slot(time_slot), [])
+
+    async def open_slots(self, day: date, guests: int = 0) -> Dict[str, List[TableInfo]]:
+        """time_slot -> free tables for `guests`, for the whole day"""
+        rows = await self._rows(day, guests)
+        if not rows and not await self._is_materialized(day):
+            return await self._compute(day, guests)
+        slots: Dict[str, List[TableInfo]] = {}
+        for time_slot, table in rows:
+            slots.setdefault(time_slot, []).append(TableInfo.from_table(table))
+        return slots
+
+    async def rebuild(self, day: Optional[date] = None) -> int:
+        """Re-project one day (or every day) of the branch"""
+        if day is None:
+            result = await self.db.run_sync(lambda s: rebuild_all(s.connection(), self.branch_code))
+            written = result["rows"]
+        else:
+            written = await self.db.run_sync(lambda s: project(s.connection(), self.branch_code, day))
+        await self.db.commit()
+        return written
+
+    def _select(self, day: date, guests: int):
+        return (
+            select(TableAvailability.time_slot, Table)
+            .join(Table, Table.id == TableAvailability.table_id)
+            .where(
+                and_(
+                    TableAvailability.branch_code == self.branch_code,
+                    TableAvailability.date == day,
+                    TableAvailability.is_available == True,
+                    Table.is_active == True,
+                    Table.max_capacity >= guests,
+                )
+            )
+            .order_by(TableAvailability.time_slot, Table.zone, Table.table_number)
+        )
+
+    async def _query(self, day: date, guests: int, time_slot: str) -> List[TableInfo]:
+        result = await self.db.execute(
+            self._select(day, guests).where(TableAvailability.time_slot == time_slot)
+        )
+        return [TableInfo.from_table(table) for _, table in result.all()]
+
+    async def _rows(self, day: date, guests: int) -> list:
+        result = await self.db.execute(self._select(day, guests))
+        return result.all()
+
+    async def _is_materialized(self, day: date) -> bool:
+        return await self.db.run_sync(lambda s: _is_materialized(s.connection(), self.branch_code, day))
+
+    async def _compute(self, day: date, guests: int) -> Dict[str, List[TableInfo]]:
+        """
+        A day without rows, computed in memory from its bookings. Reads never
+        write: the day is materialized by the first booking change on it
+        (or by rebuild-availability).
+        """
+        _, rows = await self.db.run_sync(lambda s: day_rows(s.connection(), self.branch_code, day))
+        result = await self.db.execute(
+            select(Table)
+            .where(and_(Table.branch_code == self.branch_code, Table.is_active == True, Table.max_capacity >= guests))
+            .order_by(Table.zone, Table.table_number)
+        )
+        tables = {table.id: TableInfo.from_table(table) for table in result.scalars()}
+        order = {table_id: n for n, table_id in enumerate(tables)}
+
+        slots: Dict[str, List[TableInfo]] = {}
+        for row in sorted(rows, key=lambda r: (r["time_slot"], order.get(r["table_id"], 0))):
+            if row["is_available"] and row["table_id"] in tables:
+                slots.setdefault(row["time_slot"], []).append(tables[row["table_id"]])
+        return slots
@@ -0,0 +1,166 @@
+"""
+Realtime Broker - Pub/sub between worker processes
+Lets the WebSocket and SSE managers run under several uvicorn workers
+(or several nodes behind traefik): each worker delivers to its own
+clients directly and publishes through the broker so the other
+workers deliver to theirs.
+
+Backends (settings.REALTIME_BROKER):
+- memory: single process, nothing leaves the worker (default)
+- redis:  Redis pub/sub on settings.REDIS_URL (needs the `redis` package)
+
+Payloads are opaque, already-encoded strings.
+"""
+import asyncio
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+
+
+Handler = Callable[[str], Awaitable[None]]
+
+
+class Broker:
+    """Base broker: publish to *other* workers, receive from them"""
+
+    def __init__(self):
+        # Identifies this worker so it can ignore its own messages
+        self.node_id = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Handler]] = {}
+        # publish_soon tasks in flight (the loop only keeps weak references)
+        self._publishing: Set[asyncio.Task] = set()
+
+    def subscribe(self, topic: str, handler: Handler):
+        """Register a handler for messages published by other workers"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, payload: str) -> None:
+        raise NotImplementedError
+
+    def publish_soon(self, topic: str, payload: str):
+        """publish() from sync code (session hooks) without waiting for it"""
+        try:
+            task = asyncio.get_running_loop().create_task(self.publish(topic, payload))
+        except RuntimeError:
+            return  # no running loop (sync scripts)
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def drain(self):
+        """Wait for publish_soon messages still in flight"""
+        if self._publishing:
+            await asyncio.gather(*self._publishing, return_exceptions=True)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def _dispatch(self, topic: str, payload: str):
+        for handler in self._handlers.get(topic, []):
+            try:
+                await handler(payload)
+            except Exception as e:
+                print(f"❌ Broker handler failed for {topic}: {e}")
+
+
+class InMemoryBroker(Broker):
+    """
+    In-process broker.
+    Brokers sharing a hub behave like separate workers, which is how the
+    multi-worker paths are exercised without Redis.
+    """
+
+    def __init__(self, hub: Optional[List["InMemoryBroker"]] = None):
+        super().__init__()
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+
+    async def publish(self, topic: str, payload: str) -> None:
+        for peer in self.hub:
+            if peer is not self:
+                await peer._dispatch(topic, payload)
+
+
+class RedisBroker(Broker):
+    """Redis pub/sub broker - one Redis channel per topic"""
+
+    CHANNEL_PREFIX = "yakiniku:"
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.url = url
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("REALTIME_BROKER=redis requires the 'redis' package") from e
+
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        channels = [self.CHANNEL_PREFIX + topic for topic in self._handlers]
+        if channels:
+            await self._pubsub.subscribe(*channels)
+        self._listener = asyncio.create_task(self._listen())
+        print(f"📡 Redis broker connected: {self.url} (node={self.node_id})")
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def publish(self, topic: str, payload: str) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.publish(self.CHANNEL_PREFIX + topic, f"{self.node_id}\n{payload}")
+        except Exception as e:
+            # Local clients already got the message; only other workers miss it
+            print(f"❌ Redis publish failed for {topic}: {e}")
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    origin, _, payload = message["data"].partition("\n")
+                    if origin == self.node_id:
+                        continue
+                    topic = message["channel"][len(self.CHANNEL_PREFIX):]
+                    await self._dispatch(topic, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Redis broker listener error: {e}, retrying in 1s")
+                await asyncio.sleep(1)
+
+
+def create_broker(kind: str = None) -> Broker:
+    """Build the broker selected by settings.REALTIME_BROKER"""
+    kind = (kind or settings.REALTIME_BROKER).lower()
+    if kind == "redis":
+        return RedisBroker(settings.REDIS_URL)
+    if kind == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unknown REALTIME_BROKER: {kind}")
+
+
+# Shared by the WebSocket and SSE managers (started in app lifespan)
+realtime_broker = create_broker()
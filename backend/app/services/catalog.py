@@ -0,0 +1,578 @@
+"""
+Catalog Read Model - Denormalized item / option / combo view per branch
+Rendering one enhanced item needs Item -> ItemOptionAssignment ->
+ItemOptionGroup -> ItemOption, plus ComboItem -> Combo (directly or
+through the item's category and its parents). This model loads a branch
+once (7 queries) and keeps:
+
+- the normalized rows as plain dicts, keyed by id
+- one pre-built view per item in an array, addressed by a slot index, that
+  shares its option-group and combo dicts with the other items
+
+so an item tree or its combo list is one dict lookup. Committed changes
+to any of the catalog tables mark rows as stale; the next read reloads
+only those rows (by id) and rebuilds the views that depend on them.
+"""
+import asyncio
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.category import ItemCategory
+from app.models.combo import Combo, ComboItem
+from app.models.item import Item, ItemOption, ItemOptionAssignment, ItemOptionGroup
+from app.services.broker import realtime_broker
+from app.services.change_feed import change_feed
+from app.services.encoding import dumps
+
+# Stale row kinds: item, group (+ its options), assign (an item's
+# assignments), combo (+ its items), category
+Change = Tuple[str, str]
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def parse_valid_days(value: Optional[str]) -> Optional[Set[str]]:
+    """'sat,sun' / 'mon-tue-wed' -> {'sat', 'sun'}; None when every day"""
+    if not value:
+        return None
+    days = {day for day in re.split(r"[,\-\s]+", value.strip().lower()) if day}
+    return days or None
+
+
+def _number(value) -> Optional[float]:
+    """Numeric column -> int when whole, float otherwise (JSON friendly)"""
+    if value is None:
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+# ============================================
+# ROW SNAPSHOTS
+# ============================================
+
+def _item_row(item: Item) -> Dict[str, Any]:
+    return {
+        "id": item.id,
+        "sku": item.sku,
+        "name": item.name,
+        "name_en": item.name_en,
+        "description": item.description,
+        "category_id": item.category_id,
+        "base_price": _number(item.base_price),
+        "tax_rate": _number(item.tax_rate),
+        "prep_time_minutes": item.prep_time_minutes,
+        "kitchen_printer": item.kitchen_printer,
+        "display_order": item.display_order or 0,
+        "image_url": item.image_url,
+        "is_available": item.is_available,
+        "is_popular": item.is_popular,
+        "is_spicy": item.is_spicy,
+        "is_vegetarian": item.is_vegetarian,
+        "allergens": item.allergens.split(",") if item.allergens else [],
+        "has_options": item.has_options,
+        "options_required": item.options_required,
+    }
+
+
+def _group_row(group: ItemOptionGroup) -> Dict[str, Any]:
+    return {
+        "id": group.id,
+        "name": group.name,
+        "name_en": group.name_en,
+        "selection_type": group.selection_type,
+        "min_selections": group.min_selections or 0,
+        "max_selections": group.max_selections or 1,
+        "display_order": group.display_order or 0,
+        "is_active": group.is_active,
+    }
+
+
+def _option_row(option: ItemOption) -> Dict[str, Any]:
+    return {
+        "id": option.id,
+        "name": option.name,
+        "name_en": option.name_en,
+        "price_adjustment": _number(option.price_adjustment) or 0,
+        "is_default": option.is_default,
+        "display_order": option.display_order or 0,
+        "is_available": option.is_available,
+    }
+
+
+def _combo_row(combo: Combo) -> Dict[str, Any]:
+    return {
+        "id": combo.id,
+        "code": combo.code,
+        "name": combo.name,
+        "name_en": combo.name_en,
+        "discount_type": combo.discount_type,
+        "discount_value": _number(combo.discount_value),
+        "start_date": combo.start_date,
+        "end_date": combo.end_date,
+        "valid_hours_start": combo.valid_hours_start,
+        "valid_hours_end": combo.valid_hours_end,
+        "valid_days": parse_valid_days(combo.valid_days),
+        "min_order_amount": _number(combo.min_order_amount),
+        "display_order": combo.display_order or 0,
+        "is_active": combo.is_active,
+        "is_featured": combo.is_featured,
+    }
+
+
+class BranchCatalog:
+    """Rows and pre-built item views of one branch"""
+
+    def __init__(self, branch_code: str):
+        self.branch_code = branch_code
+
+        # Normalized rows
+        self.items: Dict[str, Dict] = {}
+        self.groups: Dict[str, Dict] = {}
+        self.options: Dict[str, List[Dict]] = {}            # group_id -> options
+        self.assignments: Dict[str, List[Tuple[int, str]]] = {}  # item_id -> (order, group_id)
+        self.combos: Dict[str, Dict] = {}
+        self.combo_items: Dict[str, List[Dict]] = {}        # combo_id -> requirements
+        self.category_parent: Dict[str, Optional[str]] = {}
+
+        # Views: item_id -> slot in the arrays below
+        self.slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self.views: List[Optional[Dict]] = []
+        self.item_combos: List[Tuple[str, ...]] = []        # combo ids per slot
+
+        # Shared sub-views
+        self._group_views: Dict[str, Dict] = {}
+        self._combo_views: Dict[str, Dict] = {}
+
+        self.stale: Set[Change] = set()
+
+    # ============ Reads ============
+
+    def item(self, item_id: str) -> Optional[Dict]:
+        """Item with its option groups and combos"""
+        slot = self.slots.get(item_id)
+        return self.views[slot] if slot is not None else None
+
+    def combos_for(self, item_id: str) -> Tuple[str, ...]:
+        slot = self.slots.get(item_id)
+        return self.item_combos[slot] if slot is not None else ()
+
+    def eligible_combos(self, item_id: str, at: Optional[datetime] = None) -> List[Dict]:
+        """Combos this item counts toward that are active at `at`"""
+        at = at or datetime.now()
+        return [
+            self._combo_views[combo_id]
+            for combo_id in self.combos_for(item_id)
+            if self._combo_valid(self.combos[combo_id], at)
+        ]
+
+    def categories_of(self, item_id: str) -> Set[str]:
+        """Category of an item and all its parents (empty for unknown ids)"""
+        item = self.items.get(item_id)
+        return self._category_chain(item["category_id"]) if item else set()
+
+    def all_items(self, available_only: bool = True) -> List[Dict]:
+        views = [v for v in self.views if v is not None and (v["is_available"] or not available_only)]
+        views.sort(key=lambda v: (v["category_id"] or "", v["display_order"], v["name"]))
+        return views
+
+    @staticmethod
+    def _combo_valid(combo: Dict, at: datetime) -> bool:
+        if not combo["is_active"]:
+            return False
+        if combo["start_date"] and at.date() < combo["start_date"]:
+            return False
+        if combo["end_date"] and at.date() > combo["end_date"]:
+            return False
+        if combo["valid_days"] and WEEKDAYS[at.weekday()] not in combo["valid_days"]:
+            return False
+        now = at.time()
+        if combo["valid_hours_start"] and now < combo["valid_hours_start"]:
+            return False
+        if combo["valid_hours_end"] and now > combo["valid_hours_end"]:
+            return False
+        return True
+
+    # ============ Building ============
+
+    def _category_chain(self, category_id: Optional[str]) -> Set[str]:
+        """The category and all its parents"""
+        chain = set()
+        while category_id and category_id not in chain:
+            chain.add(category_id)
+            category_id = self.category_parent.get(category_id)
+        return chain
+
+    def _build_group_view(self, group_id: str):
+        group = self.groups.get(group_id)
+        if group is None or not group["is_active"]:
+            self._group_views.pop(group_id, None)
+            return
+        options = sorted(self.options.get(group_id, []), key=lambda o: o["display_order"])
+        self._group_views[group_id] = {
+            **{k: v for k, v in group.items() if k != "is_active"},
+            "options": [o for o in options if o["is_available"]],
+        }
+
+    def _build_combo_view(self, combo_id: str):
+        combo = self.combos[combo_id]
+        self._combo_views[combo_id] = {
+            "id": combo["id"],
+            "code": combo["code"],
+            "name": combo["name"],
+            "name_en": combo["name_en"],
+            "discount_type": combo["discount_type"],
+            "discount_value": combo["discount_value"],
+            "is_featured": combo["is_featured"],
+            "requirements": [
+                {"item_id": r["item_id"], "category_id": r["category_id"], "quantity": r["quantity"]}
+                for r in self.combo_items.get(combo_id, [])
+            ],
+        }
+
+    def _combos_matching(self, item_id: str) -> Tuple[str, ...]:
+        item = self.items[item_id]
+        chain = self._category_chain(item["category_id"])
+        matched = [
+            combo_id
+            for combo_id, requirements in self.combo_items.items()
+            if combo_id in self.combos and any(
+                r["item_id"] == item_id or (r["category_id"] and r["category_id"] in chain)
+                for r in requirements
+            )
+        ]
+        matched.sort(key=lambda c: (self.combos[c]["display_order"], c))
+        return tuple(matched)
+
+    def _build_item_view(self, item_id: str):
+        item = self.items.get(item_id)
+        slot = self.slots.get(item_id)
+        if item is None:
+            if slot is not None:
+                self.views[slot] = None
+                self.item_combos[slot] = ()
+                self._free.append(slot)
+                del self.slots[item_id]
+            return
+
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self.views)
+                self.views.append(None)
+                self.item_combos.append(())
+            self.slots[item_id] = slot
+
+        combos = self._combos_matching(item_id)
+        self.item_combos[slot] = combos
+
+        groups = [
+            self._group_views[group_id]
+            for _, group_id in sorted(self.assignments.get(item_id, []))
+            if group_id in self._group_views
+        ]
+        self.views[slot] = {
+            **item,
+            "option_groups": groups,
+            "combos": [self._combo_views[c] for c in combos],
+        }
+
+    def rebuild_views(self, item_ids: Optional[Iterable[str]] = None, combos_changed: bool = False):
+        """Rebuild the given item views (all when None)"""
+        if combos_changed:
+            for combo_id in list(self._combo_views):
+                if combo_id not in self.combos:
+                    del self._combo_views[combo_id]
+            for combo_id in self.combos:
+                self._build_combo_view(combo_id)
+        if item_ids is None:
+            item_ids = set(self.items) | set(self.slots)
+        for item_id in item_ids:
+            self._build_item_view(item_id)
+
+    def owns(self, kind: str, row_id: str) -> bool:
+        """Whether a stale (kind, id) belongs to this branch"""
+        if kind == "group":
+            return row_id in self.groups
+        if kind in ("item", "assign"):
+            return row_id in self.items
+        if kind == "combo":
+            return row_id in self.combos
+        return row_id in self.category_parent
+
+    # ============ Loading ============
+
+    async def load(self, db: AsyncSession):
+        """Full load of the branch"""
+        branch = self.branch_code
+        items = (await db.execute(select(Item).where(Item.branch_code == branch))).scalars().all()
+        groups = (await db.execute(
+            select(ItemOptionGroup).where(ItemOptionGroup.branch_code == branch)
+        )).scalars().all()
+        options = (await db.execute(
+            select(ItemOption).join(ItemOptionGroup, ItemOption.group_id == ItemOptionGroup.id)
+            .where(ItemOptionGroup.branch_code == branch)
+        )).scalars().all()
+        assignments = (await db.execute(
+            select(ItemOptionAssignment).join(Item, ItemOptionAssignment.item_id == Item.id)
+            .where(Item.branch_code == branch)
+        )).scalars().all()
+        combos = (await db.execute(select(Combo).where(Combo.branch_code == branch))).scalars().all()
+        combo_items = (await db.execute(
+            select(ComboItem).join(Combo, ComboItem.combo_id == Combo.id).where(Combo.branch_code == branch)
+        )).scalars().all()
+        categories = (await db.execute(
+            select(ItemCategory.id, ItemCategory.parent_id).where(ItemCategory.branch_code == branch)
+        )).all()
+
+        self.items = {i.id: _item_row(i) for i in items}
+        self.groups = {g.id: _group_row(g) for g in groups}
+        self.options = {}
+        for option in options:
+            self.options.setdefault(option.group_id, []).append(_option_row(option))
+        self.assignments = {}
+        for a in assignments:
+            self.assignments.setdefault(a.item_id, []).append((a.display_order or 0, a.option_group_id))
+        self.combos = {c.id: _combo_row(c) for c in combos}
+        self.combo_items = {}
+        for r in combo_items:
+            self.combo_items.setdefault(r.combo_id, []).append(
+                {"item_id": r.item_id, "category_id": r.category_id, "quantity": r.quantity or 1}
+            )
+        self.category_parent = {category_id: parent_id for category_id, parent_id in categories}
+
+        for group_id in self.groups:
+            self._build_group_view(group_id)
+        self.rebuild_views(combos_changed=True)
+        self.stale.clear()
+
+    async def refresh(self, db: AsyncSession):
+        """
+        Reload the stale rows and rebuild the views that use them.
+        All queries run first; the rows are then applied and the views
+        rebuilt with no await in between, so readers on the lock-free path
+        see either the old catalog or the new one. On failure the stale
+        rows are put back for the next read.
+        """
+        stale, self.stale = self.stale, set()
+        ids: Dict[str, Set[str]] = {}
+        for kind, row_id in stale:
+            ids.setdefault(kind, set()).add(row_id)
+
+        try:
+            rows = await self._fetch(db, ids)
+        except BaseException:
+            self.stale |= stale
+            raise
+        self._apply(ids, rows)
+
+    async def _fetch(self, db: AsyncSession, ids: Dict[str, Set[str]]) -> Dict[str, tuple]:
+        """Current rows for the stale ids, by kind"""
+        rows: Dict[str, tuple] = {}
+        if "category" in ids:
+            rows["category"] = ((await db.execute(
+                select(ItemCategory.id, ItemCategory.parent_id).where(ItemCategory.id.in_(ids["category"]))
+            )).all(),)
+        if "combo" in ids:
+            rows["combo"] = (
+                (await db.execute(select(Combo).where(Combo.id.in_(ids["combo"])))).scalars().all(),
+                (await db.execute(
+                    select(ComboItem).where(ComboItem.combo_id.in_(ids["combo"]))
+                )).scalars().all(),
+            )
+        if "group" in ids:
+            rows["group"] = (
+                (await db.execute(
+                    select(ItemOptionGroup).where(ItemOptionGroup.id.in_(ids["group"]))
+                )).scalars().all(),
+                (await db.execute(
+                    select(ItemOption).where(ItemOption.group_id.in_(ids["group"]))
+                )).scalars().all(),
+            )
+        if "item" in ids:
+            rows["item"] = ((await db.execute(select(Item).where(Item.id.in_(ids["item"])))).scalars().all(),)
+        if "assign" in ids:
+            rows["assign"] = ((await db.execute(
+                select(ItemOptionAssignment).where(ItemOptionAssignment.item_id.in_(ids["assign"]))
+            )).scalars().all(),)
+        return rows
+
+    def _apply(self, ids: Dict[str, Set[str]], rows: Dict[str, tuple]):
+        """Swap in fetched rows and rebuild views (synchronous - no await)"""
+        dirty_items: Set[str] = set()
+        combos_changed = False
+
+        if "category" in ids:
+            found = dict(rows["category"][0])
+            for category_id in ids["category"]:
+                if category_id in found:
+                    self.category_parent[category_id] = found[category_id]
+                else:
+                    self.category_parent.pop(category_id, None)
+            combos_changed = True
+
+        if "combo" in ids:
+            combos, requirements = rows["combo"]
+            for combo_id in ids["combo"]:
+                self.combos.pop(combo_id, None)
+                self.combo_items.pop(combo_id, None)
+            for combo in combos:
+                if combo.branch_code == self.branch_code:
+                    self.combos[combo.id] = _combo_row(combo)
+            for r in requirements:
+                if r.combo_id in self.combos:
+                    self.combo_items.setdefault(r.combo_id, []).append(
+                        {"item_id": r.item_id, "category_id": r.category_id, "quantity": r.quantity or 1}
+                    )
+            combos_changed = True
+
+        if "group" in ids:
+            group_ids = ids["group"]
+            groups, options = rows["group"]
+            for group_id in group_ids:
+                self.groups.pop(group_id, None)
+                self.options.pop(group_id, None)
+            for group in groups:
+                if group.branch_code == self.branch_code:
+                    self.groups[group.id] = _group_row(group)
+            for option in options:
+                if option.group_id in self.groups:
+                    self.options.setdefault(option.group_id, []).append(_option_row(option))
+            for group_id in group_ids:
+                self._build_group_view(group_id)
+            dirty_items.update(
+                item_id for item_id, assigned in self.assignments.items()
+                if any(group_id in group_ids for _, group_id in assigned)
+            )
+
+        if "item" in ids:
+            for item_id in ids["item"]:
+                self.items.pop(item_id, None)
+            for item in rows["item"][0]:
+                if item.branch_code == self.branch_code:
+                    self.items[item.id] = _item_row(item)
+            dirty_items |= ids["item"]
+
+        if "assign" in ids:
+            for item_id in ids["assign"]:
+                self.assignments.pop(item_id, None)
+            for a in rows["assign"][0]:
+                self.assignments.setdefault(a.item_id, []).append((a.display_order or 0, a.option_group_id))
+            dirty_items |= ids["assign"]
+
+        if combos_changed:
+            # Membership can move between any items - rebuild them all (in memory)
+            self.rebuild_views(combos_changed=True)
+        elif dirty_items:
+            self.rebuild_views(dirty_items)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "items": len(self.slots),
+            "option_groups": len(self._group_views),
+            "combos": len(self.combos),
+            "stale": len(self.stale),
+        }
+
+
+class CatalogCache:
+    """BranchCatalog per branch, loaded on first use"""
+
+    def __init__(self):
+        self._branches: Dict[str, BranchCatalog] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # Counters
+        self.loads = 0
+        self.refreshes = 0
+
+    async def get(self, db: AsyncSession, branch_code: str) -> BranchCatalog:
+        catalog = self._branches.get(branch_code)
+        if catalog is not None and not catalog.stale:
+            return catalog
+
+        lock = self._locks.setdefault(branch_code, asyncio.Lock())
+        async with lock:
+            catalog = self._branches.get(branch_code)
+            if catalog is None:
+                catalog = BranchCatalog(branch_code)
+                await catalog.load(db)
+                self._branches[branch_code] = catalog
+                self.loads += 1
+            elif catalog.stale:
+                await catalog.refresh(db)
+                self.refreshes += 1
+        return catalog
+
+    def mark_stale(self, changes: Iterable[Tuple[Optional[str], str, str]]):
+        """(branch_code or None, kind, id): None = whichever cached branch has it"""
+        for branch_code, kind, row_id in changes:
+            targets = [self._branches[branch_code]] if branch_code in self._branches else []
+            if branch_code is None:
+                targets = [c for c in self._branches.values() if c.owns(kind, row_id)]
+            for catalog in targets:
+                catalog.stale.add((kind, row_id))
+
+    async def _on_remote_change(self, payload: str):
+        self.mark_stale(tuple(change) for change in json.loads(payload))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "branches": {code: c.get_stats() for code, c in self._branches.items()},
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+        }
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+def _change_of(obj) -> Optional[Tuple[Optional[str], str, str]]:
+    """(branch_code, kind, id) to mark stale for a changed row"""
+    if isinstance(obj, Item):
+        return (obj.branch_code, "item", obj.id)
+    if isinstance(obj, ItemOptionGroup):
+        return (obj.branch_code, "group", obj.id)
+    if isinstance(obj, ItemOption):
+        return (None, "group", obj.group_id)
+    if isinstance(obj, ItemOptionAssignment):
+        return (None, "assign", obj.item_id)
+    if isinstance(obj, Combo):
+        return (obj.branch_code, "combo", obj.id)
+    if isinstance(obj, ComboItem):
+        return (None, "combo", obj.combo_id)
+    if isinstance(obj, ItemCategory):
+        return (obj.branch_code, "category", obj.id)
+    return None
+
+
+def _collect_catalog_changes(session: Session) -> Set[Tuple[Optional[str], str, str]]:
+    changes = set()
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            change = _change_of(obj)
+            if change is not None:
+                changes.add(change)
+    return changes
+
+
+def _mark_catalog_stale(changes: Set[Tuple[Optional[str], str, str]]):
+    catalog_cache.mark_stale(changes)
+    realtime_broker.publish_soon("catalog", dumps(sorted(changes, key=lambda c: (c[1], c[2]))))
+
+
+change_feed("catalog_changes", _collect_catalog_changes, _mark_catalog_stale)
+
+
+# Global cache
+catalog_cache = CatalogCache()
+realtime_broker.subscribe("catalog", catalog_cache._on_remote_change)
@@ -0,0 +1,93 @@
+"""
+Change Feed - Session hook plumbing for state kept outside the database
+Caches, projections and pushers learn about ORM changes the same way:
+
+- after_flush: collect(session) returns what the flush changed
+- after_commit: apply(changes) with everything the transaction collected
+- after_rollback: the collected changes are dropped
+
+Changes are a set or a list (lists keep flush order). Feeds without
+collect / apply only get their per-transaction state in session.info
+dropped on commit and rollback; they fill and read it from their own
+flush hooks.
+
+Cross-worker invalidations go out with realtime_broker.publish_soon(),
+which keeps a reference to the publish task until it is done.
+"""
+from typing import Any, Callable, Collection, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ChangeFeed:
+    """One consumer's changes, kept in session.info until commit / rollback"""
+
+    def __init__(
+        self,
+        key: str,
+        collect: Optional[Callable[[Session], Collection]] = None,
+        apply: Optional[Callable[[Collection], None]] = None,
+    ):
+        self.key = key
+        self.collect = collect
+        self.apply = apply
+
+    def add(self, session: Session, changes: Collection):
+        pending = session.info.get(self.key)
+        if pending is None:
+            session.info[self.key] = changes
+        elif isinstance(pending, list):
+            pending.extend(changes)
+        else:
+            pending.update(changes)
+
+    def state(self, session: Session, factory: Callable[[], Any]) -> Any:
+        """This transaction's state, created by factory() the first time"""
+        if self.key not in session.info:
+            session.info[self.key] = factory()
+        return session.info[self.key]
+
+    def pop(self, session: Session) -> Any:
+        return session.info.pop(self.key, None)
+
+
+_feeds: List[ChangeFeed] = []
+
+
+def change_feed(
+    key: str,
+    collect: Optional[Callable[[Session], Collection]] = None,
+    apply: Optional[Callable[[Collection], None]] = None,
+) -> ChangeFeed:
+    """Register a feed; hooks run in registration order"""
+    feed = ChangeFeed(key, collect, apply)
+    _feeds.append(feed)
+    return feed
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, flush_context):
+    for feed in _feeds:
+        if feed.collect is not None:
+            changes = feed.collect(session)
+            if changes:
+                feed.add(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply(session: Session):
+    for feed in _feeds:
+        changes = feed.pop(session)
+        if changes and feed.apply is not None:
+            # The data is committed: one failing consumer must not stop the others
+            try:
+                feed.apply(changes)
+            except Exception as e:
+                print(f"❌ Change feed {feed.key} failed: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    for feed in _feeds:
+        feed.pop(session)
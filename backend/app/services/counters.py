@@ -0,0 +1,144 @@
+"""
+Counters - Atomic number sequences for order and queue numbers
+Replaces MAX(...)+1 / COUNT(...)+1 lookups, which scan and hand out the
+same number to concurrent requests.
+
+Each scope ("order:<session_id>", "queue:<branch>:<day>") is a row in
+`counters`. Numbers are reserved with one atomic
+
+    UPDATE counters SET value = value + :block WHERE scope = :scope RETURNING value
+
+in a short transaction of its own (like a database sequence, a number
+is not given back if the caller's transaction fails). The reserved block
+is handed out from memory, one number at a time, under a per-scope lock.
+
+COUNTER_BLOCK_SIZE > 1 saves round trips but, with several workers,
+numbers of one scope interleave between them - keep it at 1 there.
+Unused numbers are returned at shutdown when nobody reserved after us.
+
+Take numbers before flushing the request's own writes: on SQLite the
+reservation waits for the single writer lock.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import settings
+from app.database import engine
+from app.models.counter import Counter
+from app.models.order import Order
+
+Initial = Callable[[], Awaitable[int]]
+
+
+class CounterService:
+    """Hands out increasing numbers per scope from pre-reserved blocks"""
+
+    def __init__(self, db_engine: AsyncEngine = engine, block_size: int = settings.COUNTER_BLOCK_SIZE,
+                 max_scopes: int = 4096):
+        self._engine = db_engine
+        self.block_size = max(1, block_size)
+        self.max_scopes = max_scopes
+        # scope -> (next number, last reserved number)
+        self._ranges: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # Counters
+        self.issued = 0
+        self.reservations = 0
+
+    async def next(self, scope: str, initial: Optional[Initial] = None) -> int:
+        """
+        Next number of `scope`, starting at 1.
+        `initial` returns the highest number already in use; it is only
+        called when the scope has no counter yet (data from before counters).
+        """
+        lock = self._locks.setdefault(scope, asyncio.Lock())
+        async with lock:
+            number, last = self._ranges.get(scope, (1, 0))
+            if number > last:
+                last = await self._reserve(scope, self.block_size, initial)
+                number = last - self.block_size + 1
+            self._ranges[scope] = (number + 1, last)
+            self._ranges.move_to_end(scope)
+            self.issued += 1
+        self._evict()
+        return number
+
+    async def _reserve(self, scope: str, count: int, initial: Optional[Initial]) -> int:
+        """Atomically add `count` to the scope's counter, returns the new value"""
+        bump = (
+            update(Counter)
+            .where(Counter.scope == scope)
+            .values(value=Counter.value + count)
+            .returning(Counter.value)
+        )
+        async with self._engine.begin() as conn:
+            value = (await conn.execute(bump)).scalar()
+        if value is None:
+            # New scope - read its starting point outside our write transaction
+            start = await initial() if initial else 0
+            async with self._engine.begin() as conn:
+                insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+                # Another worker may create it first - then just bump theirs
+                await conn.execute(
+                    insert(Counter).values(scope=scope, value=start or 0).on_conflict_do_nothing()
+                )
+                value = (await conn.execute(bump)).scalar()
+        self.reservations += 1
+        return value
+
+    def _evict(self):
+        """Forget least recently used scopes (closed sessions, past days)"""
+        while len(self._ranges) > self.max_scopes:
+            scope, _ = self._ranges.popitem(last=False)
+            lock = self._locks.get(scope)
+            if lock is not None and not lock.locked():
+                del self._locks[scope]
+
+    async def release(self):
+        """Give back unused numbers of every block (shutdown)"""
+        returned = 0
+        try:
+            async with self._engine.begin() as conn:
+                for scope, (number, last) in self._ranges.items():
+                    if number > last:
+                        continue
+                    # Only if no one reserved after us
+                    result = await conn.execute(
+                        update(Counter)
+                        .where(and_(Counter.scope == scope, Counter.value == last))
+                        .values(value=number - 1)
+                    )
+                    returned += result.rowcount
+        except Exception as e:
+            print(f"⚠️ Counter release failed (numbers skipped): {e}")
+        self._ranges.clear()
+        if returned:
+            print(f"🔢 Returned unused numbers of {returned} counters")
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "scopes": len(self._ranges),
+            "issued": self.issued,
+            "reservations": self.reservations,
+            "block_size": self.block_size,
+        }
+
+
+# Global counters
+counters = CounterService()
+
+
+async def next_order_number(db: AsyncSession, session_id: str) -> int:
+    """Next order number of a table session"""
+
+    async def highest() -> int:
+        result = await db.execute(select(func.max(Order.order_number)).where(Order.session_id == session_id))
+        return result.scalar() or 0
+
+    return await counters.next(f"order:{session_id}", initial=highest)
@@ -0,0 +1,60 @@
+"""
+Message Encoding - Serialize-once payloads for broadcasts
+A broadcast to N devices should run the JSON encoder once, not N times.
+
+Uses orjson when installed, falling back to the stdlib json module with
+the same compact output Starlette's send_json produces.
+"""
+import json
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def dumps(payload: Any) -> str:
+    """Encode to compact JSON text (UTF-8 kept as-is)"""
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+class EncodedMessage:
+    """
+    A message encoded exactly once and sent as raw text/bytes to every
+    recipient. The original dict stays available for inspection
+    (routing, coalescing) but must not be mutated after encoding.
+    """
+
+    __slots__ = ("payload", "text", "_bytes")
+
+    def __init__(self, payload: Any, text: Optional[str] = None):
+        self.payload = payload
+        self.text = dumps(payload) if text is None else text
+        self._bytes: Optional[bytes] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "EncodedMessage":
+        """Rebuild from encoded text (e.g. received from another worker), keeping the text as-is"""
+        return cls(json.loads(text), text)
+
+    @property
+    def bytes(self) -> bytes:
+        if self._bytes is None:
+            self._bytes = self.text.encode("utf-8")
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __repr__(self) -> str:
+        return f"<EncodedMessage {len(self.text)} chars>"
+
+
+def encode(message: Any) -> EncodedMessage:
+    """Wrap a payload, passing already-encoded messages through"""
+    if isinstance(message, EncodedMessage):
+        return message
+    return EncodedMessage(message)
@@ -0,0 +1,231 @@
+"""
+Event Export - Event logs to columnar files for offline analysis
+Dumps order_events, kitchen_events and checkin_logs for a time range to
+one file per log, so months of history can be analysed away from the
+production database:
+
+    <out>/<log>_<since>_<until>.parquet   pyarrow installed (pip install pyarrow)
+    <out>/<log>_<since>_<until>.csv.gz    otherwise
+
+Rows are streamed (server-side cursor on PostgreSQL, yield_per batches)
+and written batch by batch, so memory stays flat whatever the range.
+Event logs are read from their archive files, month partitions and live
+table (see event_retention), oldest first.
+
+    python cli.py db export-events --since 2026-01-01 --until 2026-04-01
+"""
+import csv
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, Numeric, Table, and_, select
+from sqlalchemy.types import TypeEngine
+
+from app.database import AsyncSessionLocal
+from app.domains.checkin.models import CheckInLog
+from app.domains.kitchen.events import KitchenEvent
+from app.domains.tableorder.events import OrderEvent
+from app.services.event_retention import (
+    EventLog, add_months, kitchen_event_log, month_start, order_event_log, read_archive,
+)
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # optional
+    pyarrow = None
+
+BATCH_SIZE = 5000
+# Rows per Parquet row group (batches are buffered up to this)
+ROW_GROUP_SIZE = 100_000
+
+
+@dataclass
+class ExportSource:
+    """One exportable table"""
+    table: Table
+    time_column: str
+    event_log: Optional[EventLog] = None
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+
+SOURCES = {
+    source.name: source for source in (
+        ExportSource(OrderEvent.__table__, "timestamp", order_event_log),
+        ExportSource(KitchenEvent.__table__, "timestamp", kitchen_event_log),
+        ExportSource(CheckInLog.__table__, "created_at"),
+    )
+}
+
+
+def default_format() -> str:
+    return "parquet" if pyarrow is not None else "csv"
+
+
+def _utc(value: datetime) -> datetime:
+    """Stored timestamps are UTC; naive ones (SQLite) get the zone attached"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+# ============ Writers ============
+
+class CsvWriter:
+    """gzip'd CSV, one header row; JSON columns as JSON text"""
+    extension = "csv.gz"
+
+    def __init__(self, path: str, table: Table):
+        self.columns = [c.name for c in table.columns]
+        self._file = gzip.open(path, "wt", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(self.columns)
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return ""
+        if isinstance(value, datetime):
+            return _utc(value).isoformat()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def write(self, rows: List[dict]):
+        self._csv.writerows([self._cell(row[c]) for c in self.columns] for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Parquet (zstd), typed from the table's columns; JSON columns as JSON text"""
+    extension = "parquet"
+
+    def __init__(self, path: str, table: Table):
+        self.schema = pyarrow.schema([pyarrow.field(c.name, self._arrow_type(c.type)) for c in table.columns])
+        self._json = {c.name for c in table.columns if isinstance(c.type, JSON)}
+        self._writer = parquet.ParquetWriter(path, self.schema, compression="zstd")
+        self._pending: List[dict] = []
+
+    @staticmethod
+    def _arrow_type(column_type: TypeEngine):
+        if isinstance(column_type, DateTime):
+            return pyarrow.timestamp("us", tz="UTC")
+        if isinstance(column_type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column_type, Integer):
+            return pyarrow.int64()
+        if isinstance(column_type, (Float, Numeric)):
+            return pyarrow.float64()
+        return pyarrow.string()
+
+    def write(self, rows: List[dict]):
+        for row in rows:
+            for name in self._json:
+                if row[name] is not None:
+                    row[name] = json.dumps(row[name], ensure_ascii=False)
+        self._pending += rows
+        if len(self._pending) >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._writer.write_table(pyarrow.Table.from_pylist(self._pending, schema=self.schema))
+            self._pending = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {"parquet": ParquetWriter, "csv": CsvWriter}
+
+
+# ============ Reading ============
+
+def _archived_rows(source: ExportSource, start: datetime, end: datetime,
+                   branch_code: Optional[str]) -> Iterator[List[dict]]:
+    """Batches of rows from the event log's archive files for the range"""
+    datetimes = [c.name for c in source.table.columns if isinstance(c.type, DateTime)]
+    month = month_start(start)
+    while datetime(month.year, month.month, 1) < end:
+        for path in source.event_log.archive_files(month):
+            batch = []
+            for row in read_archive(path):
+                for name in datetimes:
+                    if row[name] is not None:
+                        row[name] = datetime.fromisoformat(row[name])
+                ts = row[source.time_column].replace(tzinfo=None)
+                if start <= ts < end and (branch_code is None or row["branch_code"] == branch_code):
+                    batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        month = add_months(month, 1)
+
+
+async def export(source: ExportSource, start: datetime, end: datetime, out_dir: str,
+                 fmt: Optional[str] = None, branch_code: Optional[str] = None) -> dict:
+    """Write the rows of [start, end) to one file in out_dir"""
+    fmt = fmt or default_format()
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow), or use --format csv")
+    writer_class = WRITERS[fmt]
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{source.name}_{start.date().isoformat()}_{end.date().isoformat()}.{writer_class.extension}")
+    started = time.perf_counter()
+    rows = 0
+
+    writer = writer_class(f"{path}.tmp", source.table)
+    try:
+        tables = [source.table]
+        if source.event_log is not None:
+            for batch in _archived_rows(source, start, end, branch_code):
+                writer.write(batch)
+                rows += len(batch)
+
+        async with AsyncSessionLocal() as db:
+            if source.event_log is not None:
+                # tables_for lists the live table first; it holds the newest rows
+                live, *partitions = await source.event_log.tables_for(db, start, end)
+                tables = partitions + [live]
+
+            for table in tables:
+                ts = table.c[source.time_column]
+                condition = and_(ts >= start, ts < end)
+                if branch_code:
+                    condition = and_(condition, table.c.branch_code == branch_code)
+                stmt = (
+                    select(*[table.c[c.name] for c in source.table.columns])
+                    .where(condition)
+                    .order_by(ts, table.c.id)
+                    .execution_options(yield_per=BATCH_SIZE)
+                )
+                result = await db.stream(stmt)
+                async for partition in result.partitions(BATCH_SIZE):
+                    writer.write([dict(row._mapping) for row in partition])
+                    rows += len(partition)
+    except BaseException:
+        writer.close()
+        os.remove(f"{path}.tmp")
+        raise
+    writer.close()
+    os.replace(f"{path}.tmp", path)
+
+    return {
+        "source": source.name,
+        "rows": rows,
+        "path": path,
+        "format": fmt,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
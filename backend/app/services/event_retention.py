@@ -0,0 +1,289 @@
+"""
+Event Retention - Monthly partitions and archive files for the event logs
+order_events and kitchen_events only keep recent months; older months
+live in one partition per month, and cold months in compressed files.
+
+    live table        current month + EVENT_HOT_MONTHS before it (all writes)
+    month partitions  closed months, until EVENT_ARCHIVE_AFTER_MONTHS
+    archive files     EVENT_ARCHIVE_DIR/<log>/<log>_YYYY-MM.jsonl.gz
+
+Partitions are native on PostgreSQL (order_events_yYYYYmMM, PARTITION OF
+order_events_archive, range on timestamp) and rolling tables of the same
+name on SQLite. The live tables stay ordinary tables: their primary key
+and the client_event_id dedup index do not include the timestamp.
+
+Readers take the tables for their time range from tables_for(); a query
+that stays inside the hot months reads the live table only.
+`python cli.py db rotate-events` moves closed months out of the live
+tables and archives cold partitions (run it from cron, e.g. daily).
+"""
+import gzip
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Index, MetaData, Table, and_, delete, func, insert, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.sql import Select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.domains.kitchen.events import KitchenEvent
+from app.domains.tableorder.events import OrderEvent
+from app.domains.tableorder.projections import PROJECTORS
+
+PARTITION_CACHE_SECONDS = 60
+_MONTH_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(ts: datetime) -> date:
+    return date(ts.year, ts.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    """[first instant, first instant of the next month)"""
+    following = add_months(month, 1)
+    return datetime(month.year, month.month, 1), datetime(following.year, following.month, 1)
+
+
+def hot_boundary(now: Optional[datetime] = None) -> datetime:
+    """Events before this belong in month partitions"""
+    return month_bounds(add_months(month_start(now or datetime.utcnow()), -settings.EVENT_HOT_MONTHS))[0]
+
+
+class EventLog:
+    """One append-only event table with its month partitions and archive"""
+
+    def __init__(self, model, projectors: Sequence = ()):
+        self.base: Table = model.__table__
+        self.name = self.base.name
+        self.projectors = list(projectors)
+        self._metadata = MetaData()
+        self._tables: Dict[str, Table] = {}
+        self._months: Optional[List[date]] = None
+        self._months_loaded = 0.0
+
+    # ============ Tables ============
+
+    def partition_name(self, month: date) -> str:
+        return f"{self.name}_y{month.year}m{month.month:02d}"
+
+    @property
+    def archive_name(self) -> str:
+        """PostgreSQL: the partitioned parent of the month partitions"""
+        return f"{self.name}_archive"
+
+    def _copy(self, name: str, primary_key: bool = True, **kwargs) -> Table:
+        """Table with the live table's columns and (non-unique) indexes"""
+        if name in self._tables:
+            return self._tables[name]
+        columns = [
+            Column(c.name, c.type, primary_key=c.primary_key and primary_key, nullable=c.nullable)
+            for c in self.base.columns
+        ]
+        indexes = [
+            Index(index.name.replace(self.name, name, 1), *[c.name for c in index.columns])
+            for index in self.base.indexes
+        ]
+        table = Table(name, self._metadata, *columns, *indexes, **kwargs)
+        self._tables[name] = table
+        return table
+
+    def partition_table(self, month: date) -> Table:
+        return self._copy(self.partition_name(month))
+
+    def archive_table(self) -> Table:
+        # Partitioned tables need the partition key in their primary key - none here
+        return self._copy(self.archive_name, primary_key=False, postgresql_partition_by='RANGE ("timestamp")')
+
+    # ============ Partitions ============
+
+    async def months(self, conn: AsyncConnection, refresh: bool = False) -> List[date]:
+        """Months that have a partition in the database (cached)"""
+        fresh = time.monotonic() - self._months_loaded < PARTITION_CACHE_SECONDS
+        if self._months is not None and fresh and not refresh:
+            return self._months
+
+        if conn.dialect.name == "postgresql":
+            result = await conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :parent"
+            ), {"parent": self.archive_name})
+        else:
+            result = await conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :pattern"
+            ), {"pattern": f"{self.name}_y%"})
+
+        months = []
+        for (name,) in result:
+            match = _MONTH_SUFFIX.search(name)
+            if match and name == self.partition_name(date(int(match[1]), int(match[2]), 1)):
+                months.append(date(int(match[1]), int(match[2]), 1))
+        self._months, self._months_loaded = sorted(months), time.monotonic()
+        return self._months
+
+    async def tables_for(self, db: AsyncSession, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> List[Table]:
+        """Tables holding events between start and end (None = unbounded)"""
+        conn = await db.connection()
+        relevant = []
+        for month in await self.months(conn):
+            lo, hi = month_bounds(month)
+            if (start is None or hi > start.replace(tzinfo=None)) and (end is None or lo <= end.replace(tzinfo=None)):
+                relevant.append(month)
+        if not relevant:
+            return [self.base]
+        if conn.dialect.name == "postgresql":
+            # The planner prunes the parent's partitions on the timestamp condition
+            return [self.base, self.archive_table()]
+        return [self.base] + [self.partition_table(month) for month in relevant]
+
+    @staticmethod
+    def union(tables: List[Table], build: Callable[[Table], Select]):
+        """build(table) for every table, as one subquery"""
+        selects = [build(table) for table in tables]
+        return (selects[0] if len(selects) == 1 else union_all(*selects)).subquery()
+
+    async def _create_partition(self, conn: AsyncConnection, month: date) -> Table:
+        if conn.dialect.name == "postgresql":
+            parent = self.archive_table()
+            await conn.run_sync(parent.create, checkfirst=True)
+            lo, hi = month_bounds(month)
+            await conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{self.partition_name(month)}" PARTITION OF "{parent.name}" '
+                f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+            ))
+            return parent
+        table = self.partition_table(month)
+        await conn.run_sync(table.create, checkfirst=True)
+        return table
+
+    # ============ Rotation ============
+
+    async def rotate(self, dry_run: bool = False) -> List[dict]:
+        """Move every closed month before the hot months out of the live table"""
+        boundary = hot_boundary()
+        timestamp = self.base.c.timestamp
+        async with engine.connect() as conn:
+            oldest = (await conn.execute(select(func.min(timestamp)))).scalar()
+        if oldest is None:
+            return []
+
+        moved = []
+        month = month_start(oldest)
+        while month_bounds(month)[0] < boundary:
+            lo, hi = month_bounds(month)
+            in_month = and_(timestamp >= lo, timestamp < hi)
+            async with engine.connect() as conn:
+                rows = (await conn.execute(select(func.count()).where(in_month))).scalar()
+            if rows and not dry_run:
+                # Order/session snapshots first: replay only reads the live table
+                for projector in self.projectors:
+                    async with AsyncSessionLocal() as db:
+                        await projector.snapshot_range(db, lo, hi)
+                async with engine.begin() as conn:
+                    target = await self._create_partition(conn, month)
+                    columns = [c.name for c in self.base.columns]
+                    await conn.execute(insert(target).from_select(columns, select(*self.base.c).where(in_month)))
+                    await conn.execute(delete(self.base).where(in_month))
+            if rows:
+                moved.append({"log": self.name, "month": month.isoformat()[:7], "rows": rows})
+            month = add_months(month, 1)
+
+        self._months = None
+        return moved
+
+    # ============ Archive ============
+
+    def archive_path(self, month: date) -> str:
+        directory = os.path.join(settings.EVENT_ARCHIVE_DIR, self.name)
+        path = os.path.join(directory, f"{self.name}_{month.isoformat()[:7]}.jsonl.gz")
+        # A later rotation of the same month never overwrites an earlier file
+        part = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, f"{self.name}_{month.isoformat()[:7]}.{part}.jsonl.gz")
+            part += 1
+        return path
+
+    def archive_files(self, month: date) -> List[str]:
+        """Archive files written for a month (a month rotated twice has two)"""
+        directory = os.path.join(settings.EVENT_ARCHIVE_DIR, self.name)
+        prefix = f"{self.name}_{month.isoformat()[:7]}."
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(".jsonl.gz")
+        )
+
+    async def archive(self, dry_run: bool = False) -> List[dict]:
+        """Write partitions older than EVENT_ARCHIVE_AFTER_MONTHS to files, then drop them"""
+        cutoff = add_months(month_start(datetime.utcnow()), -settings.EVENT_ARCHIVE_AFTER_MONTHS)
+        async with engine.connect() as conn:
+            months = [m for m in await self.months(conn, refresh=True) if m < cutoff]
+
+        archived = []
+        for month in months:
+            table = self.partition_table(month)
+            if dry_run:
+                async with engine.connect() as conn:
+                    rows = (await conn.execute(select(func.count()).select_from(table))).scalar()
+                archived.append({"log": self.name, "month": month.isoformat()[:7], "rows": rows, "path": None})
+                continue
+
+            path = self.archive_path(month)
+            rows = await self._export(table, path)
+            async with engine.begin() as conn:
+                stored = (await conn.execute(select(func.count()).select_from(table))).scalar()
+                if stored != rows:
+                    raise RuntimeError(f"{table.name}: wrote {rows} rows to {path}, table has {stored}")
+                if conn.dialect.name == "postgresql":
+                    await conn.execute(text(f'ALTER TABLE "{self.archive_name}" DETACH PARTITION "{table.name}"'))
+                await conn.execute(text(f'DROP TABLE "{table.name}"'))
+            archived.append({"log": self.name, "month": month.isoformat()[:7], "rows": rows, "path": path})
+
+        self._months = None
+        return archived
+
+    async def _export(self, table: Table, path: str, batch_size: int = 5000) -> int:
+        """Stream a partition to gzip'd JSON lines (written to .tmp, then renamed)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows = 0
+        async with engine.connect() as conn:
+            result = await conn.stream(select(table).order_by(table.c.timestamp, table.c.id))
+            with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as out:
+                async for partition in result.partitions(batch_size):
+                    for row in partition:
+                        out.write(json.dumps(dict(row._mapping), default=_encode, ensure_ascii=False))
+                        out.write("\n")
+                        rows += 1
+        os.replace(f"{path}.tmp", path)
+        return rows
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def read_archive(path: str):
+    """Rows of an archive file, as dicts (timestamps stay ISO strings)"""
+    with gzip.open(path, "rt", encoding="utf-8") as lines:
+        for line in lines:
+            yield json.loads(line)
+
+
+# Global event logs
+order_event_log = EventLog(OrderEvent, projectors=PROJECTORS.values())
+kitchen_event_log = EventLog(KitchenEvent)
+EVENT_LOGS = {log.name: log for log in (order_event_log, kitchen_event_log)}
@@ -0,0 +1,209 @@
+"""
+Menu Snapshots - Pre-serialized menu responses per branch
+Every tablet fetches the menu when a session starts; the menu only changes
+when staff edit it. Each snapshot holds the response bytes (plus gzip /
+brotli variants) so a request costs a dict lookup, or a 304.
+
+- One version counter per branch, bumped when a MenuItem commit touches it
+  (other workers are told through the realtime broker)
+- Strong ETag = content hash, so every worker agrees on it
+- Bounded LRU: views come from query strings (?category=...), so the
+  least recently used snapshots are dropped past max_snapshots
+- brotli is optional (pip install brotli)
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.models.menu import MenuItem
+from app.services.broker import realtime_broker
+from app.services.change_feed import change_feed
+from app.services.encoding import dumps
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Clients must revalidate, which costs a 304 when nothing changed
+CACHE_CONTROL = "no-cache"
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Codings from an Accept-Encoding header, minus the ones with q=0"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip() and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class MenuSnapshot:
+    """One serialized menu response and its compressed variants"""
+
+    __slots__ = ("version", "etag", "body", "encoded", "built_at")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.built_at = datetime.now()
+
+        # content-encoding -> body
+        self.encoded: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body, quality=11)
+
+    def variant_etag(self, encoding: Optional[str]) -> str:
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """If-None-Match hit for any encoding of this snapshot"""
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            tag = tag.strip('"')
+            if tag == self.etag or tag.rsplit("-", 1)[0] == self.etag:
+                return True
+        return False
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.encoded and encoding in accepted:
+                return encoding
+        return None
+
+    def to_response(self, request: Request) -> Response:
+        headers = {
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+            "X-Menu-Version": str(self.version),
+        }
+        encoding = self.choose_encoding(request.headers.get("accept-encoding", ""))
+        headers["ETag"] = self.variant_etag(encoding)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(self.encoded[encoding], media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+    def __repr__(self) -> str:
+        return f"<MenuSnapshot v{self.version} {len(self.body)}B {sorted(self.encoded)}>"
+
+
+class MenuSnapshotCache:
+    """Snapshots keyed by (branch_code, view), dropped when the branch version moves"""
+
+    def __init__(self, max_snapshots: int = 256):
+        self.max_snapshots = max_snapshots
+        self.versions: Dict[str, int] = {}
+        self._snapshots: "OrderedDict[Tuple[str, str], MenuSnapshot]" = OrderedDict()
+
+        # Counters
+        self.builds = 0
+        self.hits = 0
+
+    def version(self, branch_code: str) -> int:
+        return self.versions.get(branch_code, 1)
+
+    async def get(
+        self,
+        branch_code: str,
+        view: str,
+        build: Callable[[], Awaitable[bytes]],
+    ) -> MenuSnapshot:
+        """Cached snapshot of a view, or build() it for the current version"""
+        key = (branch_code, view)
+        version = self.version(branch_code)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.version == version:
+            self._snapshots.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+        body = await build()
+        snapshot = MenuSnapshot(version, body)
+        # Keep it only if the menu did not change while building
+        if self.version(branch_code) == version:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        self.builds += 1
+        return snapshot
+
+    def bump(self, branch_code: str):
+        self.versions[branch_code] = self.version(branch_code) + 1
+        for key in [k for k in self._snapshots if k[0] == branch_code]:
+            del self._snapshots[key]
+
+    async def _on_remote_change(self, payload: str):
+        for branch_code in payload.split(","):
+            self.bump(branch_code)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "snapshots": len(self._snapshots),
+            "builds": self.builds,
+            "hits": self.hits,
+        }
+
+
+def serialize(payload) -> bytes:
+    """Encode a response payload the way FastAPI would (compact JSON)"""
+    return dumps(payload).encode("utf-8")
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+def _collect_menu_changes(session: Session) -> Set[str]:
+    return {
+        obj.branch_code
+        for objects in (session.new, session.dirty, session.deleted)
+        for obj in objects
+        if isinstance(obj, MenuItem)
+    }
+
+
+def _bump_versions(branches: Set[str]):
+    for branch_code in branches:
+        menu_snapshots.bump(branch_code)
+    realtime_broker.publish_soon("menu", ",".join(sorted(branches)))
+
+
+change_feed("menu_changes", _collect_menu_changes, _bump_versions)
+
+
+# Global cache
+menu_snapshots = MenuSnapshotCache()
+realtime_broker.subscribe("menu", menu_snapshots._on_remote_change)
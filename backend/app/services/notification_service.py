@@ -2,12 +2,19 @@
 Notification Service - Real-time notifications using SSE
 """
 import asyncio
+import bisect
 import json
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Set, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Set, Optional, Any, Tuple
+from dataclasses import dataclass, field, asdict
 from enum import Enum
 
+from app.config import settings
+from app.services.broker import Broker, realtime_broker
+from app.services.encoding import dumps
+
 
 class NotificationType(str, Enum):
     NEW_BOOKING = "new_booking"
@@ -17,6 +24,16 @@ class NotificationType(str, Enum):
     CHAT_MESSAGE = "chat_message"
 
 
+class SSEOverflowPolicy(str, Enum):
+    """What to do when a client's queue is full"""
+    DROP_OLDEST = "drop_oldest"   # Discard the oldest queued notification
+    DISCONNECT = "disconnect"     # End the stream; the browser reconnects and replays via Last-Event-ID
+
+
+# Queued in place of a notification to end an overflowing client's stream
+STREAM_OVERFLOW = object()
+
+
 @dataclass
 class Notification:
     type: NotificationType
@@ -24,35 +41,82 @@ class Notification:
     message: str
     data: Optional[Dict[str, Any]] = None
     timestamp: str = None
+    # Event ID, assigned when broadcast (strictly increasing)
+    id: Optional[int] = None
+    # Cached SSE frame - encoded once, shared by every client queue
+    _sse: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = datetime.now().isoformat()
 
-    def to_sse(self) -> str:
-        """Format as SSE event"""
-        payload = {
+    def to_dict(self) -> Dict[str, Any]:
+        return {
             "type": self.type.value,
             "title": self.title,
             "message": self.message,
             "data": self.data or {},
             "timestamp": self.timestamp,
         }
-        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "Notification":
+        return cls(
+            type=NotificationType(payload["type"]),
+            title=payload["title"],
+            message=payload["message"],
+            data=payload.get("data"),
+            timestamp=payload.get("timestamp"),
+        )
+
+    def to_sse(self) -> str:
+        """Format as SSE event (serialized on first call only)"""
+        if self._sse is None:
+            event_id = f"id: {self.id}\n" if self.id is not None else ""
+            self._sse = f"{event_id}data: {dumps(self.to_dict())}\n\n"
+        return self._sse
 
 
 class NotificationManager:
     """
     Manages SSE connections and broadcasts notifications to connected clients.
     Each branch can have multiple connected staff members.
+
+    Every client gets a bounded queue. Each branch keeps a ring buffer of
+    its most recent notifications so a reconnecting client can resume from
+    its Last-Event-ID instead of reloading the dashboard.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        broker: Optional[Broker] = None,
+        max_queue: int = 100,
+        policy: SSEOverflowPolicy = SSEOverflowPolicy.DROP_OLDEST,
+        replay_size: int = 200,
+    ):
         # branch_code -> set of asyncio.Queue for each connected client
         self._clients: Dict[str, Set[asyncio.Queue]] = {}
         self._lock = asyncio.Lock()
         self._shutdown_event = asyncio.Event()
 
+        self.max_queue = max_queue
+        self.policy = policy
+        self.replay_size = replay_size
+        # branch_code -> recent notifications, ordered by id
+        self._recent: Dict[str, Deque[Notification]] = {}
+        # branch_code -> newest id pushed out of the ring buffer
+        self._evicted: Dict[str, int] = {}
+        self._last_id = 0
+
+        # Counters
+        self.dropped = 0
+        self.overflow_disconnects = 0
+
+        # Relays notifications to/from other workers (None = single process)
+        self.broker = broker
+        if broker is not None:
+            broker.subscribe("sse", self._on_remote_notification)
+
     @property
     def shutdown_event(self) -> asyncio.Event:
         """Get the shutdown event for SSE connections to check"""
@@ -67,11 +131,8 @@ class NotificationManager:
         async with self._lock:
             for branch_code, clients in self._clients.items():
                 for queue in clients:
-                    try:
-                        # Put None to signal shutdown
-                        await queue.put(None)
-                    except Exception:
-                        pass
+                    # Put None to signal shutdown (skipping anything still queued)
+                    self._close_queue(queue, None)
             # Clear all clients
             self._clients.clear()
 
@@ -79,15 +140,48 @@ class NotificationManager:
 
     async def connect(self, branch_code: str) -> asyncio.Queue:
         """Register a new SSE client connection"""
-        queue = asyncio.Queue()
+        queue, _ = await self.resume(branch_code, None)
+        return queue
+
+    async def resume(
+        self,
+        branch_code: str,
+        last_event_id: Optional[int],
+    ) -> Tuple[asyncio.Queue, Optional[List[Notification]]]:
+        """
+        Register a client that last saw last_event_id.
+        Returns its queue and the notifications it missed, or None when
+        they are no longer buffered (the client has to reload instead).
+        Registration and the replay snapshot happen under one lock, so
+        nothing is missed or sent twice between the two.
+        """
+        queue = asyncio.Queue(maxsize=self.max_queue)
 
         async with self._lock:
             if branch_code not in self._clients:
                 self._clients[branch_code] = set()
             self._clients[branch_code].add(queue)
+            missed = self._replay(branch_code, last_event_id) if last_event_id is not None else []
 
         print(f"📡 SSE client connected for branch: {branch_code} (total: {len(self._clients[branch_code])})")
-        return queue
+        return queue, missed
+
+    def _replay(self, branch_code: str, last_event_id: int) -> Optional[List[Notification]]:
+        recent = self._recent.get(branch_code)
+        if not recent or last_event_id >= recent[-1].id:
+            # Nothing newer - unless the id is from the future (server restarted)
+            return [] if last_event_id <= self._last_id else None
+        if last_event_id < self._evicted.get(branch_code, 0):
+            # Some of the missed notifications have already been evicted
+            return None
+        # Walk back from the newest; cost is the number of missed notifications
+        missed = []
+        for notification in reversed(recent):
+            if notification.id <= last_event_id:
+                break
+            missed.append(notification)
+        missed.reverse()
+        return missed
 
     async def disconnect(self, branch_code: str, queue: asyncio.Queue):
         """Remove a client connection"""
@@ -100,34 +194,118 @@ class NotificationManager:
         print(f"📡 SSE client disconnected from branch: {branch_code}")
 
     async def broadcast(self, branch_code: str, notification: Notification):
-        """Send notification to all connected clients for a branch"""
-        async with self._lock:
-            clients = self._clients.get(branch_code, set()).copy()
-
-        if not clients:
-            print(f"📡 No clients connected for branch: {branch_code}")
-            return
-
-        print(f"📡 Broadcasting to {len(clients)} clients: {notification.title}")
-
-        for queue in clients:
-            try:
-                await queue.put(notification)
-            except Exception as e:
-                print(f"Error broadcasting to client: {e}")
+        """Send notification to all connected clients for a branch (on every worker)"""
+        await self._deliver(branch_code, notification)
+        await self._publish(branch_code, notification)
 
     async def broadcast_all(self, notification: Notification):
         """Broadcast to all connected clients across all branches"""
+        await self._deliver(None, notification)
+        await self._publish(None, notification)
+
+    def _next_id(self) -> int:
+        """
+        Millisecond timestamp, bumped to stay strictly increasing.
+        Keeps ids increasing across restarts and roughly aligned between workers.
+        """
+        self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+        return self._last_id
+
+    async def _deliver(self, branch_code: Optional[str], notification: Notification):
+        """Queue a notification for this worker's clients (branch_code=None: all branches)"""
         async with self._lock:
-            all_clients = []
+            if notification.id is None:
+                notification.id = self._next_id()
+            else:
+                # Id assigned by another worker
+                self._last_id = max(self._last_id, notification.id)
+
+            branches = list(set(self._clients) | set(self._recent)) if branch_code is None else [branch_code]
+            clients = []
+            for code in branches:
+                self._remember(code, notification)
+                clients.extend(self._clients.get(code, ()))
+
+            if not clients:
+                if branch_code is not None:
+                    print(f"📡 No clients connected for branch: {branch_code}")
+                return
+
+            print(f"📡 Broadcasting to {len(clients)} clients: {notification.title}")
+
+            # Encode once here rather than in every client's generator
+            notification.to_sse()
+
+            for queue in clients:
+                self._offer(queue, notification)
+
+    def _remember(self, branch_code: str, notification: Notification):
+        recent = self._recent.get(branch_code)
+        if recent is None:
+            recent = self._recent[branch_code] = deque(maxlen=self.replay_size)
+        # Keep the buffer sorted by id (remote notifications can arrive out of order)
+        in_order = not recent or notification.id > recent[-1].id
+        position = len(recent) if in_order else bisect.bisect_right([n.id for n in recent], notification.id)
+        if len(recent) == recent.maxlen:
+            if position == 0:
+                self._evicted[branch_code] = max(self._evicted.get(branch_code, 0), notification.id)
+                return
+            self._evicted[branch_code] = recent.popleft().id
+            position -= 1
+        recent.insert(position, notification)
+
+    def _offer(self, queue: asyncio.Queue, notification: Notification):
+        """Queue without blocking, applying the overflow policy when full"""
+        if not queue.full():
+            queue.put_nowait(notification)
+            return
+
+        if self.policy == SSEOverflowPolicy.DISCONNECT:
+            self.overflow_disconnects += 1
             for clients in self._clients.values():
-                all_clients.extend(clients)
+                clients.discard(queue)
+            self._close_queue(queue, STREAM_OVERFLOW)
+            print("🐢 Slow SSE client disconnected (queue full)")
+            return
+
+        queue.get_nowait()
+        queue.put_nowait(notification)
+        self.dropped += 1
 
-        for queue in all_clients:
-            try:
-                await queue.put(notification)
-            except Exception as e:
-                print(f"Error broadcasting: {e}")
+    @staticmethod
+    def _close_queue(queue: asyncio.Queue, signal):
+        """Discard queued items and leave only the close signal"""
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(signal)
+
+    async def _publish(self, branch_code: Optional[str], notification: Notification):
+        if self.broker is None:
+            return
+        await self.broker.publish("sse", dumps({
+            "b": branch_code,
+            "i": notification.id,
+            "n": notification.to_dict(),
+        }))
+
+    async def _on_remote_notification(self, payload: str):
+        message = json.loads(payload)
+        notification = Notification.from_dict(message["n"])
+        notification.id = message.get("i")
+        await self._deliver(message["b"], notification)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depths, overflow counters and replay buffer sizes"""
+        depths = [queue.qsize() for clients in self._clients.values() for queue in clients]
+        return {
+            "policy": self.policy.value,
+            "clients": len(depths),
+            "queue_depth_max": max(depths, default=0),
+            "dropped": self.dropped,
+            "overflow_disconnects": self.overflow_disconnects,
+            "last_event_id": self._last_id,
+            "replay_buffered": {code: len(recent) for code, recent in self._recent.items()},
+        }
 
     def get_client_count(self, branch_code: str = None) -> int:
         """Get number of connected clients"""
@@ -137,7 +315,12 @@ class NotificationManager:
 
 
 # Singleton instance
-notification_manager = NotificationManager()
+notification_manager = NotificationManager(
+    broker=realtime_broker,
+    max_queue=settings.SSE_QUEUE_SIZE,
+    policy=SSEOverflowPolicy(settings.SSE_OVERFLOW_POLICY),
+    replay_size=settings.SSE_REPLAY_BUFFER,
+)
 
 
 # ============================================
@@ -0,0 +1,91 @@
+"""
+Order Loader - Bulk data access for order read paths
+Loads items and tables for many orders with one IN-query each,
+caching results by id for the lifetime of a request.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.order import Order, OrderItem
+from app.models.table import Table
+
+
+class OrderLoader:
+    """
+    Request-scoped bulk loader.
+
+    Every lookup goes through an identity cache, so asking twice for the
+    same order's items or the same table never hits the database again.
+    The number of statements depends on the number of *calls*, not on the
+    number of orders returned.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # order_id -> items
+        self._items: Dict[str, List[OrderItem]] = {}
+        # table_id -> table (None = known missing)
+        self._tables: Dict[str, Optional[Table]] = {}
+
+    # ============ Orders ============
+
+    async def load_orders(self, query) -> List[Order]:
+        """Run an Order query and attach items to every result"""
+        result = await self.db.execute(query)
+        orders = list(result.scalars().all())
+        await self.attach_items(orders)
+        return orders
+
+    # ============ Items ============
+
+    async def load_items(self, order_ids: Iterable[str]) -> Dict[str, List[OrderItem]]:
+        """Get items for many orders with a single IN-query"""
+        order_ids = list(dict.fromkeys(order_ids))
+        missing = [oid for oid in order_ids if oid not in self._items]
+
+        if missing:
+            for oid in missing:
+                self._items[oid] = []
+            result = await self.db.execute(
+                select(OrderItem)
+                .where(OrderItem.order_id.in_(missing))
+                .order_by(OrderItem.created_at)
+            )
+            for item in result.scalars().all():
+                self._items[item.order_id].append(item)
+
+        return {oid: self._items[oid] for oid in order_ids}
+
+    async def attach_items(self, orders: Sequence[Order]) -> None:
+        """
+        Populate ``order.items`` without triggering a lazy load.
+        Uses set_committed_value so the session sees no pending change.
+        """
+        items_by_order = await self.load_items(o.id for o in orders)
+        for order in orders:
+            set_committed_value(order, "items", items_by_order[order.id])
+
+    # ============ Tables ============
+
+    async def load_tables(self, table_ids: Iterable[str]) -> Dict[str, Optional[Table]]:
+        """Get many tables with a single IN-query"""
+        table_ids = list(dict.fromkeys(tid for tid in table_ids if tid))
+        missing = [tid for tid in table_ids if tid not in self._tables]
+
+        if missing:
+            for tid in missing:
+                self._tables[tid] = None
+            result = await self.db.execute(select(Table).where(Table.id.in_(missing)))
+            for table in result.scalars().all():
+                self._tables[table.id] = table
+
+        return {tid: self._tables[tid] for tid in table_ids}
+
+    async def get_table(self, table_id: str) -> Optional[Table]:
+        """Get a single table (cached)"""
+        tables = await self.load_tables([table_id])
+        return tables.get(table_id)
+
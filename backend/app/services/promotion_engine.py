@@ -0,0 +1,567 @@
+"""
+Promotion Engine - Combos and promotions applied to a session bill
+The active Combo / Promotion rows of a branch are compiled once into a
+RuleSet: rules with parsed validity windows, sorted in stacking order, plus
+an index of every item / category id a rule looks at. Evaluating a bill is
+one pass over its lines (counting only indexed keys), then one step per
+rule against those counters - lines + rules, not lines x rules.
+
+Stacking (deterministic):
+1. Combos by display_order, then id. A bill unit counts toward at most one
+   combo; a combo repeats up to max_uses_per_order.
+2. Promotions by priority (high first), then id. A non-stackable promotion
+   applies only when nothing applied before it, and ends the list.
+   Promotions limited per customer (birthday, first visit) need staff to
+   pass their code.
+
+Triggers look at the bill before discounts; discount_order takes its
+percentage of what is left after combos and item discounts. Discounts are
+rounded down to the yen.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import ROUND_DOWN, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.combo import Combo, ComboItem
+from app.models.promotion import Promotion
+from app.services.broker import realtime_broker
+from app.services.catalog import WEEKDAYS, BranchCatalog, parse_valid_days
+from app.services.change_feed import change_feed
+
+# ("item", id) or ("category", id)
+Key = Tuple[str, str]
+
+ZERO = Decimal("0")
+
+# discount_item reward_value below this is a percentage (雨の日半額 = 50),
+# otherwise yen off per unit (ハッピーアワー¥100OFF = 100)
+ITEM_PERCENT_LIMIT = Decimal("100")
+
+
+def _yen(amount: Decimal) -> Decimal:
+    return amount.quantize(Decimal("1"), rounding=ROUND_DOWN)
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else ZERO
+
+
+@dataclass(frozen=True)
+class Window:
+    """When a rule is valid; None fields do not restrict"""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    hours_start: Optional[time] = None
+    hours_end: Optional[time] = None
+    days: Optional[frozenset] = None
+
+    @classmethod
+    def of(cls, row) -> "Window":
+        days = parse_valid_days(row.valid_days)
+        return cls(
+            start_date=row.start_date,
+            end_date=row.end_date,
+            hours_start=row.valid_hours_start,
+            hours_end=row.valid_hours_end,
+            days=frozenset(days) if days else None,
+        )
+
+    def contains(self, at: datetime) -> bool:
+        day = at.date()
+        if self.start_date and day < self.start_date:
+            return False
+        if self.end_date and day > self.end_date:
+            return False
+        if self.days and WEEKDAYS[at.weekday()] not in self.days:
+            return False
+        now = at.time()
+        if self.hours_start and now < self.hours_start:
+            return False
+        if self.hours_end and now > self.hours_end:
+            return False
+        return True
+
+
+@dataclass
+class BillLine:
+    """One order line of a session bill"""
+    item_id: str
+    unit_price: Decimal
+    quantity: int
+    name: str = ""
+
+
+@dataclass(frozen=True)
+class Requirement:
+    key: Key
+    quantity: int
+
+
+@dataclass
+class ComboRule:
+    id: str
+    code: str
+    name: str
+    discount_type: str                 # percentage / fixed / new_price
+    discount_value: Decimal
+    requirements: Tuple[Requirement, ...]
+    window: Window
+    max_uses: Optional[int]            # per order, None = no limit
+    min_order_amount: Decimal
+    display_order: int = 0
+
+    def saving(self, price: Decimal) -> Decimal:
+        """Discount for one set whose units cost `price` a la carte (never above it)"""
+        if self.discount_type == "percentage":
+            saving = _yen(price * self.discount_value / 100)
+        elif self.discount_type == "fixed":
+            saving = self.discount_value
+        elif self.discount_type == "new_price":
+            saving = price - self.discount_value
+        else:
+            saving = ZERO
+        return min(max(saving, ZERO), price)
+
+
+@dataclass
+class PromotionRule:
+    id: str
+    code: str
+    name: str
+    trigger_type: str                  # order_amount / item_quantity / item_total
+    trigger_key: Optional[Key]
+    trigger_value: Decimal
+    reward_type: str                   # free_item / discount_item / discount_order / points_bonus
+    reward_item_id: Optional[str]
+    reward_value: Decimal
+    reward_quantity: int
+    window: Window
+    max_uses: Optional[int]            # per order, None = no limit
+    manual: bool                       # per-customer limit -> staff applies it by code
+    stackable: bool = False
+    priority: int = 0
+
+
+@dataclass
+class Adjustment:
+    """A combo or promotion applied to the bill"""
+    kind: str                          # combo / promotion
+    rule_id: str
+    code: str
+    name: str
+    uses: int
+    amount: Decimal                    # discount off the bill
+    free_items: List[Dict[str, Any]] = field(default_factory=list)  # handed out, not on the bill
+    points: Decimal = ZERO
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "id": self.rule_id,
+            "code": self.code,
+            "name": self.name,
+            "uses": self.uses,
+            "amount": float(self.amount),
+            "free_items": self.free_items,
+            "points": float(self.points),
+        }
+
+
+@dataclass
+class BillEvaluation:
+    subtotal: Decimal
+    adjustments: List[Adjustment] = field(default_factory=list)
+
+    @property
+    def discount(self) -> Decimal:
+        return sum((a.amount for a in self.adjustments), ZERO)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "subtotal": float(self.subtotal),
+            "discount": float(self.discount),
+            "adjustments": [a.to_dict() for a in self.adjustments],
+        }
+
+
+@dataclass
+class Tally:
+    """Counters of one pass over the bill, for indexed keys only"""
+    subtotal: Decimal = ZERO
+    quantity: Dict[Key, int] = field(default_factory=dict)
+    amount: Dict[Key, Decimal] = field(default_factory=dict)
+    lines: Dict[Key, List[int]] = field(default_factory=dict)   # line indexes, bill order
+
+
+# ============================================
+# COMPILING
+# ============================================
+
+def compile_combo(combo: Combo, requirements: Iterable[ComboItem]) -> ComboRule:
+    reqs = [
+        Requirement(("item", r.item_id) if r.item_id else ("category", r.category_id), r.quantity or 1)
+        for r in requirements
+        if r.item_id or r.category_id
+    ]
+    # Specific items first, so a category requirement takes what is left
+    reqs.sort(key=lambda r: r.key[0] != "item")
+    return ComboRule(
+        id=combo.id,
+        code=combo.code,
+        name=combo.name,
+        discount_type=combo.discount_type,
+        discount_value=_decimal(combo.discount_value),
+        requirements=tuple(reqs),
+        window=Window.of(combo),
+        max_uses=combo.max_uses_per_order or None,
+        min_order_amount=_decimal(combo.min_order_amount),
+        display_order=combo.display_order or 0,
+    )
+
+
+def compile_promotion(promotion: Promotion) -> PromotionRule:
+    if promotion.trigger_item_id:
+        trigger_key = ("item", promotion.trigger_item_id)
+    elif promotion.trigger_category_id:
+        trigger_key = ("category", promotion.trigger_category_id)
+    else:
+        trigger_key = None
+    return PromotionRule(
+        id=promotion.id,
+        code=promotion.code,
+        name=promotion.name,
+        trigger_type=promotion.trigger_type,
+        trigger_key=trigger_key,
+        trigger_value=_decimal(promotion.trigger_value),
+        reward_type=promotion.reward_type,
+        reward_item_id=promotion.reward_item_id,
+        reward_value=_decimal(promotion.reward_value),
+        reward_quantity=promotion.reward_quantity or 1,
+        window=Window.of(promotion),
+        max_uses=promotion.max_uses_per_order or None,
+        manual=bool(promotion.max_uses_per_customer),
+        stackable=bool(promotion.stackable),
+        priority=promotion.priority or 0,
+    )
+
+
+class RuleSet:
+    """Compiled combos and promotions of one branch"""
+
+    def __init__(self, branch_code: str, combos: Iterable[ComboRule], promotions: Iterable[PromotionRule]):
+        self.branch_code = branch_code
+        self.combos = sorted(combos, key=lambda c: (c.display_order, c.id))
+        self.promotions = sorted(promotions, key=lambda p: (-p.priority, p.id))
+
+        # Every key a rule counts, requires or rewards
+        self.keys: Set[Key] = set()
+        for combo in self.combos:
+            self.keys.update(r.key for r in combo.requirements)
+        for promotion in self.promotions:
+            if promotion.trigger_key:
+                self.keys.add(promotion.trigger_key)
+            if promotion.reward_item_id:
+                self.keys.add(("item", promotion.reward_item_id))
+
+    def __len__(self) -> int:
+        return len(self.combos) + len(self.promotions)
+
+    # ============ Pass over the bill ============
+
+    def line_keys(self, item_id: str, catalog: Optional[BranchCatalog]) -> Tuple[Key, ...]:
+        """Indexed keys a line of this item counts toward"""
+        keys = [("item", item_id)]
+        if catalog is not None:
+            keys.extend(("category", c) for c in catalog.categories_of(item_id))
+        return tuple(k for k in keys if k in self.keys)
+
+    def tally(self, lines: Sequence[BillLine], catalog: Optional[BranchCatalog]) -> Tally:
+        tally = Tally()
+        keys_of: Dict[str, Tuple[Key, ...]] = {}
+        for index, line in enumerate(lines):
+            line_total = line.unit_price * line.quantity
+            tally.subtotal += line_total
+            keys = keys_of.get(line.item_id)
+            if keys is None:
+                keys = keys_of[line.item_id] = self.line_keys(line.item_id, catalog)
+            for key in keys:
+                tally.quantity[key] = tally.quantity.get(key, 0) + line.quantity
+                tally.amount[key] = tally.amount.get(key, ZERO) + line_total
+                tally.lines.setdefault(key, []).append(index)
+        return tally
+
+    # ============ Resolving rules ============
+
+    def evaluate(
+        self,
+        lines: Sequence[BillLine],
+        catalog: Optional[BranchCatalog] = None,
+        at: Optional[datetime] = None,
+        codes: Iterable[str] = (),
+    ) -> BillEvaluation:
+        """Combos and promotions for a bill, in stacking order"""
+        return self.resolve(lines, self.tally(lines, catalog), catalog, at or datetime.now(), set(codes))
+
+    def resolve(
+        self,
+        lines: Sequence[BillLine],
+        tally: Tally,
+        catalog: Optional[BranchCatalog],
+        at: datetime,
+        codes: Set[str],
+    ) -> BillEvaluation:
+        evaluation = BillEvaluation(subtotal=tally.subtotal)
+        remaining = [line.quantity for line in lines]   # units not yet discounted
+
+        # Dearest units first: a set takes the best value, ties in bill order
+        pools = {
+            key: sorted(indexes, key=lambda i: -lines[i].unit_price)
+            for key, indexes in tally.lines.items()
+        }
+
+        for combo in self.combos:
+            if not combo.window.contains(at) or tally.subtotal < combo.min_order_amount:
+                continue
+            uses, saving = 0, ZERO
+            while combo.max_uses is None or uses < combo.max_uses:
+                taken = self._take(combo.requirements, pools, remaining)
+                if taken is None:
+                    break
+                off = combo.saving(sum((lines[i].unit_price * n for i, n in taken.items()), ZERO))
+                if off <= 0:
+                    break
+                for index, count in taken.items():
+                    remaining[index] -= count
+                uses += 1
+                saving += off
+            if uses:
+                evaluation.adjustments.append(
+                    Adjustment("combo", combo.id, combo.code, combo.name, uses, saving)
+                )
+
+        applied = False
+        for promotion in self.promotions:
+            if promotion.manual and promotion.code not in codes:
+                continue
+            if applied and not promotion.stackable:
+                continue
+            if not promotion.window.contains(at):
+                continue
+            uses = self._uses(promotion, tally)
+            if not uses:
+                continue
+            adjustment = self._reward(
+                promotion, uses, lines, pools, remaining, catalog,
+                tally.subtotal - evaluation.discount,
+            )
+            if adjustment is None:
+                continue
+            evaluation.adjustments.append(adjustment)
+            applied = True
+            if not promotion.stackable:
+                break
+
+        return evaluation
+
+    @staticmethod
+    def _take(
+        requirements: Tuple[Requirement, ...],
+        pools: Dict[Key, List[int]],
+        remaining: List[int],
+    ) -> Optional[Dict[int, int]]:
+        """line index -> units for one set, or None if the bill lacks them"""
+        taken: Dict[int, int] = {}
+        for requirement in requirements:
+            need = requirement.quantity
+            for index in pools.get(requirement.key, ()):
+                free = remaining[index] - taken.get(index, 0)
+                if free > 0:
+                    count = min(free, need)
+                    taken[index] = taken.get(index, 0) + count
+                    need -= count
+                    if not need:
+                        break
+            if need:
+                return None
+        return taken
+
+    @staticmethod
+    def _uses(promotion: PromotionRule, tally: Tally) -> int:
+        value = promotion.trigger_value
+        key = promotion.trigger_key
+        if promotion.trigger_type == "order_amount":
+            met = tally.subtotal >= value and (key is None or tally.quantity.get(key, 0) > 0)
+            uses = 1 if met else 0
+        elif promotion.trigger_type == "item_quantity" and key is not None:
+            quantity = tally.quantity.get(key, 0)
+            uses = int(quantity // value) if value > 0 else int(quantity > 0)
+        elif promotion.trigger_type == "item_total" and key is not None:
+            amount = tally.amount.get(key, ZERO)
+            uses = int(amount // value) if value > 0 else int(amount > 0)
+        else:
+            uses = 0
+        if promotion.max_uses is not None:
+            uses = min(uses, promotion.max_uses)
+        return uses
+
+    @staticmethod
+    def _reward(
+        promotion: PromotionRule,
+        uses: int,
+        lines: Sequence[BillLine],
+        pools: Dict[Key, List[int]],
+        remaining: List[int],
+        catalog: Optional[BranchCatalog],
+        open_amount: Decimal,
+    ) -> Optional[Adjustment]:
+        adjustment = Adjustment("promotion", promotion.id, promotion.code, promotion.name, uses, ZERO)
+        reward = promotion.reward_type
+
+        if reward == "free_item" and promotion.reward_item_id:
+            # Units already ordered become free, the rest are handed out
+            count = uses * promotion.reward_quantity
+            for index in reversed(pools.get(("item", promotion.reward_item_id), [])):
+                if not count:
+                    break
+                free = min(remaining[index], count)
+                remaining[index] -= free
+                count -= free
+                adjustment.amount += lines[index].unit_price * free
+            if count:
+                item = catalog.items.get(promotion.reward_item_id) if catalog else None
+                adjustment.free_items.append({
+                    "item_id": promotion.reward_item_id,
+                    "name": item["name"] if item else "",
+                    "quantity": count,
+                })
+
+        elif reward == "discount_item":
+            # reward_quantity units per use, dearest first
+            key = ("item", promotion.reward_item_id) if promotion.reward_item_id else promotion.trigger_key
+            value = promotion.reward_value
+            count = uses * promotion.reward_quantity
+            for index in pools.get(key, ()) if key else ():
+                if not count:
+                    break
+                units = min(remaining[index], count)
+                price = lines[index].unit_price
+                off = _yen(price * value / 100) if value < ITEM_PERCENT_LIMIT else min(value, price)
+                adjustment.amount += off * units
+                remaining[index] -= units
+                count -= units
+            if adjustment.amount <= 0:
+                return None
+
+        elif reward == "discount_order":
+            adjustment.amount = _yen(max(open_amount, ZERO) * promotion.reward_value / 100)
+
+        elif reward == "points_bonus":
+            adjustment.points = promotion.reward_value * uses
+
+        else:
+            return None
+
+        if adjustment.amount <= 0 and not adjustment.free_items and not adjustment.points:
+            return None
+        return adjustment
+
+
+async def compile_rules(db: AsyncSession, branch_code: str) -> RuleSet:
+    """Active combos and promotions of a branch (3 queries)"""
+    combos = (await db.execute(
+        select(Combo).where(and_(Combo.branch_code == branch_code, Combo.is_active == True))
+    )).scalars().all()
+    requirements = (await db.execute(
+        select(ComboItem).join(Combo, ComboItem.combo_id == Combo.id)
+        .where(and_(Combo.branch_code == branch_code, Combo.is_active == True))
+    )).scalars().all()
+    promotions = (await db.execute(
+        select(Promotion).where(and_(Promotion.branch_code == branch_code, Promotion.is_active == True))
+    )).scalars().all()
+
+    by_combo: Dict[str, List[ComboItem]] = {}
+    for requirement in requirements:
+        by_combo.setdefault(requirement.combo_id, []).append(requirement)
+    return RuleSet(
+        branch_code,
+        [compile_combo(c, by_combo.get(c.id, [])) for c in combos],
+        [compile_promotion(p) for p in promotions],
+    )
+
+
+class RuleSetCache:
+    """Compiled RuleSet per branch, dropped when its rows change"""
+
+    def __init__(self):
+        self._rules: Dict[str, RuleSet] = {}
+        self._generation = 0
+
+        # Counters
+        self.compiles = 0
+        self.hits = 0
+
+    async def get(self, db: AsyncSession, branch_code: str) -> RuleSet:
+        rules = self._rules.get(branch_code)
+        if rules is not None:
+            self.hits += 1
+            return rules
+
+        generation = self._generation
+        rules = await compile_rules(db, branch_code)
+        # Keep it only if no rule changed while compiling
+        if self._generation == generation:
+            self._rules[branch_code] = rules
+        self.compiles += 1
+        return rules
+
+    def invalidate(self, branches: Iterable[Optional[str]]):
+        """Drop branches (None = all)"""
+        self._generation += 1
+        for branch_code in branches:
+            if branch_code is None:
+                self._rules.clear()
+                return
+            self._rules.pop(branch_code, None)
+
+    async def _on_remote_change(self, payload: str):
+        self.invalidate(None if b == "*" else b for b in payload.split(","))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "branches": {code: len(rules) for code, rules in self._rules.items()},
+            "compiles": self.compiles,
+            "hits": self.hits,
+        }
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+def _collect_rule_changes(session: Session) -> Set[Optional[str]]:
+    branches: Set[Optional[str]] = set()
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            if isinstance(obj, (Promotion, Combo)):
+                branches.add(obj.branch_code)
+            elif isinstance(obj, ComboItem):
+                branches.add(None)
+    return branches
+
+
+def _drop_rule_sets(branches: Set[Optional[str]]):
+    promotion_rules.invalidate(branches)
+    realtime_broker.publish_soon("promotions", ",".join(sorted(b or "*" for b in branches)))
+
+
+change_feed("promotion_changes", _collect_rule_changes, _drop_rule_sets)
+
+
+# Global cache
+promotion_rules = RuleSetCache()
+realtime_broker.subscribe("promotions", promotion_rules._on_remote_change)
@@ -0,0 +1,172 @@
+"""
+Session Totals - Running bill kept in TableSession.total_amount
+While a session is unpaid, total_amount is the sum of price x quantity of
+its billable items: items not voided, on orders not cancelled. Checkout
+then stores the amount paid.
+
+The total moves by deltas inside the flush that changes an Order or
+OrderItem, whichever router or service made the change:
+
+- before_flush: billable amount of each touched order, as in the database
+- after_flush: the same orders again; total_amount += new - old
+
+Migration b2d6f8a4c1e9 re-sums the sessions already open when the hooks
+were deployed. `python cli.py db reconcile-sessions` re-sums open
+sessions from their items and reports (or --fix-es) the ones that drifted.
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, event, func, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.order import Order, OrderItem, OrderStatus, TableSession
+from app.services.change_feed import change_feed
+
+CANCELLED = OrderStatus.CANCELLED.value
+
+
+def _billable_amount():
+    """SUM of billable item amounts (use with OrderItem joined to Order)"""
+    return func.coalesce(func.sum(
+        case(
+            (and_(Order.status != CANCELLED, OrderItem.status != CANCELLED),
+             OrderItem.item_price * OrderItem.quantity),
+            else_=0,
+        )
+    ), 0)
+
+
+def order_amounts(conn: Connection, order_ids: Iterable[str]) -> Dict[str, Tuple[str, Decimal]]:
+    """order_id -> (session_id, billable amount) as currently stored"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    rows = conn.execute(
+        select(Order.id, Order.session_id, _billable_amount())
+        .select_from(Order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .where(Order.id.in_(order_ids))
+        .group_by(Order.id, Order.session_id)
+    )
+    return {order_id: (session_id, Decimal(amount or 0)) for order_id, session_id, amount in rows}
+
+
+def session_amounts(conn: Connection, session_ids: Optional[Iterable[str]] = None,
+                    branch_code: Optional[str] = None) -> Dict[str, Decimal]:
+    """session_id -> billable amount summed from the raw items"""
+    query = (
+        select(Order.session_id, _billable_amount())
+        .select_from(Order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .group_by(Order.session_id)
+    )
+    if session_ids is not None:
+        query = query.where(Order.session_id.in_(list(session_ids)))
+    if branch_code:
+        query = query.where(Order.branch_code == branch_code)
+    return {session_id: Decimal(amount or 0) for session_id, amount in conn.execute(query)}
+
+
+def reconcile(conn: Connection, branch_code: Optional[str] = None, fix: bool = False) -> List[Dict]:
+    """
+    Compare total_amount of unpaid sessions with their items.
+    Returns the drifted sessions; rewrites them when fix=True.
+    """
+    query = select(TableSession.id, TableSession.branch_code, TableSession.total_amount).where(
+        TableSession.is_paid == False
+    )
+    if branch_code:
+        query = query.where(TableSession.branch_code == branch_code)
+    sessions = conn.execute(query).all()
+    actual = session_amounts(conn, [s.id for s in sessions]) if sessions else {}
+
+    drifted = []
+    for session_id, session_branch, stored in sessions:
+        expected = actual.get(session_id, Decimal("0"))
+        stored = Decimal(stored or 0)
+        if stored != expected:
+            drifted.append({
+                "session_id": session_id,
+                "branch_code": session_branch,
+                "stored": stored,
+                "expected": expected,
+            })
+            if fix:
+                conn.execute(
+                    update(TableSession).where(TableSession.id == session_id).values(total_amount=expected)
+                )
+    return drifted
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+# Order amounts before the flush, read back by after_flush
+_snapshots = change_feed("session_totals")
+
+
+def _touched_orders(session: Session) -> Tuple[Set[str], List[Order]]:
+    """Persisted order ids and pending Order objects changed by this flush"""
+    ids: Set[str] = set()
+    pending: List[Order] = []
+
+    def add(order: Optional[Order], order_id: Optional[str]):
+        if order is not None and order.id is None:
+            pending.append(order)
+        elif order is not None:
+            ids.add(order.id)
+        elif order_id:
+            ids.add(order_id)
+
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            if isinstance(obj, Order):
+                add(obj, None)
+            elif isinstance(obj, OrderItem):
+                add(obj.__dict__.get("order"), obj.order_id)
+                # Moved to another order
+                ids.update(o for o in inspect(obj).attrs.order_id.history.deleted or () if o)
+    return ids, pending
+
+
+@event.listens_for(Session, "before_flush")
+def _snapshot_order_amounts(session: Session, flush_context, instances):
+    ids, pending = _touched_orders(session)
+    if not ids and not pending:
+        return
+    old = order_amounts(session.connection(), ids)
+    state = _snapshots.state(session, lambda: {"old": {}, "ids": set(), "pending": []})
+    for order_id, value in old.items():
+        state["old"].setdefault(order_id, value)
+    state["ids"] |= ids
+    state["pending"].extend(pending)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_order_deltas(session: Session, flush_context):
+    state = _snapshots.pop(session)
+    if not state:
+        return
+    ids = state["ids"] | {order.id for order in state["pending"] if order.id}
+    conn = session.connection()
+    new = order_amounts(conn, ids)
+
+    deltas: Dict[str, Decimal] = {}
+    for order_id in ids:
+        if order_id in state["old"]:
+            session_id, amount = state["old"][order_id]
+            deltas[session_id] = deltas.get(session_id, Decimal("0")) - amount
+        if order_id in new:
+            session_id, amount = new[order_id]
+            deltas[session_id] = deltas.get(session_id, Decimal("0")) + amount
+
+    for session_id, delta in deltas.items():
+        if delta:
+            conn.execute(
+                update(TableSession)
+                .where(and_(TableSession.id == session_id, TableSession.is_paid == False))
+                .values(total_amount=func.coalesce(TableSession.total_amount, 0) + delta)
+            )
@@ -7,13 +7,17 @@ from datetime import date, datetime, time, timedelta
 from typing import List, Optional, Dict, Any, Tuple
 from enum import Enum
 import json
+import time as time_module
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func, case
-from sqlalchemy.orm import selectinload
 
-from app.models.table import Table, TableAssignment, TableStatus
-from app.models.booking import Booking, BookingStatus
+from app.models.table import TableAssignment, TableStatus
+from app.models.booking import Booking
+from app.services.availability import ACTIVE_STATUSES, TableInfo, availability_engine, slot_minutes
+from app.services.availability_projection import AvailabilityProjection
+from app.services.table_solver import BatchBooking, solve_evening
+from app.services.timeline import DayTimeline, build_timeline, timeline_cache
 
 
 class OptimizationStrategy(str, Enum):
@@ -118,6 +122,15 @@ class TableOptimizationService:
         # Lấy tất cả bàn available cho slot này
         available_tables = await self._get_available_tables(booking_date, time_slot)
 
+        return self._rank_tables(available_tables, guests, strategy)
+
+    def _rank_tables(
+        self,
+        available_tables: List[TableInfo],
+        guests: int,
+        strategy: OptimizationStrategy = OptimizationStrategy.MINIMIZE_WASTE
+    ) -> List[TableSuggestion]:
+        """Chấm điểm và sắp xếp các bàn còn trống"""
         if not available_tables:
             return []
 
@@ -151,7 +164,7 @@ class TableOptimizationService:
 
     def _calculate_table_score(
         self,
-        table: Table,
+        table: TableInfo,
         guests: int,
         strategy: OptimizationStrategy
     ) -> Tuple[float, str]:
@@ -199,36 +212,14 @@ class TableOptimizationService:
         self,
         booking_date: date,
         time_slot: str
-    ) -> List[Table]:
-        """Lấy danh sách bàn còn trống cho slot"""
-        # Lấy tất cả bàn của branch
-        tables_query = select(Table).where(
-            and_(
-                Table.branch_code == self.branch_code,
-                Table.is_active == True
-            )
-        )
-        tables_result = await self.db.execute(tables_query)
-        all_tables = tables_result.scalars().all()
-
-        # Lấy các bàn đã được assign cho slot này
-        booked_tables_query = select(TableAssignment.table_id).join(
-            Booking
-        ).where(
-            and_(
-                Booking.branch_code == self.branch_code,
-                Booking.date == booking_date,
-                Booking.time == time_slot,
-                Booking.status.in_(["pending", "confirmed"])
-            )
-        )
-        booked_result = await self.db.execute(booked_tables_query)
-        booked_table_ids = {r[0] for r in booked_result.fetchall()}
-
-        # Lọc ra bàn còn trống
-        available = [t for t in all_tables if t.id not in booked_table_ids]
-
-        return available
+    ) -> List[TableInfo]:
+        """
+        Lấy danh sách bàn còn trống cho slot.
+        Bàn bị chiếm từ giờ đặt đến hết AVERAGE_DINING_TIME + TURNOVER_BUFFER;
+        dữ liệu của cả ngày được nạp một lần vào availability engine.
+        """
+        day = await availability_engine.get_day(self.db, self.branch_code, booking_date)
+        return day.free_tables(time_slot)
 
     # ==========================================
     # AVAILABILITY CHECK
@@ -272,6 +263,52 @@ class TableOptimizationService:
                       (f"代わりに{len(alternatives)}つの時間帯がございます。" if alternatives else "")
         }
 
+    async def check_projected_availability(
+        self,
+        guests: int,
+        booking_date: date,
+        time_slot: str,
+        range_hours: int = 2
+    ) -> Dict[str, Any]:
+        """
+        Giống check_availability nhưng đọc bảng TableAvailability đã materialize:
+        1 query có index cho slot yêu cầu, thêm 1 query nếu cần tìm slot thay thế
+        """
+        projection = AvailabilityProjection(self.db, self.branch_code)
+        suggestions = self._rank_tables(
+            await projection.free_tables(booking_date, time_slot, guests), guests
+        )
+
+        if suggestions:
+            return {
+                "available": True,
+                "tables": suggestions,
+                "alternatives": [],
+                "message": f"{len(suggestions)}席ご案内可能です"
+            }
+
+        requested = slot_minutes(time_slot)
+        alternatives = []
+        for slot, tables in (await projection.open_slots(booking_date, guests)).items():
+            diff_minutes = slot_minutes(slot) - requested
+            if slot == time_slot or abs(diff_minutes) > range_hours * 60:
+                continue
+            alternatives.append({
+                "time": slot,
+                "tables": self._rank_tables(tables, guests)[:2],  # Top 2
+                "diff_minutes": diff_minutes
+            })
+        alternatives.sort(key=lambda a: abs(a["diff_minutes"]))
+        alternatives = alternatives[:5]
+
+        return {
+            "available": False,
+            "tables": [],
+            "alternatives": alternatives,
+            "message": "申し訳ございません、ご希望の時間は満席です。" +
+                      (f"代わりに{len(alternatives)}つの時間帯がございます。" if alternatives else "")
+        }
+
     async def _find_alternative_slots(
         self,
         guests: int,
@@ -280,12 +317,6 @@ class TableOptimizationService:
         range_hours: int = 2
     ) -> List[Dict]:
         """Tìm các slot thay thế trong vòng ±range_hours"""
-        alternatives = []
-
-        # Parse requested time
-        req_hour, req_min = map(int, requested_slot.split(":"))
-        req_minutes = req_hour * 60 + req_min
-
         # Generate slots to check
         all_slots = [
             f"{h:02d}:{m:02d}"
@@ -294,29 +325,18 @@ class TableOptimizationService:
             if not (h == 22 and m == 30)
         ]
 
-        for slot in all_slots:
-            if slot == requested_slot:
-                continue
+        # One cached branch-day answers every slot
+        day = await availability_engine.get_day(self.db, self.branch_code, booking_date)
 
-            # Check if within range
-            slot_hour, slot_min = map(int, slot.split(":"))
-            slot_minutes = slot_hour * 60 + slot_min
-
-            if abs(slot_minutes - req_minutes) > range_hours * 60:
-                continue
-
-            # Check availability
-            tables = await self.find_best_tables(guests, booking_date, slot)
-
-            if tables:
-                alternatives.append({
-                    "time": slot,
-                    "tables": tables[:2],  # Top 2
-                    "diff_minutes": slot_minutes - req_minutes
-                })
-
-        # Sort by closest to requested time
-        alternatives.sort(key=lambda x: abs(x["diff_minutes"]))
+        alternatives = []
+        for slot, diff_minutes, tables in day.nearest_alternatives(
+            guests, requested_slot, all_slots, range_hours * 60
+        ):
+            alternatives.append({
+                "time": slot,
+                "tables": self._rank_tables(tables, guests)[:2],  # Top 2
+                "diff_minutes": diff_minutes
+            })
 
         return alternatives[:5]  # Top 5 alternatives
 
@@ -324,74 +344,28 @@ class TableOptimizationService:
     # ANALYTICS & INSIGHTS
     # ==========================================
 
+    async def get_timeline(self, target_date: date) -> DayTimeline:
+        """Summaries + Gantt + waste của ngày, tính 1 lần và cache theo (branch, date)"""
+        timeline = timeline_cache.get(self.branch_code, target_date)
+        if timeline is None:
+            timeline = await build_timeline(
+                self.db,
+                self.branch_code,
+                target_date,
+                slot_duration=self.SLOT_DURATION,
+                dining_time=self.AVERAGE_DINING_TIME,
+                summary_factory=TimeSlotSummary,
+            )
+            timeline_cache.put(self.branch_code, target_date, timeline)
+        return timeline
+
     async def get_time_slot_summary(
         self,
         target_date: date
     ) -> List[TimeSlotSummary]:
         """Tổng hợp tình trạng tất cả các slot trong ngày"""
-        # Lấy tất cả bàn
-        tables_query = select(Table).where(
-            and_(
-                Table.branch_code == self.branch_code,
-                Table.is_active == True
-            )
-        )
-        tables_result = await self.db.execute(tables_query)
-        all_tables = list(tables_result.scalars().all())
-
-        total_capacity = sum(t.max_capacity for t in all_tables)
-
-        # Lấy tất cả booking trong ngày
-        bookings_query = select(Booking).where(
-            and_(
-                Booking.branch_code == self.branch_code,
-                Booking.date == target_date,
-                Booking.status.in_(["pending", "confirmed"])
-            )
-        )
-        bookings_result = await self.db.execute(bookings_query)
-        bookings = list(bookings_result.scalars().all())
-
-        # Group bookings by time
-        bookings_by_time: Dict[str, List[Booking]] = {}
-        for b in bookings:
-            if b.time not in bookings_by_time:
-                bookings_by_time[b.time] = []
-            bookings_by_time[b.time].append(b)
-
-        # Generate all slots
-        all_slots = [
-            f"{h:02d}:{m:02d}"
-            for h in range(17, 23)
-            for m in [0, 30]
-            if not (h == 22 and m == 30)
-        ]
-
-        summaries = []
-
-        for slot in all_slots:
-            slot_bookings = bookings_by_time.get(slot, [])
-            used_capacity = sum(b.guests for b in slot_bookings)
-            available_capacity = total_capacity - used_capacity
-
-            occupied = len(slot_bookings)
-            available = len(all_tables) - occupied
-
-            utilization = (used_capacity / total_capacity * 100) if total_capacity > 0 else 0
-
-            summaries.append(TimeSlotSummary(
-                time_slot=slot,
-                total_tables=len(all_tables),
-                available_tables=available,
-                occupied_tables=occupied,
-                total_capacity=total_capacity,
-                used_capacity=used_capacity,
-                available_capacity=available_capacity,
-                utilization_rate=round(utilization, 1),
-                tables=[]  # Populate if needed
-            ))
-
-        return summaries
+        timeline = await self.get_timeline(target_date)
+        return timeline.summaries
 
     async def generate_insights(
         self,
@@ -456,32 +430,9 @@ class TableOptimizationService:
         """Kiểm tra lãng phí capacity"""
         insights = []
 
-        # Lấy bookings với table assignment
-        query = select(Booking, TableAssignment, Table).join(
-            TableAssignment, Booking.id == TableAssignment.booking_id
-        ).join(
-            Table, TableAssignment.table_id == Table.id
-        ).where(
-            and_(
-                Booking.branch_code == self.branch_code,
-                Booking.date == target_date,
-                Booking.status.in_(["pending", "confirmed"])
-            )
-        )
-
-        result = await self.db.execute(query)
-        rows = result.fetchall()
-
-        waste_cases = []
-
-        for booking, assignment, table in rows:
-            waste = table.max_capacity - booking.guests
-            if waste >= 3:  # 3+ ghế thừa
-                waste_cases.append({
-                    "booking": booking,
-                    "table": table,
-                    "waste": waste
-                })
+        # Booking đã xếp bàn với 3+ ghế thừa
+        timeline = await self.get_timeline(target_date)
+        waste_cases = timeline.waste_cases
 
         if waste_cases:
             total_waste = sum(c["waste"] for c in waste_cases)
@@ -494,10 +445,10 @@ class TableOptimizationService:
                 data={
                     "waste_cases": [
                         {
-                            "time": c["booking"].time,
-                            "guests": c["booking"].guests,
-                            "table": c["table"].table_number,
-                            "capacity": c["table"].max_capacity
+                            "time": c["time"],
+                            "guests": c["guests"],
+                            "table": c["table"],
+                            "capacity": c["capacity"]
                         }
                         for c in waste_cases
                     ]
@@ -569,111 +520,141 @@ class TableOptimizationService:
         return new_assignment
 
     # ==========================================
-    # GANTT CHART DATA
+    # BATCH OPTIMIZATION (cả buổi tối)
     # ==========================================
 
-    async def get_gantt_data(
+    async def optimize_evening(
         self,
-        target_date: date
+        target_date: date,
+        strategy: OptimizationStrategy = OptimizationStrategy.MINIMIZE_WASTE,
+        apply: bool = False
     ) -> Dict[str, Any]:
         """
-        Get data for Gantt chart visualization
+        Xếp lại bàn cho tất cả booking pending/confirmed trong ngày cùng lúc.
 
-        Returns:
-        - tables: List of tables with their bookings
-        - time_slots: List of time slots (17:00-22:00)
-        - bookings_map: Dict mapping table_id -> list of booking blocks
+        Returns the proposed reassignments (diff against the current
+        assignments); with apply=True they are written in one commit.
         """
-        # Get all tables
-        tables_query = select(Table).where(
-            and_(
-                Table.branch_code == self.branch_code,
-                Table.is_active == True
-            )
-        ).order_by(Table.zone, Table.table_number)
-        tables_result = await self.db.execute(tables_query)
-        tables = tables_result.scalars().all()
-
-        # Get all bookings for the date
-        bookings_query = (
-            select(Booking)
-            .options(selectinload(Booking.table_assignments))
+        started = time_module.perf_counter()
+
+        day = await availability_engine.get_day(self.db, self.branch_code, target_date)
+        tables_by_id = {t.id: t for t in day.tables}
+
+        rows = (await self.db.execute(
+            select(Booking.id, Booking.time, Booking.guests, TableAssignment.table_id)
+            .outerjoin(TableAssignment, TableAssignment.booking_id == Booking.id)
             .where(
                 and_(
                     Booking.branch_code == self.branch_code,
                     Booking.date == target_date,
-                    Booking.status.not_in([BookingStatus.CANCELLED, BookingStatus.NO_SHOW])
+                    Booking.status.in_(ACTIVE_STATUSES)
                 )
             )
-            .order_by(Booking.time)
-        )
-        bookings_result = await self.db.execute(bookings_query)
-        bookings = bookings_result.scalars().all()
-
-        # Time slots from 17:00 to 22:30 (30 min intervals)
-        time_slots = []
-        start_hour = 17
-        end_hour = 23
-        for hour in range(start_hour, end_hour):
-            time_slots.append(f"{hour:02d}:00")
-            if hour < end_hour - 1 or (hour == end_hour - 1 and hour == 22):
-                time_slots.append(f"{hour:02d}:30")
-
-        # Build bookings map by table
-        bookings_by_table: Dict[str, List[Dict]] = {str(t.id): [] for t in tables}
+            .order_by(Booking.time, Booking.id)
+        )).fetchall()
+
+        bookings: Dict[str, BatchBooking] = {}
+        for booking_id, time_slot, guests, table_id in rows:
+            if booking_id not in bookings:
+                bookings[booking_id] = BatchBooking(
+                    id=booking_id,
+                    start=day.slot_index(time_slot),
+                    guests=guests,
+                    time=time_slot,
+                )
+            if table_id in tables_by_id and bookings[booking_id].current_table_id is None:
+                bookings[booking_id].current_table_id = table_id
 
-        # Create time_slot to index map for quick lookup
-        slot_index_map = {slot: idx for idx, slot in enumerate(time_slots)}
+        def cost(table: TableInfo, booking: BatchBooking) -> float:
+            score, _ = self._calculate_table_score(table, booking.guests, strategy)
+            return 100 - score
 
-        # Also track unassigned bookings
-        unassigned_bookings = []
+        proposed = solve_evening(day.tables, list(bookings.values()), day.span, cost)
 
-        for booking in bookings:
-            time_str = booking.time[:5] if len(booking.time) >= 5 else booking.time
-            slot_index = slot_index_map.get(time_str, -1)
+        def waste(assignment: Dict[str, Optional[str]]) -> int:
+            return sum(
+                tables_by_id[table_id].max_capacity - bookings[booking_id].guests
+                for booking_id, table_id in assignment.items()
+                if table_id
+            )
 
-            booking_block = {
-                "id": str(booking.id),
+        current = {b.id: b.current_table_id for b in bookings.values()}
+        changes = []
+        unseated = []
+        for booking in bookings.values():
+            new_table_id = proposed[booking.id]
+            if new_table_id == booking.current_table_id:
+                continue
+            change = {
+                "booking_id": booking.id,
                 "time": booking.time,
-                "time_str": time_str,
-                "slot_index": slot_index,  # Pre-calculated slot index
                 "guests": booking.guests,
-                "customer_name": booking.guest_name or "ゲスト",
-                "status": booking.status,
-                "duration_slots": 3,  # 90 min = 3 slots of 30 min
-                "notes": booking.note or "",
+                "from_table": tables_by_id[booking.current_table_id].table_number if booking.current_table_id else None,
+                "to_table": tables_by_id[new_table_id].table_number if new_table_id else None,
+                "to_table_id": new_table_id,
             }
+            # Never drop an existing assignment - report it instead
+            (changes if new_table_id else unseated).append(change)
+
+        # Only apply a plan that keeps every currently seated booking seated
+        applied = bool(apply and changes and not unseated)
+        if applied:
+            changed_ids = [c["booking_id"] for c in changes]
+            old_assignments = await self.db.execute(
+                select(TableAssignment).where(TableAssignment.booking_id.in_(changed_ids))
+            )
+            for assignment in old_assignments.scalars().all():
+                await self.db.delete(assignment)
+            for change in changes:
+                self.db.add(TableAssignment(
+                    booking_id=change["booking_id"],
+                    table_id=change["to_table_id"],
+                    notes=f"Batch optimized ({strategy.value})"
+                ))
+            await self.db.commit()
 
-            # Find table assignment
-            if booking.table_assignments:
-                for assignment in booking.table_assignments:
-                    table_id = str(assignment.table_id)
-                    if table_id in bookings_by_table:
-                        bookings_by_table[table_id].append(booking_block)
-            else:
-                unassigned_bookings.append(booking_block)
-
-        # Convert tables to response format
-        tables_data = []
-        for table in tables:
-            table_bookings = bookings_by_table.get(str(table.id), [])
-            tables_data.append({
-                "id": str(table.id),
-                "table_number": table.table_number,
-                "name": table.name or "",
-                "max_capacity": table.max_capacity,
-                "table_type": table.table_type,
-                "zone": table.zone or "",
-                "bookings": table_bookings,
-            })
-
+        seated_after = {**current, **{c["booking_id"]: c["to_table_id"] for c in changes}}
         return {
-            "tables": tables_data,
-            "time_slots": time_slots,
-            "unassigned_bookings": unassigned_bookings,
-            "slot_duration": self.SLOT_DURATION,
+            "date": target_date.isoformat(),
+            "strategy": strategy.value,
+            "bookings": len(bookings),
+            "seated_before": sum(1 for t in current.values() if t),
+            "seated_after": sum(1 for t in seated_after.values() if t),
+            "waste_before": waste(current),
+            "waste_after": waste(seated_after),
+            "changes": changes,
+            "unseated": unseated,
+            "applied": applied,
+            "elapsed_ms": round((time_module.perf_counter() - started) * 1000, 1),
         }
 
+    # ==========================================
+    # GANTT CHART DATA
+    # ==========================================
+
+    async def get_gantt_data(
+        self,
+        target_date: date
+    ) -> Dict[str, Any]:
+        """
+        Get data for Gantt chart visualization
+
+        Returns:
+        - tables: List of tables with their bookings
+        - time_slots: List of time slots (17:00-22:00)
+        - bookings_map: Dict mapping table_id -> list of booking blocks
+        """
+        timeline = await self.get_timeline(target_date)
+        return timeline.gantt
+
+
+# Keep the availability engine on the service's durations
+availability_engine.configure(
+    slot_minutes=TableOptimizationService.SLOT_DURATION,
+    dining_minutes=TableOptimizationService.AVERAGE_DINING_TIME,
+    buffer_minutes=TableOptimizationService.TURNOVER_BUFFER,
+)
+
 
 # ==========================================
 # HELPER FUNCTIONS
@@ -0,0 +1,246 @@
+"""
+Table Solver - Whole-evening batch table assignment
+Assigns every booking of a branch-day at once instead of one at a time.
+
+Bookings all hold a table for the same span (dining time + buffer), so
+the evening is solved start slot by start slot: the bookings starting at
+slot S are matched to the tables free at S with a min-cost assignment
+(Hungarian algorithm). Costs come from the caller, so the existing
+OptimizationStrategy scores drive the result.
+
+Matching slot by slot cannot see later slots: a big table given to an
+early small party may be the only one a later large party fits. A repair
+pass then seats what was left over along augmenting paths - a booking
+takes a table and the bookings it overlaps there move to other tables,
+recursively - the way bipartite matching grows. Seated bookings are never
+unseated, so the result seats at least as many as the slot-by-slot pass;
+it is not guaranteed optimal (the bench reports the gap on tiny evenings
+against the exhaustive optimum).
+
+Pure functions over plain data - no database access.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.services.availability import TableInfo
+
+# Cost of leaving a booking without a table - dominates any seat cost, so
+# each slot's matching first maximizes bookings seated, then minimizes cost.
+# Bookings that already have a table are unseated last.
+UNASSIGNED_COST = 1_000_000.0
+UNSEAT_COST = UNASSIGNED_COST * 1.5
+TOO_SMALL_COST = UNASSIGNED_COST * 10
+
+# Small preference for a booking's current table, keeping the diff short
+MOVE_PENALTY = 1.0
+
+
+@dataclass
+class BatchBooking:
+    id: str
+    start: int                       # slot index
+    guests: int
+    current_table_id: Optional[str] = None
+    time: str = ""
+
+
+CostFn = Callable[[TableInfo, BatchBooking], float]
+
+
+def hungarian(cost: List[List[float]]) -> List[int]:
+    """
+    Min-cost assignment for an n x m matrix with n <= m.
+    Returns the column chosen for each row. O(n^2 * m).
+    """
+    n = len(cost)
+    if n == 0:
+        return []
+    m = len(cost[0])
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)     # p[j]: row matched to column j (1-based, 0 = free)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    result = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            result[p[j] - 1] = j - 1
+    return result
+
+
+def solve_evening(
+    tables: Sequence[TableInfo],
+    bookings: Sequence[BatchBooking],
+    span: int,
+    cost_fn: CostFn,
+) -> Dict[str, Optional[str]]:
+    """
+    Assign bookings to tables so no table holds two overlapping bookings.
+    Returns booking_id -> table_id (None when no table fits).
+    """
+    free_from = {t.id: -(1 << 30) for t in tables}   # table -> first free slot
+    assignment: Dict[str, Optional[str]] = {}
+
+    by_start: Dict[int, List[BatchBooking]] = {}
+    for booking in bookings:
+        by_start.setdefault(booking.start, []).append(booking)
+
+    for start in sorted(by_start):
+        group = by_start[start]
+        free = [t for t in tables if free_from[t.id] <= start]
+
+        # Rows: bookings; columns: free tables + one "no table" column per booking
+        width = len(free) + len(group)
+        matrix = []
+        for booking in group:
+            row = [UNSEAT_COST if booking.current_table_id else UNASSIGNED_COST] * width
+            for j, table in enumerate(free):
+                if table.max_capacity >= booking.guests:
+                    cost = cost_fn(table, booking)
+                    if booking.current_table_id and booking.current_table_id != table.id:
+                        cost += MOVE_PENALTY
+                    row[j] = cost
+                else:
+                    row[j] = TOO_SMALL_COST
+            matrix.append(row)
+
+        for row, (booking, col) in enumerate(zip(group, hungarian(matrix))):
+            if col < len(free) and matrix[row][col] < UNASSIGNED_COST:
+                table = free[col]
+                assignment[booking.id] = table.id
+                free_from[table.id] = start + span
+            else:
+                assignment[booking.id] = None
+
+    _repair(tables, bookings, span, cost_fn, assignment)
+    return assignment
+
+
+def _repair(
+    tables: Sequence[TableInfo],
+    bookings: Sequence[BatchBooking],
+    span: int,
+    cost_fn: CostFn,
+    assignment: Dict[str, Optional[str]],
+) -> None:
+    """Seat unassigned bookings along augmenting paths (in place)"""
+    seated: Dict[str, List[BatchBooking]] = {t.id: [] for t in tables}
+    for booking in bookings:
+        if assignment.get(booking.id):
+            seated[assignment[booking.id]].append(booking)
+    # Tables a booking fits, cheapest first
+    candidates = {
+        booking.id: sorted((t for t in tables if t.max_capacity >= booking.guests),
+                           key=lambda t: cost_fn(t, booking))
+        for booking in bookings
+    }
+    journal: List[tuple] = []   # (table_id, bookings before, booking_id, table before)
+
+    def seat(booking: BatchBooking, table_id: str, keep: List[BatchBooking]):
+        journal.append((table_id, seated[table_id], booking.id, assignment.get(booking.id)))
+        seated[table_id] = keep + [booking]
+        assignment[booking.id] = table_id
+
+    def rollback(mark: int):
+        while len(journal) > mark:
+            table_id, before, booking_id, previous = journal.pop()
+            seated[table_id] = before
+            assignment[booking_id] = previous
+
+    def overlapping(booking: BatchBooking, table_id: str) -> List[BatchBooking]:
+        return [other for other in seated[table_id] if abs(other.start - booking.start) < span]
+
+    def place(booking: BatchBooking, visited: set) -> bool:
+        # A free table first, then one whose overlapping bookings can all move
+        for table in candidates[booking.id]:
+            if not overlapping(booking, table.id):
+                seat(booking, table.id, seated[table.id])
+                return True
+        for table in candidates[booking.id]:
+            if table.id in visited:
+                continue
+            visited.add(table.id)
+            moved = overlapping(booking, table.id)
+            mark = len(journal)
+            seat(booking, table.id, [other for other in seated[table.id] if other not in moved])
+            if all(place(other, visited) for other in moved):
+                return True
+            rollback(mark)
+        return False
+
+    # A failed search changes nothing, so it fails again for the same
+    # start and party size until some other booking gets seated
+    failed = set()
+    for booking in bookings:
+        key = (booking.start, booking.guests)
+        if assignment.get(booking.id) is not None or not candidates[booking.id] or key in failed:
+            continue
+        if place(booking, set()):
+            failed.clear()
+        else:
+            failed.add(key)
+        journal.clear()
+
+
+def solve_greedy(
+    tables: Sequence[TableInfo],
+    bookings: Sequence[BatchBooking],
+    span: int,
+    cost_fn: CostFn,
+) -> Dict[str, Optional[str]]:
+    """
+    One booking at a time in the given (arrival) order, cheapest free
+    table each time - what auto_assign_table does. Used as the baseline.
+    """
+    occupied: Dict[str, List[int]] = {t.id: [] for t in tables}
+    assignment: Dict[str, Optional[str]] = {}
+    for booking in bookings:
+        best, best_cost = None, None
+        for table in tables:
+            if table.max_capacity < booking.guests:
+                continue
+            if any(abs(other - booking.start) < span for other in occupied[table.id]):
+                continue
+            cost = cost_fn(table, booking)
+            if best_cost is None or cost < best_cost:
+                best, best_cost = table, cost
+        assignment[booking.id] = best.id if best else None
+        if best:
+            occupied[best.id].append(booking.start)
+    return assignment
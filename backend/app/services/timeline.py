@@ -0,0 +1,213 @@
+"""
+Floor Timeline - Slot summaries, Gantt rows and waste cases for a branch-day
+Built in one sweep over the day's bookings and cached per (branch, date)
+until a Booking, TableAssignment or Table change touches that day.
+
+A booking counts in every slot of its dining time: +guests where it
+starts, -guests where it ends, and a prefix sum over the slots.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.booking import Booking, BookingStatus
+from app.models.table import Table, TableAssignment
+from app.services.availability import ACTIVE_STATUSES, DayKey, on_day_changed, slot_minutes
+
+# Gantt columns: 17:00 - 22:30 (30 min intervals)
+TIME_SLOTS = [f"{h:02d}:{m:02d}" for h in range(17, 23) for m in [0, 30]]
+
+# Slots summarized for utilization: 17:00 - 22:00
+SUMMARY_SLOTS = TIME_SLOTS[:-1]
+
+# Table seats this many more than the party -> reported as waste
+WASTE_THRESHOLD = 3
+
+
+@dataclass
+class DayTimeline:
+    """Everything the table dashboard needs for one branch-day"""
+    summaries: List[Any]                  # TimeSlotSummary per slot
+    gantt: Dict[str, Any]                 # get_gantt_data() payload
+    waste_cases: List[Dict[str, Any]] = field(default_factory=list)
+
+
+async def build_timeline(
+    db: AsyncSession,
+    branch_code: str,
+    target_date: date,
+    slot_duration: int,
+    dining_time: int,
+    summary_factory,
+) -> DayTimeline:
+    """Load the day (2 queries) and compute summaries, Gantt and waste in one pass"""
+    tables_result = await db.execute(
+        select(Table).where(
+            and_(
+                Table.branch_code == branch_code,
+                Table.is_active == True
+            )
+        ).order_by(Table.zone, Table.table_number)
+    )
+    tables = tables_result.scalars().all()
+    tables_by_id = {str(t.id): t for t in tables}
+
+    # One row per (booking, assignment), bookings in time order
+    rows = (await db.execute(
+        select(Booking, TableAssignment.table_id)
+        .outerjoin(TableAssignment, TableAssignment.booking_id == Booking.id)
+        .where(
+            and_(
+                Booking.branch_code == branch_code,
+                Booking.date == target_date,
+                Booking.status.not_in([BookingStatus.CANCELLED, BookingStatus.NO_SHOW])
+            )
+        )
+        .order_by(Booking.time, Booking.id)
+    )).all()
+
+    slot_count = len(TIME_SLOTS)
+    slot_index_map = {slot: idx for idx, slot in enumerate(TIME_SLOTS)}
+    first_slot = slot_minutes(TIME_SLOTS[0])
+    duration_slots = max(1, dining_time // slot_duration)
+
+    # Sweep deltas (one extra cell for bookings ending after the last slot)
+    guests_delta = [0] * (slot_count + 1)
+    bookings_delta = [0] * (slot_count + 1)
+
+    bookings_by_table: Dict[str, List[Dict]] = {str(t.id): [] for t in tables}
+    unassigned_bookings = []
+    waste_cases = []
+
+    blocks: Dict[str, Dict] = {}
+    for booking, table_id in rows:
+        booking_id = str(booking.id)
+        block = blocks.get(booking_id)
+
+        if block is None:
+            time_str = booking.time[:5] if len(booking.time) >= 5 else booking.time
+            block = blocks[booking_id] = {
+                "id": booking_id,
+                "time": booking.time,
+                "time_str": time_str,
+                "slot_index": slot_index_map.get(time_str, -1),  # Pre-calculated slot index
+                "guests": booking.guests,
+                "customer_name": booking.guest_name or "ゲスト",
+                "status": booking.status,
+                "duration_slots": duration_slots,
+                "notes": booking.note or "",
+            }
+
+            if booking.status in ACTIVE_STATUSES:
+                start = (slot_minutes(time_str) - first_slot) // slot_duration
+                end = start + duration_slots
+                if end > 0 and start < slot_count:
+                    start, end = max(start, 0), min(end, slot_count)
+                    guests_delta[start] += booking.guests
+                    guests_delta[end] -= booking.guests
+                    bookings_delta[start] += 1
+                    bookings_delta[end] -= 1
+
+            if table_id is None:
+                unassigned_bookings.append(block)
+
+        if table_id is None:
+            continue
+
+        table = tables_by_id.get(str(table_id))
+        if table is None:
+            continue
+        bookings_by_table[str(table_id)].append(block)
+
+        if booking.status in ACTIVE_STATUSES and table.max_capacity - booking.guests >= WASTE_THRESHOLD:
+            waste_cases.append({
+                "time": booking.time,
+                "guests": booking.guests,
+                "table": table.table_number,
+                "capacity": table.max_capacity,
+                "waste": table.max_capacity - booking.guests,
+            })
+
+    # Prefix sums -> per-slot summaries
+    total_tables = len(tables)
+    total_capacity = sum(t.max_capacity for t in tables)
+    summaries = []
+    used_capacity = occupied = 0
+    for idx, slot in enumerate(SUMMARY_SLOTS):
+        used_capacity += guests_delta[idx]
+        occupied += bookings_delta[idx]
+        utilization = (used_capacity / total_capacity * 100) if total_capacity > 0 else 0
+        summaries.append(summary_factory(
+            time_slot=slot,
+            total_tables=total_tables,
+            available_tables=total_tables - occupied,
+            occupied_tables=occupied,
+            total_capacity=total_capacity,
+            used_capacity=used_capacity,
+            available_capacity=total_capacity - used_capacity,
+            utilization_rate=round(utilization, 1),
+            tables=[]  # Populate if needed
+        ))
+
+    gantt = {
+        "tables": [
+            {
+                "id": str(table.id),
+                "table_number": table.table_number,
+                "name": table.name or "",
+                "max_capacity": table.max_capacity,
+                "table_type": table.table_type,
+                "zone": table.zone or "",
+                "bookings": bookings_by_table.get(str(table.id), []),
+            }
+            for table in tables
+        ],
+        "time_slots": TIME_SLOTS,
+        "unassigned_bookings": unassigned_bookings,
+        "slot_duration": slot_duration,
+    }
+
+    return DayTimeline(summaries=summaries, gantt=gantt, waste_cases=waste_cases)
+
+
+class TimelineCache:
+    """LRU of DayTimeline per (branch_code, date), dropped on day changes"""
+
+    def __init__(self, max_days: int = 64):
+        self.max_days = max_days
+        self._days: "OrderedDict[Tuple[str, date], DayTimeline]" = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, branch_code: str, target_date: date) -> Optional[DayTimeline]:
+        key = (branch_code, target_date)
+        timeline = self._days.get(key)
+        if timeline is not None:
+            self._days.move_to_end(key)
+            self.hits += 1
+        return timeline
+
+    def put(self, branch_code: str, target_date: date, timeline: DayTimeline):
+        self._days[(branch_code, target_date)] = timeline
+        self.builds += 1
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+
+    def invalidate(self, keys: Set[DayKey]):
+        for branch_code, day in keys:
+            if branch_code is None:
+                self._days.clear()
+            elif day is None:
+                for key in [k for k in self._days if k[0] == branch_code]:
+                    del self._days[key]
+            else:
+                self._days.pop((branch_code, day), None)
+
+
+# Global cache, kept in sync through the availability change feed
+timeline_cache = TimelineCache()
+on_day_changed(timeline_cache.invalidate)
@@ -10,6 +10,12 @@ Usage:
     python cli.py db migrate MESSAGE  # Generate new migration
     python cli.py db upgrade          # Apply pending migrations
     python cli.py db current          # Show current revision
+    python cli.py db rebuild-availability  # Rebuild table_availability from bookings
+    python cli.py db reconcile-sessions    # Check running session totals (--fix to repair)
+    python cli.py db snapshot-projections  # Replay order events, snapshot order/session state
+    python cli.py db rotate-events         # Partition closed months of event logs, archive cold ones
+    python cli.py db export-events --since YYYY-MM-DD  # Event logs to Parquet (or CSV.gz) files
+    python cli.py db rebuild-kitchen-rollups  # Recompute hourly kitchen performance from events
     python cli.py server              # Start uvicorn dev server
 """
 import typer
@@ -165,6 +171,201 @@ def reset():
     console.print("\n🎉 [bold green]Database reset complete![/bold green]\n")
 
 
+@db_app.command("rebuild-availability")
+def rebuild_availability(
+    branch: str = typer.Option(None, "--branch", help="Only this branch (default: all)"),
+    since: str = typer.Option(None, "--since", help="Only dates from YYYY-MM-DD"),
+):
+    """Rebuild the table_availability projection from bookings."""
+    from datetime import date
+
+    async def _rebuild():
+        from app.database import AsyncSessionLocal
+        from app.services.availability_projection import rebuild_all
+
+        since_date = date.fromisoformat(since) if since else None
+        async with AsyncSessionLocal() as db:
+            result = await db.run_sync(lambda s: rebuild_all(s.connection(), branch, since_date))
+            await db.commit()
+        return result
+
+    console.print("\n🪑 [bold]Rebuilding table availability...[/bold]\n")
+    result = asyncio.run(_rebuild())
+    console.print(f"✅ [green]{result['rows']} rows for {result['days']} days[/green]\n")
+
+
+@db_app.command("snapshot-projections")
+def snapshot_projections(
+    branch: str = typer.Option(None, "--branch", help="Only this branch (default: all)"),
+):
+    """Replay the order event log and snapshot every order and session."""
+
+    async def _snapshot():
+        from app.database import AsyncSessionLocal
+        from app.domains.tableorder.projections import PROJECTORS
+
+        results = []
+        async with AsyncSessionLocal() as db:
+            for projector in PROJECTORS.values():
+                results.append(await projector.rebuild(db, branch))
+        return results
+
+    console.print("\n📸 [bold]Snapshotting order event projections...[/bold]\n")
+    results = asyncio.run(_snapshot())
+
+    table = RichTable(title="Projections")
+    table.add_column("Projection", style="cyan")
+    table.add_column("Events", justify="right")
+    table.add_column("Snapshots", justify="right", style="green")
+    table.add_column("Events/sec", justify="right")
+    for r in results:
+        table.add_row(r["projection"], f"{r['events']:,}", f"{r['keys']:,}", f"{r['events_per_second']:,.0f}")
+    console.print(table)
+
+
+@db_app.command("rotate-events")
+def rotate_events(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Only report what would move"),
+):
+    """Move closed months of order/kitchen events to partitions, archive cold ones."""
+
+    async def _rotate():
+        from app.services.event_retention import EVENT_LOGS
+
+        moved, archived = [], []
+        for log in EVENT_LOGS.values():
+            moved += await log.rotate(dry_run)
+            archived += await log.archive(dry_run)
+        return moved, archived
+
+    console.print("\n🗃️  [bold]Rotating event logs...[/bold]\n")
+    moved, archived = asyncio.run(_rotate())
+    if not moved and not archived:
+        console.print("✅ [green]Nothing to rotate[/green]\n")
+        return
+
+    table = RichTable(title="Event retention" + (" (dry run)" if dry_run else ""))
+    table.add_column("Log", style="cyan")
+    table.add_column("Month")
+    table.add_column("Rows", justify="right")
+    table.add_column("Moved to", style="green")
+    for m in moved:
+        table.add_row(m["log"], m["month"], f"{m['rows']:,}", "partition")
+    for a in archived:
+        table.add_row(a["log"], a["month"], f"{a['rows']:,}", a["path"] or "archive file")
+    console.print(table)
+
+
+@db_app.command("rebuild-kitchen-rollups")
+def rebuild_kitchen_rollups(
+    branch: str = typer.Option(None, "--branch", help="Only this branch (default: all)"),
+    since: str = typer.Option(None, "--since", help="Only hours from YYYY-MM-DD (default: oldest stored event)"),
+):
+    """Recompute the hourly kitchen rollups (counts, wait sketches) from kitchen events."""
+    from datetime import date, datetime
+
+    async def _rebuild():
+        from app.database import AsyncSessionLocal
+        from app.domains.kitchen.rollups import rebuild
+
+        since_time = datetime.combine(date.fromisoformat(since), datetime.min.time()) if since else None
+        async with AsyncSessionLocal() as db:
+            return await rebuild(db, branch, since_time)
+
+    console.print("\n🔥 [bold]Rebuilding kitchen rollups...[/bold]\n")
+    result = asyncio.run(_rebuild())
+    console.print(
+        f"✅ [green]{result['events']:,} events → {result['hours']:,} station-hours, "
+        f"{result['buckets']:,} sketch buckets[/green]\n"
+    )
+
+
+@db_app.command("export-events")
+def export_events(
+    since: str = typer.Option(..., "--since", help="From YYYY-MM-DD (inclusive)"),
+    until: str = typer.Option(None, "--until", help="To YYYY-MM-DD (exclusive, default: tomorrow)"),
+    source: list[str] = typer.Option(None, "--source", help="order_events, kitchen_events, checkin_logs (default: all)"),
+    branch: str = typer.Option(None, "--branch", help="Only this branch (default: all)"),
+    fmt: str = typer.Option(None, "--format", help="parquet or csv (default: parquet if pyarrow is installed)"),
+    out: str = typer.Option("./exports", "--out", help="Output directory"),
+):
+    """Stream order/kitchen events and check-in logs to Parquet or CSV.gz files."""
+    from datetime import date, datetime, timedelta
+
+    async def _export():
+        from app.database import engine
+        from app.services.event_export import SOURCES, export
+
+        start = datetime.combine(date.fromisoformat(since), datetime.min.time())
+        end_day = date.fromisoformat(until) if until else date.today() + timedelta(days=1)
+        end = datetime.combine(end_day, datetime.min.time())
+        unknown = set(source or ()) - set(SOURCES)
+        if unknown:
+            raise typer.BadParameter(f"Unknown source(s): {', '.join(sorted(unknown))}", param_hint="--source")
+
+        results = []
+        for name in source or SOURCES:
+            results.append(await export(SOURCES[name], start, end, out, fmt, branch))
+        await engine.dispose()
+        return results
+
+    if fmt not in (None, "parquet", "csv"):
+        raise typer.BadParameter("parquet or csv", param_hint="--format")
+
+    console.print("\n📦 [bold]Exporting event logs...[/bold]\n")
+    try:
+        results = asyncio.run(_export())
+    except RuntimeError as e:
+        console.print(f"❌ [red]{e}[/red]\n")
+        raise typer.Exit(1)
+
+    table = RichTable(title="Event export")
+    table.add_column("Log", style="cyan")
+    table.add_column("Rows", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("File", style="green")
+    for r in results:
+        table.add_row(r["source"], f"{r['rows']:,}", f"{r['seconds']:.2f}", r["path"])
+    console.print(table)
+
+
+@db_app.command("reconcile-sessions")
+def reconcile_sessions(
+    branch: str = typer.Option(None, "--branch", help="Only this branch (default: all)"),
+    fix: bool = typer.Option(False, "--fix", help="Rewrite drifted totals"),
+):
+    """Check TableSession.total_amount of unpaid sessions against their items."""
+
+    async def _reconcile():
+        from app.database import AsyncSessionLocal
+        from app.services.session_totals import reconcile
+
+        async with AsyncSessionLocal() as db:
+            drifted = await db.run_sync(lambda s: reconcile(s.connection(), branch, fix))
+            if fix:
+                await db.commit()
+        return drifted
+
+    console.print("\n🧾 [bold]Reconciling session totals...[/bold]\n")
+    drifted = asyncio.run(_reconcile())
+    if not drifted:
+        console.print("✅ [green]All open sessions match their items[/green]\n")
+        return
+
+    table = RichTable(title="Drifted sessions")
+    table.add_column("Session", style="cyan")
+    table.add_column("Branch")
+    table.add_column("Stored", justify="right")
+    table.add_column("Items", justify="right", style="green")
+    for d in drifted:
+        table.add_row(d["session_id"][:8], d["branch_code"], f"{d['stored']:,}", f"{d['expected']:,}")
+    console.print(table)
+    if fix:
+        console.print(f"🔧 [green]{len(drifted)} sessions fixed[/green]\n")
+    else:
+        console.print(f"⚠️  [yellow]{len(drifted)} sessions drifted (run with --fix)[/yellow]\n")
+
+
 @db_app.command()
 def stamp(revision: str = typer.Argument("head", help="Revision to stamp")):
     """Stamp the database with a revision without running migrations.
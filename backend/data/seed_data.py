@@ -394,6 +394,7 @@ async def seed_menu_items(session: AsyncSession) -> int:
             prep_time_minutes=_int(row.get("prep_time_minutes", "5")),
             kitchen_note=_str(row.get("kitchen_note", "")),
             image_url=image_url,
+            item_id=_str(row.get("item_id", "")),
         )
         session.add(item)
         count += 1
@@ -0,0 +1,155 @@
+"""
+Microbenchmark: serialize-once broadcasts for WebSocket and SSE.
+
+For 10/100/1000 connected devices, times only the encoding work of a
+broadcast: once per recipient (old send_json / to_sse behaviour) against
+once per broadcast (EncodedMessage / cached SSE frame). Queues, writer
+tasks and sockets are left out, so the numbers compare encoding alone.
+
+A delivery check then pushes the same broadcasts through a real
+ConnectionManager and confirms every device received the identical
+text, shutting the writers down before the loop closes.
+
+Usage:
+    cd backend
+    python -m scripts.bench_broadcast_encoding
+"""
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+
+from app.routers.websocket import ConnectionManager
+from app.services.encoding import encode, orjson
+from app.services.notification_service import Notification, NotificationType
+
+DEVICE_COUNTS = [10, 100, 1000]
+BROADCASTS = 50
+CHECK_DEVICES = 100
+
+
+def sample_message(i: int) -> dict:
+    return {
+        "type": "new_order",
+        "channel": "orders",
+        "data": {
+            "order_id": f"order-{i}",
+            "order_number": i,
+            "table_id": "table-a1",
+            "table_number": "A1",
+            "status": "pending",
+            "items": [
+                {"menu_item_id": f"m{n}", "name": "上タン塩", "price": 1580.0, "quantity": 2, "notes": "よく焼き"}
+                for n in range(8)
+            ],
+            "created_at": "2026-10-18T19:02:11",
+        },
+    }
+
+
+def starlette_send_json(data) -> str:
+    """What Starlette's WebSocket.send_json encodes, per socket"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def ws_per_recipient(device_count: int) -> float:
+    start = time.perf_counter()
+    for i in range(BROADCASTS):
+        message = sample_message(i)
+        for _ in range(device_count):
+            starlette_send_json(message)
+    return (time.perf_counter() - start) * 1000
+
+
+def ws_encode_once(device_count: int) -> float:
+    start = time.perf_counter()
+    for i in range(BROADCASTS):
+        encoded = encode(sample_message(i))
+        for _ in range(device_count):
+            encoded.text
+    return (time.perf_counter() - start) * 1000
+
+
+def sse_per_client(device_count: int) -> float:
+    """Old behaviour: every client generator re-serializes the notification"""
+    start = time.perf_counter()
+    for i in range(BROADCASTS):
+        payload = sample_message(i)["data"]
+        for _ in range(device_count):
+            json.dumps({"type": "new_booking", "data": payload}, ensure_ascii=False)
+    return (time.perf_counter() - start) * 1000
+
+
+def sse_encode_once(device_count: int) -> float:
+    start = time.perf_counter()
+    for i in range(BROADCASTS):
+        notification = Notification(
+            type=NotificationType.NEW_BOOKING, title="bench", message="bench",
+            data=sample_message(i)["data"],
+        )
+        for _ in range(device_count):
+            notification.to_sse()
+    return (time.perf_counter() - start) * 1000
+
+
+class FakeWebSocket:
+    """Records what the writer task sends"""
+
+    def __init__(self):
+        self.texts = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        pass  # connection confirmation
+
+    async def send_text(self, text: str):
+        self.texts.append(text)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def check_delivery() -> bool:
+    """Every device gets each broadcast once, as the same encoded text"""
+    manager = ConnectionManager(max_queue=BROADCASTS * 2)
+    sockets = [FakeWebSocket() for _ in range(CHECK_DEVICES)]
+    # connect/disconnect print one line per socket
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ws in sockets:
+            await manager.connect(ws, "bench")
+        for i in range(BROADCASTS):
+            await manager.broadcast_to_branch("bench", sample_message(i))
+        while any(client.queue for client in manager.clients.values()):
+            await asyncio.sleep(0)
+        await manager.shutdown()
+
+    expected = [encode(sample_message(i)).text for i in range(BROADCASTS)]
+    return all(ws.texts == expected for ws in sockets)
+
+
+async def main() -> int:
+    print(f"encoder: {'orjson' if orjson is not None else 'json (stdlib)'}, {BROADCASTS} broadcasts, encoding only\n")
+    print(f"{'devices':>8}{'ws old ms':>12}{'ws new ms':>12}{'sse old ms':>12}{'sse new ms':>12}")
+    ok = True
+    for count in DEVICE_COUNTS:
+        ws_old, ws_new = ws_per_recipient(count), ws_encode_once(count)
+        sse_old, sse_new = sse_per_client(count), sse_encode_once(count)
+        print(f"{count:>8}{ws_old:>12.1f}{ws_new:>12.1f}{sse_old:>12.1f}{sse_new:>12.1f}")
+        if count >= 100 and (ws_new >= ws_old or sse_new >= sse_old):
+            print(f"❌ {count} devices: encoding once is not faster")
+            ok = False
+
+    delivered = await check_delivery()
+    print(f"\n{'✅' if delivered else '❌'} {CHECK_DEVICES} devices x {BROADCASTS} broadcasts through "
+          f"ConnectionManager: identical text, each once")
+    ok = ok and delivered
+    print("\n✅ Encoding once per broadcast" if ok else "\n❌ Benchmark failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,186 @@
+"""
+Benchmark: undelivered-order diagnostics as the event log grows.
+
+Seeds a throwaway SQLite event store with N orders (created -> sent ->
+received, with every 10th order left unacknowledged and every 25th
+failing first) and compares three ways to list undelivered orders:
+
+- per-event:  the old loop, one COUNT query per ORDER_CREATED event
+- anti-join:  EventService.get_undelivered_orders (one query)
+- tracker:    delivery_tracker, after loading the branch once (no query)
+
+All three must return the same orders; the anti-join and the tracker
+must run a constant number of statements whatever N is, and the
+anti-join's EXISTS probe must be a (correlation_id, event_type) index
+lookup, so its time grows linearly with N.
+
+Usage:
+    cd backend
+    python -m scripts.bench_event_diagnostics
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+from sqlalchemy import and_, delete, event, func, insert, select, text
+
+from app.database import AsyncSessionLocal, engine, init_db
+from app.domains.tableorder.delivery_tracker import DeliveryTracker
+from app.domains.tableorder.event_service import EventService
+from app.domains.tableorder.events import EventSource, EventType, OrderEvent
+
+BRANCH = "bench"
+ORDER_COUNTS = [500, 2000, 8000]
+SINCE_MINUTES = 60
+
+
+class StatementCounter:
+    """Counts statements executed on the engine"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+async def seed(order_count: int):
+    """Reset and write N order chains spread over the last 50 minutes"""
+    now = datetime.utcnow()
+    rows = []
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(OrderEvent))
+        service = EventService(db)
+
+        def add(event_type: EventType, n: int, correlation_id: str, seq: int, **kwargs):
+            e = service.build_event(
+                event_type=event_type, event_source=EventSource.SYSTEM, branch_code=BRANCH,
+                order_id=f"order-{n}", table_id=f"table-{n % 20}", correlation_id=correlation_id,
+                sequence_number=seq, data={"n": n}, **kwargs,
+            )
+            e.id = str(uuid.uuid4())
+            e.timestamp = now - timedelta(seconds=3000 * (order_count - n) / order_count) + timedelta(seconds=seq)
+            rows.append(e.to_row())
+
+        for n in range(order_count):
+            correlation_id = str(uuid.uuid4())
+            add(EventType.ORDER_CREATED, n, correlation_id, 1)
+            add(EventType.GATEWAY_SENT, n, correlation_id, 2)
+            if n % 25 == 0:
+                add(EventType.GATEWAY_FAILED, n, correlation_id, 3,
+                    error_code="WS_TIMEOUT", error_message="kitchen did not answer")
+            if n % 10 != 0:
+                add(EventType.GATEWAY_RECEIVED, n, correlation_id, 4)
+
+        await db.execute(insert(OrderEvent), rows)
+        await db.commit()
+
+
+async def per_event(db) -> list:
+    """Baseline: the previous implementation (N+1 queries)"""
+    since = datetime.utcnow() - timedelta(minutes=SINCE_MINUTES)
+    result = await db.execute(select(OrderEvent).where(and_(
+        OrderEvent.branch_code == BRANCH,
+        OrderEvent.event_type == EventType.ORDER_CREATED.value,
+        OrderEvent.timestamp >= since,
+    )))
+    undelivered = []
+    for created in result.scalars().all():
+        acks = (await db.execute(select(func.count()).select_from(OrderEvent).where(and_(
+            OrderEvent.correlation_id == created.correlation_id,
+            OrderEvent.event_type == EventType.GATEWAY_RECEIVED.value,
+        )))).scalar()
+        if not acks:
+            undelivered.append(created.correlation_id)
+    return undelivered
+
+
+async def measure(counter: StatementCounter, call) -> tuple:
+    """Run one call in a fresh session, return (correlation ids, statements, ms)"""
+    async with AsyncSessionLocal() as db:
+        counter.count = 0
+        start = time.perf_counter()
+        found = await call(db)
+        elapsed = (time.perf_counter() - start) * 1000
+        return sorted(found), counter.count, elapsed
+
+
+async def main() -> int:
+    await init_db()
+
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+
+    async def anti_join(db):
+        rows = await EventService(db).get_undelivered_orders(BRANCH, SINCE_MINUTES)
+        return [r["correlation_id"] for r in rows]
+
+    failed = False
+    queries = {"anti-join": set(), "tracker": set()}
+    print(f"{'orders':>7} {'undelivered':>12} {'per-event ms':>13} {'queries':>8} "
+          f"{'anti-join ms':>13} {'queries':>8} {'tracker ms':>11} {'queries':>8}")
+    for order_count in ORDER_COUNTS:
+        await seed(order_count)
+
+        tracker = DeliveryTracker()
+        async with AsyncSessionLocal() as db:
+            service = EventService(db)
+            await tracker.warm(BRANCH, lambda minutes: service.get_undelivered_orders(BRANCH, minutes))
+
+        async def from_tracker(db):
+            return [r["correlation_id"] for r in tracker.undelivered(BRANCH, SINCE_MINUTES)]
+
+        baseline, base_q, base_ms = await measure(counter, per_event)
+        joined, join_q, join_ms = await measure(counter, anti_join)
+        tracked, track_q, track_ms = await measure(counter, from_tracker)
+        queries["anti-join"].add(join_q)
+        queries["tracker"].add(track_q)
+
+        print(f"{order_count:>7} {len(baseline):>12} {base_ms:>13.1f} {base_q:>8} "
+              f"{join_ms:>13.1f} {join_q:>8} {track_ms:>11.2f} {track_q:>8}")
+        if not (baseline == joined == tracked):
+            print(f"❌ {order_count} orders: results differ")
+            failed = True
+
+    for name, counts in queries.items():
+        if len(counts) != 1:
+            print(f"❌ {name}: query count depends on event count {sorted(counts)}")
+            failed = True
+
+    async with engine.connect() as conn:
+        since = datetime.utcnow() - timedelta(minutes=SINCE_MINUTES)
+        stmt = select(OrderEvent.id).where(and_(
+            OrderEvent.branch_code == BRANCH,
+            OrderEvent.event_type == EventType.ORDER_CREATED.value,
+            OrderEvent.timestamp >= since,
+            ~EventService._has_event(EventType.GATEWAY_RECEIVED),
+        ))
+        compiled = stmt.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+        plan = await conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        steps = [row[-1] for row in plan]
+        print("\nanti-join plan:")
+        for step in steps:
+            print(f"  {step}")
+        # The EXISTS probe must be one index lookup, not a scan per created order
+        if not any("ix_order_events_correlation_type" in step for step in steps):
+            print("❌ anti-join probe does not use ix_order_events_correlation_type")
+            failed = True
+
+    await engine.dispose()
+
+    if failed:
+        return 1
+    print("\n✅ Same orders from all three, constant query count")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,105 @@
+"""
+Latency benchmark for POST /api/tableorder/events/sync.
+
+Compares the old per-event path (log_event: add + commit + refresh for
+each event) with the bulk ingest path (one executemany in one
+transaction) for 10/50/200-event payloads, and checks that a retried
+payload is fully deduplicated.
+
+Usage:
+    cd backend
+    python -m scripts.bench_event_sync
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["EVENT_GROUP_COMMIT"] = "false"
+
+from app.database import engine, init_db, AsyncSessionLocal
+from app.domains.tableorder.events import EventType, EventSource
+from app.domains.tableorder.event_service import EventService
+from app.domains.tableorder.router import sync_events, EventSyncRequest, ClientEvent
+
+BRANCH = "bench"
+PAYLOAD_SIZES = [10, 50, 200]
+ROUNDS = 5
+
+
+def make_payload(size: int) -> EventSyncRequest:
+    table_id = str(uuid.uuid4())
+    session_id = str(uuid.uuid4())
+    return EventSyncRequest(
+        table_id=table_id,
+        events=[
+            ClientEvent(
+                id=str(uuid.uuid4()),
+                type="item.added" if i % 3 else "session.phase_transition",
+                ts=time.time() * 1000 + i,
+                session_id=session_id,
+                table_id=table_id,
+                data={"item_id": f"item-{i % 20}", "qty": 1},
+            )
+            for i in range(size)
+        ],
+    )
+
+
+async def sync_per_event(payload: EventSyncRequest):
+    """The pre-bulk implementation: one log_event (commit) per event"""
+    async with AsyncSessionLocal() as db:
+        service = EventService(db)
+        for ce in payload.events:
+            await service.log_event(
+                event_type=EventType.SESSION_LOG,
+                event_source=EventSource.TABLE_ORDER,
+                branch_code=BRANCH,
+                table_id=ce.table_id or payload.table_id,
+                session_id=ce.session_id,
+                data={"client_event_type": ce.type, "client_event_id": ce.id, "client_ts": ce.ts, **ce.data},
+            )
+
+
+async def sync_bulk(payload: EventSyncRequest):
+    async with AsyncSessionLocal() as db:
+        return await sync_events(payload, branch_code=BRANCH, db=db)
+
+
+async def timed(call, payload) -> float:
+    start = time.perf_counter()
+    await call(payload)
+    return (time.perf_counter() - start) * 1000
+
+
+async def main() -> int:
+    await init_db()
+
+    print(f"{'events':>8}{'per-event ms':>16}{'bulk ms':>12}{'speedup':>10}")
+    for size in PAYLOAD_SIZES:
+        old = [await timed(sync_per_event, make_payload(size)) for _ in range(ROUNDS)]
+        new = [await timed(sync_bulk, make_payload(size)) for _ in range(ROUNDS)]
+        old_ms, new_ms = statistics.median(old), statistics.median(new)
+        print(f"{size:>8}{old_ms:>16.1f}{new_ms:>12.1f}{old_ms / new_ms:>9.1f}x")
+
+    # A retried payload must not create duplicate rows
+    payload = make_payload(50)
+    first = await sync_bulk(payload)
+    retry = await sync_bulk(payload)
+    await engine.dispose()
+
+    if first.duplicates != 0 or retry.duplicates != 50 or retry.received != 50:
+        print(f"❌ Dedup failed: first={first.duplicates} retry={retry.duplicates}")
+        return 1
+    print("✅ Retried payload fully deduplicated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
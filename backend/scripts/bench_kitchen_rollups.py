@@ -0,0 +1,169 @@
+"""
+Benchmark: kitchen history summary from raw events vs hourly rollups.
+
+Seeds a throwaway SQLite store with a week of served/cancelled kitchen
+events for three stations, builds the rollups (rebuild), then logs a
+few hundred more through KitchenEventService (the incremental path) and
+compares, for 24h and 168h windows:
+
+- raw:     aggregate over kitchen_events + exact percentiles (sorted waits)
+- rollup:  KitchenEventService summary (rollup rows + sketch buckets)
+
+Counts and average must match exactly, p50/p90/p99 within the sketch's
+relative accuracy; the incrementally maintained rollups must equal a
+rebuild from the events.
+
+Usage:
+    cd backend
+    python -m scripts.bench_kitchen_rollups
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+from sqlalchemy import and_, func, insert, select
+
+from app.database import AsyncSessionLocal, engine, init_db
+from app.domains.kitchen import rollups
+from app.domains.kitchen.event_service import KitchenEventService
+from app.domains.kitchen.events import KitchenEvent, KitchenEventType
+from app.domains.kitchen.rollups import KitchenRollup, KitchenWaitBucket
+
+BRANCH = "bench"
+STATIONS = ["meat", "side", "drink"]
+EVENTS_PER_HOUR = 400
+DAYS = 7
+LOGGED = 300
+WINDOWS = [24, 168]
+
+
+def wait_seconds(station: str) -> int:
+    base = {"meat": 420, "side": 240, "drink": 90}[station]
+    return int(random.lognormvariate(0, 0.6) * base)
+
+
+async def seed() -> int:
+    random.seed(7)
+    now = datetime.utcnow()
+    start = now - timedelta(days=DAYS)
+    rows = []
+    for n in range(int(DAYS * 24 * EVENTS_PER_HOUR)):
+        station = STATIONS[n % 3]
+        cancelled = n % 17 == 0
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "event_type": (KitchenEventType.ITEM_CANCELLED if cancelled else KitchenEventType.ITEM_SERVED).value,
+            "event_source": "kitchen-display",
+            "timestamp": start + (now - start) * random.random(),
+            "branch_code": BRANCH,
+            "station": station,
+            "item_name": "Item",
+            "item_quantity": 1,
+            "wait_time_seconds": None if n % 50 == 0 else wait_seconds(station),
+            "data": {},
+        })
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(rows), 5000):
+            await db.execute(insert(KitchenEvent), rows[i:i + 5000])
+        await db.commit()
+    return len(rows)
+
+
+async def log_through_service():
+    async with AsyncSessionLocal() as db:
+        service = KitchenEventService(db)
+        for n in range(LOGGED):
+            station = STATIONS[n % 3]
+            if n % 10 == 0:
+                await service.log_item_cancelled(BRANCH, "o", "oi", "Item", 1, "A1", station)
+            else:
+                await service.log_item_served(BRANCH, "o", "oi", "Item", 1, "A1", station, wait_seconds(station))
+
+
+async def raw_summary(db, since: datetime) -> dict:
+    """The summary straight from kitchen_events (exact percentiles)"""
+    served = KitchenEvent.event_type == KitchenEventType.ITEM_SERVED.value
+    window = and_(KitchenEvent.branch_code == BRANCH, KitchenEvent.timestamp >= since)
+    served_count = (await db.execute(select(func.count()).where(window, served))).scalar()
+    cancelled_count = (await db.execute(select(func.count()).where(
+        window, KitchenEvent.event_type == KitchenEventType.ITEM_CANCELLED.value))).scalar()
+    waits = sorted(w for (w,) in await db.execute(
+        select(KitchenEvent.wait_time_seconds).where(window, served, KitchenEvent.wait_time_seconds.isnot(None))))
+    summary = {
+        "served_count": served_count,
+        "cancelled_count": cancelled_count,
+        "avg_wait_seconds": round(sum(waits) / len(waits)) if waits else 0,
+    }
+    for name, q in rollups.QUANTILES.items():
+        summary[f"{name}_wait_seconds"] = waits[int(q * (len(waits) - 1))] if waits else None
+    return summary
+
+
+async def table_rows() -> tuple:
+    async with AsyncSessionLocal() as db:
+        rollup = sorted(tuple(r) for r in await db.execute(select(
+            KitchenRollup.branch_code, KitchenRollup.station, KitchenRollup.hour, KitchenRollup.served_count,
+            KitchenRollup.cancelled_count, KitchenRollup.wait_seconds_sum, KitchenRollup.wait_count)))
+        buckets = sorted(tuple(r) for r in await db.execute(select(KitchenWaitBucket.__table__)))
+    return rollup, buckets
+
+
+async def main() -> int:
+    await init_db()
+    total = await seed()
+    async with AsyncSessionLocal() as db:
+        rebuilt = await rollups.rebuild(db)
+    await log_through_service()
+    print(f"📚 {total + LOGGED:,} events → {rebuilt['hours']:,} station-hours, {rebuilt['buckets']:,} buckets\n")
+
+    ok = True
+    print(f"{'window':>7} {'raw ms':>8} {'rollup ms':>10}   p50/p90/p99 raw -> rollup")
+    for hours in WINDOWS:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            raw = await raw_summary(db, since)
+            raw_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            rolled = await KitchenEventService(db)._build_summary(BRANCH, since)
+            rollup_ms = (time.perf_counter() - start) * 1000
+
+        quantiles = " ".join(
+            f"{raw[f'{n}_wait_seconds']}->{rolled[f'{n}_wait_seconds']}" for n in rollups.QUANTILES
+        )
+        print(f"{hours:>6}h {raw_ms:>8.1f} {rollup_ms:>10.1f}   {quantiles}")
+
+        for field in ("served_count", "cancelled_count", "avg_wait_seconds"):
+            if raw[field] != rolled[field]:
+                print(f"❌ {hours}h {field}: raw {raw[field]}, rollup {rolled[field]}")
+                ok = False
+        for name in rollups.QUANTILES:
+            exact, estimate = raw[f"{name}_wait_seconds"], rolled[f"{name}_wait_seconds"]
+            if abs(estimate - exact) > rollups.RELATIVE_ACCURACY * exact + 1:
+                print(f"❌ {hours}h {name}: raw {exact}, rollup {estimate}")
+                ok = False
+
+    # Incremental upserts must land where a rebuild puts them
+    incremental = await table_rows()
+    async with AsyncSessionLocal() as db:
+        await rollups.rebuild(db)
+    if incremental != await table_rows():
+        print("❌ incrementally maintained rollups differ from a rebuild")
+        ok = False
+
+    await engine.dispose()
+    print("\n✅ Rollups match the raw events" if ok else "\n❌ Benchmark failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,133 @@
+"""
+Query-count regression benchmark for the legacy orders router.
+
+Seeds a throwaway SQLite database with N orders and asserts that
+get_orders / get_kitchen_orders / get_session_summary run the same
+number of SQL statements for 5 orders as for 60.
+
+Usage:
+    cd backend
+    python -m scripts.bench_order_queries
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+from sqlalchemy import event, delete
+
+from app.database import engine, init_db, AsyncSessionLocal
+from app.models.order import Order, OrderItem, TableSession
+from app.models.table import Table
+from app.routers.orders import get_orders, get_kitchen_orders, get_session_summary
+
+BRANCH = "bench"
+ORDER_COUNTS = [5, 20, 60]
+ITEMS_PER_ORDER = 4
+
+
+class StatementCounter:
+    """Counts statements executed on the engine"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+async def seed(order_count: int) -> str:
+    """Reset and seed N orders spread over 10 tables, all in one session"""
+    async with AsyncSessionLocal() as db:
+        for model in (OrderItem, Order, TableSession, Table):
+            await db.execute(delete(model))
+
+        tables = [
+            Table(id=str(uuid.uuid4()), branch_code=BRANCH, table_number=f"T{i}", max_capacity=4)
+            for i in range(10)
+        ]
+        db.add_all(tables)
+
+        session_id = str(uuid.uuid4())
+        db.add(TableSession(id=session_id, branch_code=BRANCH, table_id=tables[0].id, guest_count=4))
+
+        for n in range(order_count):
+            order = Order(
+                id=str(uuid.uuid4()),
+                branch_code=BRANCH,
+                table_id=tables[n % len(tables)].id,
+                session_id=session_id,
+                order_number=n + 1,
+                status="pending",
+            )
+            db.add(order)
+            for i in range(ITEMS_PER_ORDER):
+                db.add(OrderItem(
+                    id=str(uuid.uuid4()),
+                    order_id=order.id,
+                    menu_item_id=f"menu-{i}",
+                    item_name=f"Item {i}",
+                    item_price=1000,
+                    quantity=1,
+                ))
+
+        await db.commit()
+        return session_id
+
+
+async def measure(counter: StatementCounter, call) -> tuple[int, float]:
+    """Run one endpoint call in a fresh session, return (statements, ms)"""
+    async with AsyncSessionLocal() as db:
+        counter.count = 0
+        start = time.perf_counter()
+        await call(db)
+        elapsed = (time.perf_counter() - start) * 1000
+        return counter.count, elapsed
+
+
+async def main() -> int:
+    await init_db()
+
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+
+    endpoints = {
+        "get_orders": lambda db, sid: get_orders(
+            session_id=None, table_id=None, status=None, branch_code=BRANCH, db=db),
+        "get_kitchen_orders": lambda db, sid: get_kitchen_orders(
+            branch_code=BRANCH, status=["pending", "confirmed", "preparing"], db=db),
+        "get_session_summary": lambda db, sid: get_session_summary(session_id=sid, db=db),
+    }
+
+    results: dict[str, dict[int, int]] = {name: {} for name in endpoints}
+
+    print(f"{'endpoint':<22}{'orders':>8}{'queries':>10}{'ms':>10}")
+    for order_count in ORDER_COUNTS:
+        session_id = await seed(order_count)
+        for name, call in endpoints.items():
+            queries, ms = await measure(counter, lambda db: call(db, session_id))
+            results[name][order_count] = queries
+            print(f"{name:<22}{order_count:>8}{queries:>10}{ms:>10.1f}")
+
+    failed = False
+    for name, by_count in results.items():
+        if len(set(by_count.values())) != 1:
+            print(f"❌ {name}: query count depends on order count {by_count}")
+            failed = True
+
+    await engine.dispose()
+
+    if failed:
+        return 1
+    print("✅ Query count is constant regardless of order count")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,183 @@
+"""
+Benchmark: replaying the order event log into projections.
+
+Seeds a throwaway SQLite event store with 400 sessions of 6 orders
+(~25k events over the last three hours) plus one long session of 300
+orders, then measures:
+
+- fold:     events/sec of the projections alone, on rows already read
+- rebuild:  events/sec of a full replay from the store, snapshots written
+- load:     one long session read with no snapshot (every event) and
+            from its snapshot plus 20 newer events (the tail only)
+
+Snapshot + tail must produce the same state as a full replay, and must
+read only the tail.
+
+Usage:
+    cd backend
+    python -m scripts.bench_projections
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+from sqlalchemy import delete, insert, select
+
+from app.database import AsyncSessionLocal, engine, init_db
+from app.domains.tableorder.event_service import EventService
+from app.domains.tableorder.events import EventSource, EventType, OrderEvent
+from app.domains.tableorder.projections import (
+    EVENT_COLUMNS, ProjectionSnapshot, order_projector, session_projector,
+)
+
+BRANCH = "bench"
+SESSIONS = 400
+ORDERS_PER_SESSION = 6
+LONG_SESSION_ORDERS = 300
+TAIL_EVENTS = 20
+ORDER_FLOW = [
+    EventType.ORDER_CREATED, EventType.GATEWAY_SENT, EventType.GATEWAY_RECEIVED,
+    EventType.ORDER_CONFIRMED, EventType.ORDER_PREPARING, EventType.ORDER_READY, EventType.ORDER_SERVED,
+]
+
+
+class Writer:
+    """Builds event rows with increasing timestamps"""
+
+    def __init__(self, service: EventService, start: datetime):
+        self.service = service
+        self.clock = start
+        self.rows = []
+
+    def add(self, event_type: EventType, session_id: str, order_id: str = None, data: dict = None):
+        self.clock += timedelta(milliseconds=7)
+        event = self.service.build_event(
+            event_type=event_type, event_source=EventSource.SYSTEM, branch_code=BRANCH,
+            table_id=f"table-{hash(session_id) % 30}", session_id=session_id, order_id=order_id, data=data,
+        )
+        event.id = str(uuid.uuid4())
+        event.timestamp = self.clock
+        self.rows.append(event.to_row())
+
+    def session(self, orders: int) -> str:
+        session_id = str(uuid.uuid4())
+        self.add(EventType.SESSION_STARTED, session_id)
+        for n in range(orders):
+            order_id = str(uuid.uuid4())
+            items = [{"menu_item_id": f"m{i}", "name": f"Item {i}", "price": 800.0 + 100 * i, "quantity": 1 + i % 2}
+                     for i in range(3)]
+            for _ in range(4):
+                self.add(EventType.ITEM_ADDED, session_id)
+            for step in ORDER_FLOW:
+                if n % 9 == 8 and step == EventType.ORDER_CONFIRMED:
+                    self.add(EventType.ORDER_CANCELLED, session_id, order_id)
+                    break
+                self.add(step, session_id, order_id, {"items": items} if step == EventType.ORDER_CREATED else None)
+            if n % 3 == 0:
+                self.add(EventType.CALL_WATER, session_id)
+        self.add(EventType.CALL_BILL, session_id)
+        self.add(EventType.SESSION_PAID, session_id)
+        return session_id
+
+
+async def seed() -> tuple:
+    async with AsyncSessionLocal() as db:
+        writer = Writer(EventService(db), datetime.utcnow() - timedelta(hours=3))
+        for _ in range(SESSIONS):
+            writer.session(ORDERS_PER_SESSION)
+        long_session = writer.session(LONG_SESSION_ORDERS)
+        for start in range(0, len(writer.rows), 5000):
+            await db.execute(insert(OrderEvent), writer.rows[start:start + 5000])
+        await db.commit()
+        return long_session, len(writer.rows)
+
+
+async def append_tail(session_id: str):
+    """Recent (unsettled) events after the snapshot"""
+    async with AsyncSessionLocal() as db:
+        writer = Writer(EventService(db), datetime.utcnow() - timedelta(seconds=1))
+        order_id = str(uuid.uuid4())
+        writer.add(EventType.ORDER_CREATED, session_id, order_id,
+                   {"items": [{"menu_item_id": "m9", "name": "Late", "price": 1500.0, "quantity": 2}]})
+        while len(writer.rows) < TAIL_EVENTS:
+            writer.add(EventType.ITEM_ADDED, session_id)
+        await db.execute(insert(OrderEvent), writer.rows)
+        await db.commit()
+
+
+def fold_throughput(projector, rows) -> float:
+    projection = projector.projection
+    states = {}
+    start = time.perf_counter()
+    for row in rows:
+        key = projection.key_of(row)
+        if key is None:
+            continue
+        state = states.get(key)
+        if state is None:
+            state = states[key] = projection.initial(key)
+        projection.apply(state, row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+async def timed_load(projector, key: str) -> tuple:
+    before = projector.events_replayed
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        state = await projector.load(db, key)
+        elapsed = (time.perf_counter() - start) * 1000
+    return state, projector.events_replayed - before, elapsed
+
+
+async def main() -> int:
+    await init_db()
+    long_session, total = await seed()
+    print(f"📚 {total:,} events, {SESSIONS + 1} sessions\n")
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(*EVENT_COLUMNS).order_by(OrderEvent.timestamp, OrderEvent.id))).all()
+
+    ok = True
+    print(f"{'projection':<10} {'fold ev/s':>12} {'rebuild ev/s':>13} {'snapshots':>10}")
+    for projector in (order_projector, session_projector):
+        fold = fold_throughput(projector, rows)
+        async with AsyncSessionLocal() as db:
+            result = await projector.rebuild(db)
+        print(f"{projector.projection.name:<10} {fold:>12,.0f} {result['events_per_second']:>13,.0f} {result['keys']:>10,}")
+
+    await append_tail(long_session)
+
+    # Long session: snapshot + tail vs everything
+    with_snapshot, tail_read, snapshot_ms = await timed_load(session_projector, long_session)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(ProjectionSnapshot).where(ProjectionSnapshot.key == long_session))
+        await db.commit()
+    session_projector.snapshot_every = 10 ** 9  # keep this read from writing a snapshot
+    full, full_read, full_ms = await timed_load(session_projector, long_session)
+
+    print(f"\n{'long session load':<22} {'events read':>12} {'ms':>8}")
+    print(f"{'no snapshot':<22} {full_read:>12,} {full_ms:>8.1f}")
+    print(f"{'snapshot + tail':<22} {tail_read:>12,} {snapshot_ms:>8.1f}")
+
+    if with_snapshot != full:
+        print("❌ snapshot + tail differs from a full replay")
+        ok = False
+    if tail_read != TAIL_EVENTS:
+        print(f"❌ snapshot load read {tail_read} events, expected the {TAIL_EVENTS}-event tail")
+        ok = False
+
+    await engine.dispose()
+    print("\n✅ Snapshot + tail matches full replay" if ok else "\n❌ Benchmark failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
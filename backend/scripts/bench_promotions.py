@@ -0,0 +1,167 @@
+"""
+Benchmark: evaluating combos and promotions over large session bills.
+
+Builds a synthetic branch (300 items in 30 categories under 6 parents)
+with 50 active rules (20 combos, 30 promotions) and bills of 100-200
+lines. Compares the compiled RuleSet (one indexed pass over the lines)
+with a per-rule scan that re-reads every line for every rule; both feed
+the same resolver, so their results must be identical. A 150-line bill
+must evaluate in under 2 ms.
+
+Usage:
+    cd backend
+    python -m scripts.bench_promotions
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from app.services.catalog import BranchCatalog
+from app.services.promotion_engine import (
+    ZERO, BillLine, ComboRule, PromotionRule, Requirement, RuleSet, Tally, Window,
+)
+
+ITEMS = 300
+CATEGORIES = 30
+PARENTS = 6
+ROUNDS = 200
+BUDGET_MS = 2.0
+DISCOUNT_VALUES = {"percentage": [10, 20, 30], "fixed": [300, 500], "new_price": [2000, 4500, 8800]}
+REWARD_VALUES = {"free_item": [0], "discount_item": [10, 50, 100], "discount_order": [5, 10], "points_bonus": [100]}
+AT = datetime(2026, 10, 16, 19, 30)  # Friday evening
+
+
+def make_catalog(rng: random.Random) -> BranchCatalog:
+    catalog = BranchCatalog("bench")
+    catalog.category_parent = {f"parent-{p}": None for p in range(PARENTS)}
+    catalog.category_parent.update({f"cat-{c}": f"parent-{c % PARENTS}" for c in range(CATEGORIES)})
+    catalog.items = {
+        f"item-{i}": {
+            "id": f"item-{i}",
+            "name": f"Item {i}",
+            "category_id": f"cat-{i % CATEGORIES}",
+            "base_price": rng.choice([300, 500, 600, 800, 1200, 1800, 2800, 4500]),
+        }
+        for i in range(ITEMS)
+    }
+    return catalog
+
+
+def key(rng: random.Random) -> tuple:
+    roll = rng.random()
+    if roll < 0.5:
+        return ("item", f"item-{rng.randrange(ITEMS)}")
+    if roll < 0.85:
+        return ("category", f"cat-{rng.randrange(CATEGORIES)}")
+    return ("category", f"parent-{rng.randrange(PARENTS)}")
+
+
+def make_rules(rng: random.Random) -> RuleSet:
+    evenings = Window(days=frozenset(["mon", "tue", "wed", "thu", "fri"]))
+    combos = []
+    for i in range(20):
+        discount_type = rng.choice(list(DISCOUNT_VALUES))
+        combos.append(ComboRule(
+            id=f"combo-{i:02d}", code=f"C{i}", name=f"Combo {i}",
+            discount_type=discount_type,
+            discount_value=Decimal(rng.choice(DISCOUNT_VALUES[discount_type])),
+            requirements=tuple(Requirement(key(rng), rng.randint(1, 2)) for _ in range(rng.randint(2, 4))),
+            window=evenings if i % 3 == 0 else Window(),
+            max_uses=rng.choice([1, 2, None]),
+            min_order_amount=ZERO,
+            display_order=i,
+        ))
+    promotions = []
+    for i in range(30):
+        trigger_type = rng.choice(["order_amount", "item_quantity", "item_total"])
+        reward_type = rng.choice(list(REWARD_VALUES))
+        promotions.append(PromotionRule(
+            id=f"promo-{i:02d}", code=f"P{i}", name=f"Promo {i}",
+            trigger_type=trigger_type,
+            trigger_key=key(rng) if trigger_type != "order_amount" or rng.random() < 0.3 else None,
+            trigger_value=Decimal({"order_amount": 20000, "item_quantity": 4, "item_total": 8000}[trigger_type]),
+            reward_type=reward_type,
+            reward_item_id=f"item-{rng.randrange(ITEMS)}" if reward_type == "free_item" else None,
+            reward_value=Decimal(rng.choice(REWARD_VALUES[reward_type])),
+            reward_quantity=1,
+            window=evenings if i % 4 == 0 else Window(),
+            max_uses=rng.choice([1, None]),
+            manual=i % 10 == 9,
+            stackable=rng.random() < 0.6,
+            priority=rng.randint(0, 10),
+        ))
+    return RuleSet("bench", combos, promotions)
+
+
+def make_bill(lines: int, catalog: BranchCatalog, rng: random.Random) -> list:
+    item_ids = list(catalog.items)
+    bill = []
+    for _ in range(lines):
+        item = catalog.items[rng.choice(item_ids)]
+        bill.append(BillLine(item["id"], Decimal(item["base_price"]), rng.choice([1, 1, 1, 2, 3]), item["name"]))
+    return bill
+
+
+def scan_tally(rules: RuleSet, lines: list, catalog: BranchCatalog) -> Tally:
+    """Baseline: every rule key re-scans the whole bill"""
+    tally = Tally(subtotal=sum((line.unit_price * line.quantity for line in lines), ZERO))
+    keys = [r.key for c in rules.combos for r in c.requirements]
+    for promotion in rules.promotions:
+        keys += [k for k in (promotion.trigger_key,) if k]
+        keys += [("item", promotion.reward_item_id)] if promotion.reward_item_id else []
+    for rule_key in dict.fromkeys(keys):
+        for index, line in enumerate(lines):
+            kind, target = rule_key
+            hit = line.item_id == target if kind == "item" else target in catalog.categories_of(line.item_id)
+            if hit:
+                tally.quantity[rule_key] = tally.quantity.get(rule_key, 0) + line.quantity
+                tally.amount[rule_key] = tally.amount.get(rule_key, ZERO) + line.unit_price * line.quantity
+                tally.lines.setdefault(rule_key, []).append(index)
+    return tally
+
+
+def timed(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    rng = random.Random(17)
+    catalog = make_catalog(rng)
+    rules = make_rules(rng)
+    codes = {"P9", "P19"}
+    print(f"🎟️  {len(rules.combos)} combos + {len(rules.promotions)} promotions, {len(rules.keys)} indexed keys\n")
+    print(f"{'lines':>6} {'applied':>8} {'discount':>10} {'scan ms':>9} {'indexed ms':>11} {'speedup':>8}")
+
+    ok = True
+    for size in (100, 150, 200):
+        bill = make_bill(size, catalog, rng)
+        indexed = rules.evaluate(bill, catalog, AT, codes)
+        scanned = rules.resolve(bill, scan_tally(rules, bill, catalog), catalog, AT, codes)
+        if indexed.to_dict() != scanned.to_dict():
+            print(f"❌ {size} lines: indexed and scanned results differ")
+            ok = False
+
+        scan_ms = timed(lambda: rules.resolve(bill, scan_tally(rules, bill, catalog), catalog, AT, codes), ROUNDS)
+        indexed_ms = timed(lambda: rules.evaluate(bill, catalog, AT, codes), ROUNDS)
+        print(
+            f"{size:>6} {len(indexed.adjustments):>8} {float(indexed.discount):>10,.0f} "
+            f"{scan_ms:>9.3f} {indexed_ms:>11.3f} {scan_ms / indexed_ms:>7.1f}x"
+        )
+        if size == 150 and indexed_ms > BUDGET_MS:
+            print(f"❌ 150-line bill took {indexed_ms:.3f} ms (budget {BUDGET_MS} ms)")
+            ok = False
+
+    print("\n✅ Results identical, within budget" if ok else "\n❌ Benchmark failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
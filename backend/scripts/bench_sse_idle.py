@@ -0,0 +1,106 @@
+"""
+Load test: CPU cost of idle SSE clients.
+
+Connects 500 SSE clients that receive nothing and measures process CPU
+time over a fixed window, for the old polling generator (wakes every
+second and checks is_disconnected()) and the event-driven one. Then
+sends one notification and checks every client gets it.
+
+Usage:
+    cd backend
+    python -m scripts.bench_sse_idle
+"""
+import asyncio
+import sys
+import time
+
+from app.routers.notifications import event_generator
+from app.services.notification_service import (
+    notification_manager, Notification, NotificationType,
+)
+
+CLIENTS = 500
+WINDOW_SECONDS = 5.0
+BRANCH = "bench"
+
+
+class IdleRequest:
+    """Stands in for starlette.Request: the client never disconnects"""
+
+    async def is_disconnected(self) -> bool:
+        await asyncio.sleep(0)
+        return False
+
+
+async def polling_generator(request, branch_code: str):
+    """The previous implementation: 1-second wait_for loop"""
+    queue = await notification_manager.connect(branch_code)
+    try:
+        yield "event: connected\n\n"
+        while True:
+            if notification_manager.shutdown_event.is_set():
+                break
+            if await request.is_disconnected():
+                break
+            try:
+                notification = await asyncio.wait_for(queue.get(), timeout=1.0)
+                if notification is None:
+                    break
+                yield notification.to_sse()
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await notification_manager.disconnect(branch_code, queue)
+
+
+async def consume(stream, received: list):
+    async for chunk in stream:
+        # Skip keepalive comments and control events
+        if not chunk.startswith((":", "event:")):
+            received.append(chunk)
+
+
+async def measure(make_stream) -> tuple:
+    received = []
+    tasks = [asyncio.create_task(consume(make_stream(), received)) for _ in range(CLIENTS)]
+    await asyncio.sleep(0.5)  # let every client connect
+
+    cpu_start = time.process_time()
+    await asyncio.sleep(WINDOW_SECONDS)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+
+    await notification_manager.broadcast(BRANCH, Notification(
+        type=NotificationType.NEW_BOOKING, title="bench", message="bench",
+    ))
+    await asyncio.sleep(0.5)
+    delivered = len(received)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return cpu_ms, delivered
+
+
+async def main() -> int:
+    print(f"{CLIENTS} idle SSE clients, {WINDOW_SECONDS:.0f}s window\n")
+    print(f"{'generator':>14}{'cpu ms':>10}{'cpu %':>8}{'delivered':>11}")
+
+    ok = True
+    for label, make_stream in (
+        ("polling (old)", lambda: polling_generator(IdleRequest(), BRANCH)),
+        ("event-driven", lambda: event_generator(BRANCH, keepalive=15.0)),
+    ):
+        cpu_ms, delivered = await measure(make_stream)
+        percent = cpu_ms / (WINDOW_SECONDS * 1000) * 100
+        print(f"{label:>14}{cpu_ms:>10.1f}{percent:>7.1f}%{delivered:>11}")
+        ok = ok and delivered == CLIENTS
+
+    if not ok:
+        print("\n❌ Not every client received the notification")
+        return 1
+    print("\n✅ Every client received the notification")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
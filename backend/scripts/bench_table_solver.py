@@ -0,0 +1,171 @@
+"""
+Benchmark: whole-evening table assignment on synthetic evenings.
+
+Compares the greedy one-booking-at-a-time assignment (auto_assign_table,
+bookings in arrival order) with the batch solver, on seated bookings,
+seat waste and solve time. The 50 tables x 300 bookings evening must
+solve in under 200 ms.
+
+Also checks small evenings against the exhaustive optimum: a big table
+given to an early small party must not strand a later large party
+(the batch solver must seat both), and reports how often tiny random
+evenings seat fewer than the best possible.
+
+Usage:
+    cd backend
+    python -m scripts.bench_table_solver
+"""
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from app.services.availability import TableInfo, slot_minutes
+from app.services.table_optimization import OptimizationStrategy, TableOptimizationService
+from app.services.table_solver import BatchBooking, solve_evening, solve_greedy
+
+SLOT = TableOptimizationService.SLOT_DURATION
+SPAN = -(-(TableOptimizationService.AVERAGE_DINING_TIME + TableOptimizationService.TURNOVER_BUFFER) // SLOT)
+SLOTS = [f"{h:02d}:{m:02d}" for h in range(17, 23) for m in (0, 30) if not (h == 22 and m == 30)]
+ROUNDS = 5
+BUDGET_MS = 200
+
+scorer = TableOptimizationService(db=None, branch_code="bench")
+
+
+def make_tables(count: int, rng: random.Random) -> list:
+    capacities = [2] * (count // 5) + [4] * (count * 2 // 5) + [6] * (count // 5)
+    capacities += [8] * (count - len(capacities))
+    return [
+        TableInfo(
+            id=f"t{i}", table_number=f"T{i}", name="", max_capacity=cap,
+            table_type="private" if cap == 8 else "regular", zone="",
+            has_window=rng.random() < 0.2, priority=0,
+        )
+        for i, cap in enumerate(capacities)
+    ]
+
+
+def make_bookings(count: int, rng: random.Random, peak: bool = False, large: bool = False) -> list:
+    sizes = [1, 2, 2, 2, 3, 4, 4, 5, 6, 8] if large else [1, 2, 2, 2, 2, 3, 3, 4, 4, 6]
+    weights = [1, 2, 3, 5, 8, 8, 5, 3, 2, 1, 1] if peak else [1] * len(SLOTS)
+    bookings = []
+    for i in range(count):
+        time_slot = rng.choices(SLOTS, weights=weights)[0]
+        bookings.append(BatchBooking(
+            id=f"b{i}", start=slot_minutes(time_slot) // SLOT,
+            guests=rng.choice(sizes), time=time_slot,
+        ))
+    rng.shuffle(bookings)  # arrival order
+    return bookings
+
+
+def cost(table: TableInfo, booking: BatchBooking) -> float:
+    score, _ = scorer._calculate_table_score(table, booking.guests, OptimizationStrategy.MINIMIZE_WASTE)
+    return 100 - score
+
+
+def evaluate(tables, bookings, assignment) -> tuple:
+    capacity = {t.id: t.max_capacity for t in tables}
+    guests = {b.id: b.guests for b in bookings}
+    seated = [b for b, t in assignment.items() if t]
+    return len(seated), sum(capacity[assignment[b]] - guests[b] for b in seated)
+
+
+def check_no_overlap(tables, bookings, assignment) -> bool:
+    starts = {b.id: b.start for b in bookings}
+    per_table = {}
+    for booking_id, table_id in assignment.items():
+        if table_id:
+            per_table.setdefault(table_id, []).append(starts[booking_id])
+    for table_starts in per_table.values():
+        table_starts.sort()
+        if any(b - a < SPAN for a, b in zip(table_starts, table_starts[1:])):
+            return False
+    return True
+
+
+def optimum_seated(tables, bookings) -> int:
+    """Most bookings any overlap-free assignment seats (exhaustive)"""
+    best = 0
+    for choice in itertools.product([None] + list(tables), repeat=len(bookings)):
+        starts = {}
+        for booking, table in zip(bookings, choice):
+            if table is not None:
+                if table.max_capacity < booking.guests:
+                    break
+                starts.setdefault(table.id, []).append(booking.start)
+        else:
+            if all(abs(a - b) >= SPAN for s in starts.values() for a, b in itertools.combinations(s, 2)):
+                best = max(best, sum(1 for table in choice if table))
+    return best
+
+
+def check_lookahead() -> bool:
+    def table(name, capacity):
+        return TableInfo(id=name, table_number=name, name="", max_capacity=capacity,
+                         table_type="regular", zone="", has_window=False, priority=0)
+
+    # The small party at slot 0 must leave the big table for the large one at slot 1
+    tables = [table("big", 4), table("small", 2)]
+    bookings = [BatchBooking(id="a", start=0, guests=2), BatchBooking(id="b", start=1, guests=4)]
+    assignment = solve_evening(tables, bookings, SPAN, lambda t, b: 100 - scorer._calculate_table_score(
+        t, b.guests, OptimizationStrategy.MAXIMIZE_CAPACITY)[0])
+    ok = assignment == {"a": "small", "b": "big"}
+    print(f"{'✅' if ok else '❌'} look-ahead: {assignment}")
+
+    rng = random.Random("tiny")
+    short = 0
+    for _ in range(200):
+        tables = [table(f"t{i}", rng.choice([2, 4, 6])) for i in range(3)]
+        bookings = [BatchBooking(id=f"b{i}", start=rng.randrange(2 * SPAN), guests=rng.randint(1, 6)) for i in range(6)]
+        if evaluate(tables, bookings, solve_evening(tables, bookings, SPAN, cost))[0] < optimum_seated(tables, bookings):
+            short += 1
+    print(f"   tiny evenings below the optimum: {short}/200\n")
+    return ok
+
+
+SCENARIOS = [
+    # name, tables, bookings, peak, large parties
+    ("quiet weekday", 20, 60, False, False),
+    ("busy friday", 50, 150, True, False),
+    ("large parties", 50, 200, True, True),
+    ("50 x 300 overbooked", 50, 300, True, False),
+]
+
+
+def main() -> int:
+    ok = check_lookahead()
+    print(f"{'scenario':<22}{'greedy seated':>15}{'batch seated':>14}{'greedy waste':>14}{'batch waste':>13}{'solve ms':>10}")
+    ok = True
+    for name, table_count, booking_count, peak, large in SCENARIOS:
+        rng = random.Random(f"{name}")
+        tables = make_tables(table_count, rng)
+        bookings = make_bookings(booking_count, rng, peak=peak, large=large)
+
+        greedy = solve_greedy(tables, bookings, SPAN, cost)
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            batch = solve_evening(tables, bookings, SPAN, cost)
+            timings.append((time.perf_counter() - start) * 1000)
+        solve_ms = statistics.median(timings)
+
+        g_seated, g_waste = evaluate(tables, bookings, greedy)
+        b_seated, b_waste = evaluate(tables, bookings, batch)
+        print(f"{name:<22}{g_seated:>15}{b_seated:>14}{g_waste:>14}{b_waste:>13}{solve_ms:>10.1f}")
+
+        if not check_no_overlap(tables, bookings, batch):
+            print(f"❌ {name}: overlapping bookings on one table")
+            ok = False
+        if table_count == 50 and booking_count == 300 and solve_ms > BUDGET_MS:
+            print(f"❌ {name}: {solve_ms:.1f}ms exceeds {BUDGET_MS}ms budget")
+            ok = False
+
+    print("\n✅ All evenings valid and within budget" if ok else "\n❌ Benchmark failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
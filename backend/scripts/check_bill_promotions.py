@@ -0,0 +1,86 @@
+"""
+Check that bills pick up combos on real seeded orders.
+
+Seeds a scratch database from the CSVs in data/, opens a session at a
+hirama table and orders 2x 生ビール (menu-011) + キムチ盛り合わせ
+(menu-024) through the real API. Combos and promotions key on catalog
+items.id, order lines on legacy menu_items.id; the bill must map one to
+the other (menu_items.item_id) and apply BEER-SNACK (combo-004: item-100
+x2 + item-203, ¥500 off).
+
+Menu entries without an item_id (no catalog item yet) still bill at
+their price but never trigger a combo or promotion.
+
+Usage:
+    cd backend
+    python -m scripts.check_bill_promotions
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-bill-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bill.db"
+
+import httpx
+from sqlalchemy import func, select
+
+from app.database import AsyncSessionLocal, engine
+from app.main import app
+from app.models.menu import MenuItem
+from data.seed_data import seed_all
+
+BRANCH = "hirama"
+TABLE_ID = "table-hirama-01"
+ORDER = [("menu-011", 2), ("menu-024", 1)]
+COMBO = "combo-004"
+
+
+async def main() -> int:
+    await seed_all()
+    async with AsyncSessionLocal() as db:
+        linked, total = (await db.execute(
+            select(func.count(MenuItem.item_id), func.count()).where(MenuItem.branch_code == BRANCH)
+        )).one()
+    print(f"🔗 {linked}/{total} {BRANCH} menu entries linked to a catalog item")
+
+    ok = True
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/orders/sessions", params={"branch_code": BRANCH},
+                json={"table_id": TABLE_ID, "guest_count": 2},
+            )
+            response.raise_for_status()
+            session_id = response.json()["id"]
+
+            response = await client.post("/api/orders/", params={"branch_code": BRANCH}, json={
+                "table_id": TABLE_ID,
+                "session_id": session_id,
+                "items": [{"menu_item_id": menu_id, "quantity": quantity} for menu_id, quantity in ORDER],
+            })
+            response.raise_for_status()
+
+            response = await client.get(f"/api/pos/sessions/{session_id}/bill")
+            response.raise_for_status()
+            bill = response.json()
+
+    for adjustment in bill["adjustments"]:
+        print(f"   {adjustment['kind']:<9} {adjustment['code'] or adjustment['id']:<20} "
+              f"x{adjustment['uses']}  -¥{adjustment['amount']:,.0f}")
+    combo = next((a for a in bill["adjustments"] if a["id"] == COMBO), None)
+    if combo is None or combo["amount"] != 500:
+        print(f"❌ {COMBO} not applied to {ORDER}")
+        ok = False
+    print(f"🧾 subtotal ¥{bill['subtotal']:,.0f}, discount ¥{bill['discount']:,.0f}, total ¥{bill['total']:,.0f}")
+
+    await engine.dispose()
+    print("\n✅ Seeded orders bill with their combos" if ok else "\n❌ Check failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
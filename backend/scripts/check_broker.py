@@ -0,0 +1,143 @@
+"""
+Check cross-worker delivery through the realtime broker.
+
+Simulates several workers in one process: each "worker" has its own
+ConnectionManager and NotificationManager, and their brokers share a hub
+(in-memory) or a Redis server. A broadcast issued on one worker must
+reach clients connected to every worker, exactly once.
+
+--fake-redis runs the RedisBroker code path against fakeredis (a dev
+extra) instead of a server: every worker's client talks to one shared
+in-process FakeServer.
+
+Usage:
+    cd backend
+    python -m scripts.check_broker                # in-memory hub
+    python -m scripts.check_broker --redis        # Redis at settings.REDIS_URL
+    python -m scripts.check_broker --fake-redis   # RedisBroker over fakeredis
+"""
+import asyncio
+import json
+import sys
+from unittest.mock import patch
+
+from app.config import settings
+from app.routers.websocket import ConnectionManager
+from app.services.broker import InMemoryBroker, RedisBroker
+from app.services.notification_service import (
+    NotificationManager, Notification, NotificationType,
+)
+
+WORKERS = 3
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        pass
+
+    async def send_text(self, text: str):
+        self.received.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0.05)
+
+
+async def run(brokers) -> bool:
+    ws_managers = [ConnectionManager(broker=b) for b in brokers]
+    sse_managers = [NotificationManager(broker=b) for b in brokers]
+    for broker in brokers:
+        await broker.start()
+
+    # One subscribed and one unsubscribed socket per worker, plus one on another branch
+    subscribed, others = [], []
+    for m in ws_managers:
+        ws, plain, foreign = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await m.connect(ws, "JIAN")
+        await m.connect(plain, "JIAN")
+        await m.connect(foreign, "hirama")
+        m.subscribe(ws, "orders")
+        subscribed.append(ws)
+        others.extend([plain, foreign])
+    queues = [await m.connect("JIAN") for m in sse_managers]
+
+    await ws_managers[0].broadcast_to_branch(
+        "JIAN", {"type": "new_order", "data": {"order_id": "o1"}}, channel="orders",
+    )
+    await sse_managers[1].broadcast("JIAN", Notification(
+        type=NotificationType.NEW_BOOKING, title="check", message="check",
+    ))
+    await settle()
+
+    ok = True
+    for i, ws in enumerate(subscribed):
+        got = [m for m in ws.received if m.get("type") == "new_order"]
+        if len(got) != 1:
+            print(f"❌ worker {i}: subscribed socket got {len(got)} order messages")
+            ok = False
+    if any(m.get("type") == "new_order" for ws in others for m in ws.received):
+        print("❌ Order message leaked to an unsubscribed socket or another branch")
+        ok = False
+    for i, queue in enumerate(queues):
+        if queue.qsize() != 1:
+            print(f"❌ worker {i}: SSE queue has {queue.qsize()} notifications")
+            ok = False
+
+    for m in ws_managers:
+        for ws in list(m.clients):
+            m.disconnect(ws, m.clients[ws].branch_code)
+    for broker in brokers:
+        await broker.stop()
+    return ok
+
+
+async def run_fake_redis(brokers) -> bool:
+    """Run the check with redis.asyncio.from_url served by one FakeServer"""
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        return fakeredis.FakeAsyncRedis(server=server, **kwargs)
+
+    with patch("redis.asyncio.from_url", from_url):
+        return await run(brokers)
+
+
+async def main() -> int:
+    if "--fake-redis" in sys.argv:
+        try:
+            import fakeredis  # noqa: F401
+        except ImportError:
+            print("❌ fakeredis is not installed (pip install -e '.[dev]')")
+            return 1
+        brokers = [RedisBroker("redis://fakeredis") for _ in range(WORKERS)]
+        label = "redis (fakeredis stand-in)"
+        ok = await run_fake_redis(brokers)
+    elif "--redis" in sys.argv:
+        brokers = [RedisBroker(settings.REDIS_URL) for _ in range(WORKERS)]
+        label = f"redis ({settings.REDIS_URL})"
+        ok = await run(brokers)
+    else:
+        hub = []
+        brokers = [InMemoryBroker(hub) for _ in range(WORKERS)]
+        label = "in-memory hub"
+        ok = await run(brokers)
+
+    print(f"{'✅' if ok else '❌'} {WORKERS} workers over {label}: "
+          f"{'every client received each broadcast once' if ok else 'delivery mismatch'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,110 @@
+"""
+Check order / queue number allocation under concurrency.
+
+Fires 100 simultaneous orders at one table session (which already has 3
+orders from before counters existed) through the real API, plus 100
+simultaneous walk-ins. Every number must be issued exactly once and the
+numbers must be contiguous: 4..103 for the orders, 1..100 for the queue.
+On shutdown the unused rest of the last reserved block is given back.
+
+Usage:
+    cd backend
+    python -m scripts.check_counters
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Point the app at a scratch database before anything imports settings
+_tmpdir = tempfile.mkdtemp(prefix="yakiniku-counters-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/counters.db"
+
+import httpx
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, init_db
+from app.main import app
+from app.models.counter import Counter
+from app.models.order import Order, TableSession
+from app.models.table import Table
+from app.services.counters import counters
+
+BRANCH = "bench"
+CONCURRENCY = 100
+EXISTING_ORDERS = 3
+
+
+async def seed() -> tuple:
+    await init_db()
+    table_id, session_id = str(uuid.uuid4()), str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        db.add(Table(id=table_id, branch_code=BRANCH, table_number="C1", max_capacity=4))
+        db.add(TableSession(id=session_id, branch_code=BRANCH, table_id=table_id, guest_count=2))
+        for n in range(1, EXISTING_ORDERS + 1):
+            db.add(Order(branch_code=BRANCH, table_id=table_id, session_id=session_id, order_number=n))
+        await db.commit()
+    return table_id, session_id
+
+
+def check(label: str, numbers: list, expected: range) -> bool:
+    duplicates = len(numbers) - len(set(numbers))
+    ok = sorted(numbers) == list(expected)
+    print(f"{'✅' if ok else '❌'} {label}: {len(numbers)} issued, {duplicates} duplicates, "
+          f"range {min(numbers, default=0)}..{max(numbers, default=0)} (expected {expected.start}..{expected.stop - 1})")
+    return ok
+
+
+async def main() -> int:
+    table_id, session_id = await seed()
+    transport = httpx.ASGITransport(app=app)
+    ok = True
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def place(n: int):
+                response = await client.post("/api/tableorder/", json={
+                    "branch_code": BRANCH, "table_id": table_id, "session_id": session_id,
+                    "items": [{"menu_item_id": "demo", "item_name": f"Kalbi {n}", "item_price": 1200}],
+                })
+                response.raise_for_status()
+
+            async def walk_in(n: int):
+                response = await client.post("/api/checkin/walkin", json={
+                    "branch_code": BRANCH, "customer_name": f"Guest {n}", "guest_count": 2,
+                })
+                response.raise_for_status()
+                return response.json()["queue_number"]
+
+            start = time.perf_counter()
+            await asyncio.gather(*(place(n) for n in range(CONCURRENCY)))
+            order_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            queue_numbers = await asyncio.gather(*(walk_in(n) for n in range(CONCURRENCY)))
+            queue_ms = (time.perf_counter() - start) * 1000
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Order.order_number).where(Order.session_id == session_id))
+            order_numbers = list(result.scalars())
+
+        print(f"🔢 {CONCURRENCY} concurrent orders in {order_ms:.0f} ms, "
+              f"{CONCURRENCY} walk-ins in {queue_ms:.0f} ms ({counters.get_stats()})")
+        ok &= check("order numbers", order_numbers, range(1, EXISTING_ORDERS + CONCURRENCY + 1))
+        ok &= check("queue numbers", queue_numbers, range(1, CONCURRENCY + 1))
+
+    # Shutdown released the unused numbers
+    async with AsyncSessionLocal() as db:
+        stored = await db.scalar(select(Counter.value).where(Counter.scope == f"order:{session_id}"))
+    released = stored == EXISTING_ORDERS + CONCURRENCY
+    print(f"{'✅' if released else '❌'} order counter after shutdown: {stored}")
+    ok &= released
+
+    print("\n✅ Numbers unique and contiguous" if ok else "\n❌ Check failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))